@@ -17,6 +17,10 @@ def create_app(config_class=Config):
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
         return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+
+    @app.route('/uploads/thumbnails/<filename>')
+    def uploaded_thumbnail(filename):
+        return send_from_directory(app.config['THUMBNAIL_FOLDER'], filename)
     
     # Register Blueprints
     from .routes.predict import predict_bp
@@ -27,6 +31,9 @@ def create_app(config_class=Config):
     from .routes.gov_analytics import gov_analytics_bp
     from .routes.transparency_routes import transparency_bp
     from .routes.auth import auth_bp
+    from .routes.stream import stream_bp
+    from .routes.aggregate import aggregate_bp
+    from .routes.drift import drift_bp
     
     app.register_blueprint(predict_bp, url_prefix='/api')
     app.register_blueprint(risk_bp, url_prefix='/api')
@@ -36,10 +43,54 @@ def create_app(config_class=Config):
     app.register_blueprint(gov_analytics_bp, url_prefix='/api')
     app.register_blueprint(transparency_bp, url_prefix='/api')
     app.register_blueprint(auth_bp, url_prefix='/api')
+    app.register_blueprint(stream_bp, url_prefix='/api')
+    app.register_blueprint(aggregate_bp, url_prefix='/api')
+    app.register_blueprint(drift_bp, url_prefix='/api')
+
+    # Build the supported-cities list from the persisted registry and
+    # revalidate it against WAQI in the background
+    if app.config.get('CITY_REGISTRY_REVALIDATE', True):
+        from .services.city_registry import get_city_registry
+        get_city_registry().start()
+
+    from .services.live_aqi_service import get_live_aqi_service
+
+    # Score each buffered reading for anomalies once, at ingestion
+    from .services.anomaly_scorer import get_anomaly_scorer
+    get_live_aqi_service().add_reading_listener(get_anomaly_scorer().on_reading)
+    get_live_aqi_service().add_clear_listener(get_anomaly_scorer().clear_city)
+
+    # Compare live model inputs with the training distributions
+    from .services.drift_monitor import get_drift_monitor
+    get_live_aqi_service().add_reading_listener(get_drift_monitor().on_reading)
+
+    # Keep per-city risk state up to date as readings are buffered
+    from .services.environmental_intelligence import get_environmental_intelligence
+    get_live_aqi_service().add_reading_listener(get_environmental_intelligence().update_city_state)
+    get_live_aqi_service().add_clear_listener(get_environmental_intelligence().clear_city_state)
+
+    # Push readings, risk changes and early warnings to /api/stream subscribers
+    # (registered after the risk state listener so events see the new state)
+    from .services.event_broadcaster import get_event_broadcaster
+    get_live_aqi_service().add_reading_listener(get_event_broadcaster().on_reading)
+
+    # Remember YOLO results so resubmitted (or near-identical) photos skip inference
+    from .services.classification_cache import get_classification_cache
+    from .services.report_jobs import get_classification_queue
+    get_classification_queue().add_result_listener(get_classification_cache().on_classified)
+
+    # Persist classification progress to the report store (opened on first use)
+    from .services.report_repository import update_report
+    get_classification_queue().add_update_listener(update_report)
     
     @app.route('/health')
     def health_check():
-        return {'status': 'healthy'}, 200
+        breakers = get_live_aqi_service().get_breaker_states()
+        degraded = any(b['state'] != 'closed' for b in breakers.values())
+        return {
+            'status': 'degraded' if degraded else 'healthy',
+            'circuit_breakers': breakers,
+        }, 200
         
     return app
 
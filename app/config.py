@@ -11,19 +11,31 @@ class Config:
     # WAQI API Configuration
     WAQI_TOKEN = os.environ.get('WAQI_TOKEN', '12ad7099ee38e34b4eeafa2059289e0d763f9a6e')  # Production token
     
+    # Report classification queue: images per YOLO call and the longest a
+    # worker waits to fill a batch. Batch 1 was fastest on CPU
+    # (evaluation/benchmark_yolo_batching.py); raise it only after
+    # benchmarking the deployment hardware.
+    CLASSIFICATION_BATCH_SIZE = int(os.environ.get('CLASSIFICATION_BATCH_SIZE', 1))
+    CLASSIFICATION_BATCH_WAIT_MS = float(os.environ.get('CLASSIFICATION_BATCH_WAIT_MS', 50))
+    
     # Paths
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'app', 'uploads')
+    THUMBNAIL_FOLDER = os.path.join(UPLOAD_FOLDER, 'thumbnails')
     DATA_FOLDER = os.path.join(BASE_DIR, 'data')
     MODEL_FOLDER = os.path.join(BASE_DIR, 'models')
+    INSTANCE_FOLDER = os.path.join(BASE_DIR, 'instance')
     
     # Model Paths
     LSTM_MODEL_PATH = os.path.join(MODEL_FOLDER, 'lstm_model.h5')
     LSTM_SCALER_PATH = os.path.join(MODEL_FOLDER, 'scaler.pkl')
     
     RISK_MODEL_PATH = os.path.join(MODEL_FOLDER, 'risk_model.pkl')
+    RISK_TREES_PATH = os.path.join(MODEL_FOLDER, 'risk_model_trees.npz')  # training/export_risk_model.py
     
     ISOLATION_FOREST_PATH = os.path.join(MODEL_FOLDER, 'isolation_forest.pkl')
     ISO_SCALER_PATH = os.path.join(MODEL_FOLDER, 'iso_scaler.pkl')
+    ISO_TREES_PATH = os.path.join(MODEL_FOLDER, 'isolation_forest_trees.npz')  # training/export_isolation_forest.py
+    DRIFT_REFERENCE_PATH = os.path.join(MODEL_FOLDER, 'drift_reference.json')  # training/build_drift_reference.py
     
     HOTSPOT_MODEL_PATH = os.path.join(MODEL_FOLDER, 'hotspot_dbscan.pkl')
     HOTSPOT_SCALER_PATH = os.path.join(MODEL_FOLDER, 'hotspot_scaler.pkl')
@@ -36,5 +48,24 @@ class Config:
     HOURLY_DATASET_PATH = os.path.join(DATA_FOLDER, 'city_hour.csv')
     STATION_DATASET_PATH = os.path.join(DATA_FOLDER, 'station_day.csv')
 
+    # Rule tables
+    RECOMMENDATION_RULES_PATH = os.path.join(BASE_DIR, 'app', 'rules', 'government_recommendations.json')
+
+    # Persisted state (written at runtime, git-ignored)
+    CITY_REGISTRY_PATH = os.path.join(INSTANCE_FOLDER, 'city_registry.json')
+    ANOMALY_INDEX_PATH = os.path.join(INSTANCE_FOLDER, 'anomaly_index.npz')
+    CLASSIFICATION_CACHE_PATH = os.path.join(INSTANCE_FOLDER, 'classification_cache.jsonl')
+    REPORTS_DB_PATH = os.path.join(INSTANCE_FOLDER, 'reports.db')  # Live data, not committed
+
+    # Revalidate the supported-cities list against WAQI in the background
+    CITY_REGISTRY_REVALIDATE = os.environ.get('CITY_REGISTRY_REVALIDATE', 'true').lower() != 'false'
+
+
+class TestingConfig(Config):
+    """create_app(TestingConfig): no background jobs that call WAQI or write instance/."""
+    TESTING = True
+    CITY_REGISTRY_REVALIDATE = False
+
+
 # Ensure upload folder exists
 os.makedirs(os.path.join(os.path.abspath(os.path.dirname(__file__)), 'uploads'), exist_ok=True)
@@ -6,6 +6,7 @@ import torch
 from PIL import Image
 from ultralytics import YOLO
 from .config import Config
+from .services.tree_ensemble import FlatTreeEnsemble, export_isolation_forest, export_xgboost_classifier
 
 
 class ModelLoader:
@@ -81,6 +82,24 @@ class ModelLoader:
 
         return self.models["risk"]
 
+    def get_risk_evaluator(self):
+        """
+        Flattened NumPy version of the risk model with the same predict()
+        interface. Loads the exported arrays, or flattens the pickled
+        XGBoost model if the export has not been generated yet.
+        """
+        if "risk_trees" not in self.models:
+            if os.path.exists(Config.RISK_TREES_PATH):
+                print(f"🔄 Loading flat Risk model from {Config.RISK_TREES_PATH}...")
+                self.models["risk_trees"] = FlatTreeEnsemble.load(Config.RISK_TREES_PATH)
+            else:
+                print("🔄 Flat Risk model not exported, flattening the XGBoost model...")
+                self.models["risk_trees"] = export_xgboost_classifier(self.get_risk_model())
+
+            print("✅ Flat Risk model ready.")
+
+        return self.models["risk_trees"]
+
     # ======================================================
     # ISOLATION FOREST
     # ======================================================
@@ -103,6 +122,24 @@ class ModelLoader:
 
         return self.models["iso_forest"]
 
+    def get_iso_evaluator(self):
+        """
+        Flattened NumPy version of the Isolation Forest with the same
+        decision_function() / predict() interface. Loads the exported
+        arrays, or flattens the pickled forest if they are missing.
+        """
+        if "iso_trees" not in self.models:
+            if os.path.exists(Config.ISO_TREES_PATH):
+                print(f"🔄 Loading flat Isolation Forest from {Config.ISO_TREES_PATH}...")
+                self.models["iso_trees"] = FlatTreeEnsemble.load(Config.ISO_TREES_PATH)
+            else:
+                print("🔄 Flat Isolation Forest not exported, flattening the pickled model...")
+                self.models["iso_trees"] = export_isolation_forest(self.get_iso_forest())
+
+            print("✅ Flat Isolation Forest ready.")
+
+        return self.models["iso_trees"]
+
     def get_iso_scaler(self):
         if "iso_scaler" not in self.scalers:
             print(f"🔄 Loading ISO scaler from {Config.ISO_SCALER_PATH}...")
@@ -182,13 +219,82 @@ class ModelLoader:
         
         return self.models["fire_smoke"]
 
+    def _yolo_results_to_classification(self, results, names):
+        """Turn the YOLO results for one image into a fire/smoke classification"""
+        detections = []
+        max_confidence = 0.0
+        detected_class = 'none'
+
+        for result in results:
+            boxes = result.boxes
+            if boxes is not None:
+                for box in boxes:
+                    # Get class and confidence
+                    cls = int(box.cls[0])
+                    conf = float(box.conf[0])
+
+                    # Get class name
+                    class_name = names[cls]
+
+                    # Store detection
+                    detection = {
+                        'class': class_name,
+                        'confidence': conf,
+                        'bbox': box.xyxy[0].tolist() if box.xyxy is not None else []
+                    }
+                    detections.append(detection)
+
+                    # Track highest confidence detection
+                    if conf > max_confidence:
+                        max_confidence = conf
+                        detected_class = class_name
+
+        print(f"🔍 YOLO DETECTIONS: {len(detections)} objects found")
+        print(f"📊 BEST DETECTION: {detected_class} with {max_confidence:.3f} confidence")
+
+        # Determine violation type and severity based on detection
+        if detected_class == 'fire':
+            violation_type = 'fire_hazard'
+            severity = 'Severe'
+            action_required = 'Emergency Response Required'
+        elif detected_class == 'smoke':
+            violation_type = 'industrial_smoke'
+            severity = 'High'
+            action_required = 'Immediate Inspection Required'
+        else:
+            violation_type = 'no_violation'
+            severity = 'Low'
+            action_required = 'Routine Monitoring'
+            max_confidence = 0.0
+
+        return {
+            'violation_type': violation_type,
+            'confidence': max_confidence,
+            'severity': severity,
+            'action_required': action_required,
+            'detected_class': detected_class,
+            'all_detections': detections,
+            'method': 'yolo_v8'
+        }
+
+    @staticmethod
+    def _describe_image(image):
+        """Log label for an image path or an already-decoded (BGR array) image"""
+        if isinstance(image, np.ndarray):
+            return f"<decoded {image.shape[1]}x{image.shape[0]} image>"
+        return image
+
+    @staticmethod
+    def _image_missing(image):
+        return not isinstance(image, np.ndarray) and not os.path.exists(image)
+
     def classify_fire_smoke(self, image_path):
-        """Classify image for fire/smoke using YOLO"""
+        """Classify image (file path or decoded BGR array) for fire/smoke using YOLO"""
         try:
-            print(f"🔥 YOLO CLASSIFICATION: Processing {image_path}")
+            print(f"🔥 YOLO CLASSIFICATION: Processing {self._describe_image(image_path)}")
             
             # Check if image exists
-            if not os.path.exists(image_path):
+            if self._image_missing(image_path):
                 print(f"❌ Image file not found: {image_path}")
                 return self._get_no_violation_classification()
             
@@ -198,62 +304,7 @@ class ModelLoader:
             # Run inference
             results = model(image_path)
             
-            # Process results
-            detections = []
-            max_confidence = 0.0
-            detected_class = 'none'
-            
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Get class and confidence
-                        cls = int(box.cls[0])
-                        conf = float(box.conf[0])
-                        
-                        # Get class name
-                        class_name = model.names[cls]
-                        
-                        # Store detection
-                        detection = {
-                            'class': class_name,
-                            'confidence': conf,
-                            'bbox': box.xyxy[0].tolist() if box.xyxy is not None else []
-                        }
-                        detections.append(detection)
-                        
-                        # Track highest confidence detection
-                        if conf > max_confidence:
-                            max_confidence = conf
-                            detected_class = class_name
-            
-            print(f"🔍 YOLO DETECTIONS: {len(detections)} objects found")
-            print(f"📊 BEST DETECTION: {detected_class} with {max_confidence:.3f} confidence")
-            
-            # Determine violation type and severity based on detection
-            if detected_class == 'fire':
-                violation_type = 'fire_hazard'
-                severity = 'Severe'
-                action_required = 'Emergency Response Required'
-            elif detected_class == 'smoke':
-                violation_type = 'industrial_smoke'
-                severity = 'High'
-                action_required = 'Immediate Inspection Required'
-            else:
-                violation_type = 'no_violation'
-                severity = 'Low'
-                action_required = 'Routine Monitoring'
-                max_confidence = 0.0
-            
-            return {
-                'violation_type': violation_type,
-                'confidence': max_confidence,
-                'severity': severity,
-                'action_required': action_required,
-                'detected_class': detected_class,
-                'all_detections': detections,
-                'method': 'yolo_v8'
-            }
+            return self._yolo_results_to_classification(results, model.names)
             
         except Exception as e:
             print(f"❌ Error in YOLO classification: {e}")
@@ -261,10 +312,42 @@ class ModelLoader:
             traceback.print_exc()
             return self._get_no_violation_classification()
 
-    def classify_hybrid_violation(self, image_path, user_description=""):
-        """Hybrid classification using text + YOLO detection"""
+    def classify_fire_smoke_batch(self, images):
+        """Classify several images (paths or decoded BGR arrays) for fire/smoke with one batched YOLO call"""
+        classifications = [None] * len(images)
         try:
-            print(f"🔍 HYBRID CLASSIFICATION: Processing {image_path}")
+            print(f"🔥 YOLO BATCH CLASSIFICATION: {len(images)} images")
+            
+            # Missing images get the fallback classification, the rest share one call
+            batch = []
+            for i, image in enumerate(images):
+                if self._image_missing(image):
+                    print(f"❌ Image file not found: {image}")
+                    classifications[i] = self._get_no_violation_classification()
+                else:
+                    batch.append(i)
+            
+            if batch:
+                model = self.get_fire_smoke_model()
+                # One Results object per source, in source order
+                results = model([images[i] for i in batch])
+                for i, result in zip(batch, results):
+                    classifications[i] = self._yolo_results_to_classification([result], model.names)
+            
+            return classifications
+            
+        except Exception as e:
+            # A bad image fails the whole call; classify one by one so only it falls back
+            print(f"❌ Error in batched YOLO classification, retrying per image: {e}")
+            return [
+                classification or self.classify_fire_smoke(image)
+                for classification, image in zip(classifications, images)
+            ]
+
+    def classify_hybrid_violation(self, image_path, user_description="", yolo_result=None):
+        """Hybrid classification using text + YOLO detection (yolo_result if already computed)"""
+        try:
+            print(f"🔍 HYBRID CLASSIFICATION: Processing {self._describe_image(image_path)}")
             print(f"� User description: '{user_description}'")
             
             # Initialize with text-based classification
@@ -272,7 +355,8 @@ class ModelLoader:
             print(f"� Text classification result: {text_result}")
             
             # Get YOLO detection
-            yolo_result = self.classify_fire_smoke(image_path)
+            if yolo_result is None:
+                yolo_result = self.classify_fire_smoke(image_path)
             print(f"🔮 YOLO detection result: {yolo_result}")
             
             # Fusion logic
@@ -325,6 +409,14 @@ class ModelLoader:
             traceback.print_exc()
             return self._get_no_violation_classification()
 
+    def classify_hybrid_batch(self, items):
+        """Hybrid classification of (image, user_description) pairs, one YOLO call for all images"""
+        yolo_results = self.classify_fire_smoke_batch([image for image, _ in items])
+        return [
+            self.classify_hybrid_violation(image, user_description, yolo_result=yolo_result)
+            for (image, user_description), yolo_result in zip(items, yolo_results)
+        ]
+
     def _classify_from_text(self, description):
         """Text-based violation classification"""
         if not description:
@@ -0,0 +1,45 @@
+from flask import Blueprint, jsonify, request
+import os
+import logging
+from ..config import Config
+from ..services.station_aggregates import get_station_aggregates, LEVELS
+
+logger = logging.getLogger(__name__)
+aggregate_bp = Blueprint('aggregate', __name__)
+
+# Query parameter that disambiguates a name at each level (e.g. Aurangabad exists in two states)
+PARENT_PARAMS = {'city': 'state', 'station': 'city'}
+
+
+@aggregate_bp.route('/aggregate/<level>/<path:name>', methods=['GET'])
+def get_aggregate(level, name):
+    """
+    Pollutant mean / max / min / count for a station, city, state or the
+    whole country, served from the precomputed station aggregation tree.
+    """
+    try:
+        level = level.lower()
+        if level not in LEVELS:
+            return jsonify({'error': f'Unknown level: {level}', 'levels': list(LEVELS)}), 400
+
+        if not os.path.exists(Config.STATION_DATASET_PATH):
+            return jsonify({'error': 'Station dataset not found'}), 500
+
+        aggregates = get_station_aggregates()
+        parent_param = PARENT_PARAMS.get(level)
+        parent_name = request.args.get(parent_param) if parent_param else None
+        nodes = aggregates.find(level, name, parent_name)
+
+        if not nodes:
+            return jsonify({'error': f'No {level} named {name}'}), 404
+        if len(nodes) > 1:
+            return jsonify({
+                'error': f'{level.capitalize()} name {name} is ambiguous; pass ?{parent_param}=',
+                parent_param: sorted(node.parent.name for node in nodes),
+            }), 400
+
+        return jsonify(nodes[0].to_json())
+
+    except Exception as e:
+        logger.error(f"[AGGREGATE] Error for {level}/{name}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
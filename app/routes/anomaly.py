@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 import pandas as pd
 import numpy as np
 import os
@@ -6,12 +6,74 @@ from datetime import datetime, timedelta
 from ..model_loader import model_loader
 from ..config import Config
 from ..services.live_aqi_service import get_live_aqi_service
+from ..services.anomaly_scorer import get_anomaly_scorer
+from ..services.anomaly_sweep import clamp_workers, get_anomaly_index, get_anomaly_sweep_job
 
 anomaly_bp = Blueprint('anomaly', __name__)
 
+
+def _parse_time(value):
+    """ISO date/datetime query value -> epoch seconds (naive times are UTC, as in city_hour.csv)."""
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return int(timestamp.value // 10**9)
+
+
+def get_historical_anomalies(city, start, end):
+    """Answer a ?from=&to= range query from the national sweep index."""
+    index = get_anomaly_index()
+    if index is None:
+        return jsonify({'error': 'Anomaly index not built; start a sweep with POST /api/anomalies/sweep'}), 404
+
+    result = index.query(city, start, end)
+    if result is None:
+        return jsonify({'error': f'No sweep data for city: {city}'}), 404
+
+    result['data_source'] = 'sweep_index'
+    result['from'] = request.args.get('from')
+    result['to'] = request.args.get('to')
+    return jsonify(result), 200
+
+
+@anomaly_bp.route('/anomalies/sweep', methods=['POST'])
+def start_anomaly_sweep():
+    """Score the whole hourly dataset in the background and rebuild the anomaly index."""
+    if not os.path.exists(Config.HOURLY_DATASET_PATH):
+        return jsonify({'error': 'Hourly dataset not found'}), 500
+
+    job = get_anomaly_sweep_job()
+    # Clamped to 1..cpu_count: each worker is a process with its own model copy
+    workers = clamp_workers(request.args.get('workers', type=int))
+    if not job.start(workers):
+        return jsonify({'error': 'A sweep is already running', 'status': job.status}), 409
+    return jsonify(job.status), 202
+
+
+@anomaly_bp.route('/anomalies/sweep', methods=['GET'])
+def get_anomaly_sweep_status():
+    return jsonify(get_anomaly_sweep_job().status), 200
+
+
+@anomaly_bp.route('/anomalies/stats', methods=['GET'])
+def get_anomaly_stats():
+    """Prefilter cascade metrics: how many readings skip the model and how often the stages agree."""
+    return jsonify(get_anomaly_scorer().get_stats()), 200
+
+
 @anomaly_bp.route('/anomalies/<city>', methods=['GET'])
 def get_anomalies(city):
     try:
+        if 'from' in request.args or 'to' in request.args:
+            try:
+                start = _parse_time(request.args.get('from'))
+                end = _parse_time(request.args.get('to'))
+            except ValueError:
+                return jsonify({'error': 'from/to must be ISO dates or datetimes'}), 400
+            return get_historical_anomalies(city, start, end)
+
         live_aqi_service = get_live_aqi_service()
         
         # Try to fetch live data
@@ -21,61 +83,21 @@ def get_anomalies(city):
         buffer = live_aqi_service.get_buffer(city)
         
         if buffer:
-            # Use live buffer data for anomaly detection
-            feature_cols = ['pm25', 'no2', 'so2', 'o3', 'co']
-            
-            # Extract features from buffer
-            data_to_predict = []
-            anomaly_timestamps = []
-            
-            for reading in buffer:
-                features = [
-                    reading.get('pm25', 0),
-                    reading.get('no2', 0),
-                    reading.get('so2', 0),
-                    reading.get('o3', 0),
-                    reading.get('co', 0),
-                ]
-                data_to_predict.append(features)
-                anomaly_timestamps.append(reading.get('timestamp', datetime.utcnow().isoformat()))
-            
-            if not data_to_predict:
-                return jsonify({
-                    'city': city,
-                    'data_source': 'live',
-                    'total_hours_checked': 0,
-                    'anomaly_count': 0,
-                    'alerts': []
-                }), 200
-            
-            data_to_predict = np.array(data_to_predict)
-            
-            # Handle zero/NaN values
-            data_to_predict = np.where(data_to_predict == 0, np.nanmean(data_to_predict[data_to_predict != 0], axis=0), data_to_predict)
-            
-            scaler = model_loader.get_iso_scaler()
-            model = model_loader.get_iso_forest()
-            
-            X_scaled = scaler.transform(data_to_predict)
-            preds = model.predict(X_scaled)
-            
-            # Isolation Forest returns -1 for anomalies
-            anomalies_indices = np.where(preds == -1)[0]
-            
-            alerts = []
-            for idx in anomalies_indices:
-                alerts.append({
-                    'timestamp': anomaly_timestamps[idx],
-                    'pollutants': {col: float(data_to_predict[idx, i]) for i, col in enumerate(feature_cols)},
-                    'message': 'Unusual pollutant levels detected'
-                })
-            
+            # Readings are scored once at ingestion; this is a filter over stored scores
+            scorer = get_anomaly_scorer()
+            readings = scorer.ensure_scored(city, buffer)
+            alerts = [scorer.alert_json(r) for r in readings if r.is_anomaly]
+
             return jsonify({
                 'city': city,
                 'data_source': 'live',
-                'total_hours_checked': len(buffer),
-                'anomaly_count': int(len(anomalies_indices)),
-                'alerts': alerts
+                'total_hours_checked': len(readings),
+                'anomaly_count': len(alerts),
+                'alerts': alerts,
+                'scores': [
+                    {'timestamp': r.timestamp, 'anomaly_score': r.anomaly_score, 'is_anomaly': r.is_anomaly}
+                    for r in readings
+                ],
             }), 200
         
         else:
@@ -103,7 +125,7 @@ def get_anomalies(city):
                  return jsonify({'error': 'Missing pollutant data for anomaly detection'}), 400
 
             scaler = model_loader.get_iso_scaler()
-            model = model_loader.get_iso_forest()
+            model = model_loader.get_iso_evaluator()
             
             X_scaled = scaler.transform(data_to_predict)
             preds = model.predict(X_scaled)
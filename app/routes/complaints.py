@@ -5,6 +5,10 @@ import random
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from ..config import Config
+from ..services.image_ingest import ImageRejected, ingest_image
+from ..services.classification_cache import get_classification_cache
+from ..services.report_jobs import apply_classification, get_classification_queue
+from ..services.report_repository import get_report_repository, reporter_key
 from .transparency_routes import add_transparency_record
 
 # Test model loading on import
@@ -20,11 +24,11 @@ except Exception as e:
 
 complaints_bp = Blueprint('complaints', __name__)
 
-# In-memory storage for reports (in production, use a database)
-reports_storage = []
-
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+# Seconds a client is asked to wait when the classification queue is full
+REPORT_RETRY_AFTER_SECONDS = 5
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -34,12 +38,13 @@ def get_reports():
     """Get all citizen reports"""
     try:
         print("GET /api/reports - Fetching all reports")
-        print(f"Current reports in storage: {len(reports_storage)}")
+        reports = get_report_repository().list_reports()
+        print(f"Current reports in storage: {len(reports)}")
         
         return jsonify({
             'status': 'success',
-            'count': len(reports_storage),
-            'reports': reports_storage
+            'count': len(reports),
+            'reports': reports
         }), 200
         
     except Exception as e:
@@ -47,22 +52,76 @@ def get_reports():
         return jsonify({'error': str(e)}), 500
 
 
+@complaints_bp.route('/reports/queue', methods=['GET'])
+def get_report_queue():
+    """Classification queue depth and worker metrics"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'queue': get_classification_queue().get_metrics()
+        }), 200
+    except Exception as e:
+        print(f"Error in get_report_queue: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@complaints_bp.route('/reports/cache', methods=['GET'])
+def get_report_cache():
+    """Classification cache size and hit rates"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'cache': get_classification_cache().get_stats()
+        }), 200
+    except Exception as e:
+        print(f"Error in get_report_cache: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@complaints_bp.route('/reports/stats', methods=['GET'])
+def get_report_stats():
+    """Report counts per status and violation type, and verified reports per reporter"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'stats': get_report_repository().get_stats()
+        }), 200
+    except Exception as e:
+        print(f"Error in get_report_stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@complaints_bp.route('/reports/<report_id>', methods=['GET'])
+def get_report(report_id):
+    """Get one report, including its classification status"""
+    try:
+        report = get_report_repository().get(report_id)
+        if report is None:
+            return jsonify({'error': 'Report not found'}), 404
+        
+        return jsonify({
+            'status': 'success',
+            'report': report
+        }), 200
+        
+    except Exception as e:
+        print(f"Error in get_report: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 @complaints_bp.route('/acknowledgements', methods=['GET'])
 def get_acknowledgements():
     """Return all acknowledgements, optionally filtered by reporter_name"""
     try:
         reporter = request.args.get('reporter_name')
-        acks = []
-        for r in reports_storage:
-            ack = r.get('acknowledgement')
-            if ack:
-                if reporter and r.get('reporter_name') != reporter:
-                    continue
-                acks.append({
-                    'report_id': r.get('id'),
-                    'reporter_name': r.get('reporter_name'),
-                    'acknowledgement': ack
-                })
+        acks = [
+            {
+                'report_id': r.get('id'),
+                'reporter_name': r.get('reporter_name'),
+                'acknowledgement': r.get('acknowledgement')
+            }
+            for r in get_report_repository().list_acknowledged(reporter)
+        ]
 
         return jsonify({
             'status': 'success',
@@ -89,73 +148,72 @@ def update_report_status(report_id):
         if new_status not in valid_statuses:
             return jsonify({'error': f'Invalid status. Must be one of: {valid_statuses}'}), 400
         
-        # Find and update the report
-        for report in reports_storage:
-            if report.get('id') == report_id:
-                report['status'] = new_status
+        # Find and update the report (primary key lookup)
+        repository = get_report_repository()
+        report = repository.update(report_id, {'status': new_status})
+        if report is None:
+            return jsonify({'error': 'Report not found'}), 404
 
-                # If approved/action_taken, create an acknowledgement message
-                if new_status == 'action_taken':
-                    reporter = report.get('reporter_name', 'Anonymous')
-                    # Count verified (action_taken) reports by this reporter
-                    verified_count = sum(1 for r in reports_storage if r.get('reporter_name') == reporter and r.get('status') == 'action_taken')
+        # If approved/action_taken, create an acknowledgement message
+        if new_status == 'action_taken':
+            reporter = reporter_key(report.get('reporter_name'))
+            # Verified (action_taken) reports by this reporter, kept up to date on every status change
+            verified_count = repository.verified_count(reporter)
 
-                    # Determine contribution level
-                    if verified_count >= 5:
-                        level_title = 'Climate Sentinel'
-                    elif verified_count >= 2:
-                        level_title = 'Green Guardian'
-                    else:
-                        level_title = 'Eco Contributor'
+            # Determine contribution level
+            if verified_count >= 5:
+                level_title = 'Climate Sentinel'
+            elif verified_count >= 2:
+                level_title = 'Green Guardian'
+            else:
+                level_title = 'Eco Contributor'
 
-                    # Get deployment information from report
-                    violation_type = report.get('violation_type', 'environmental violation')
-                    location = report.get('location', 'reported location')
-                    
-                    # Compose official acknowledgement with deployment details (formal, <=3 sentences)
-                    message = (
-                        f"On behalf of the Environmental Monitoring Authority, we formally acknowledge and thank {reporter} for their verified contribution to protecting our environment. "
-                        f"Your responsible report (ID: {report_id}) regarding {violation_type} at {location} has been successfully addressed with deployed resources. "
-                        f"🌱 You have successfully reported {verified_count} verified environmental alerts.\n"
-                        f"🌍 Contribution Status: {level_title}\n"
-                        f"🚀 Status: Action Completed - Resources Deployed"
-                    )
+            # Get deployment information from report
+            violation_type = report.get('violation_type', 'environmental violation')
+            location = report.get('location', 'reported location')
 
-                    report['acknowledgement'] = {
-                        'message': message,
-                        'sent_at': datetime.utcnow().isoformat() + 'Z',
-                        'deployment_completed': True,
-                        'violation_type': violation_type,
-                        'location': location
-                    }
+            # Compose official acknowledgement with deployment details (formal, <=3 sentences)
+            message = (
+                f"On behalf of the Environmental Monitoring Authority, we formally acknowledge and thank {reporter} for their verified contribution to protecting our environment. "
+                f"Your responsible report (ID: {report_id}) regarding {violation_type} at {location} has been successfully addressed with deployed resources. "
+                f"🌱 You have successfully reported {verified_count} verified environmental alerts.\n"
+                f"🌍 Contribution Status: {level_title}\n"
+                f"🚀 Status: Action Completed - Resources Deployed"
+            )
 
-                    # Log to transparency registry with deployment details
-                    initial = report.get('aqi', 180)
-                    if isinstance(initial, str): initial = 180
-                    # Simulate an improvement
-                    reduction = random.randint(15, 45)
-                    final = max(40, initial - reduction)
-                    
-                    add_transparency_record(
-                        initial_aqi=initial,
-                        ai_recommendation=report.get('ai_recommendation', 'Inspection'),
-                        gov_action=f"Resources Deployed: {violation_type} at {location} - Action Completed",
-                        final_aqi=final,
-                        compliance=100
-                    )
+            report = repository.update(report_id, {'acknowledgement': {
+                'message': message,
+                'sent_at': datetime.utcnow().isoformat() + 'Z',
+                'deployment_completed': True,
+                'violation_type': violation_type,
+                'location': location
+            }})
 
-                    print(f"Acknowledgement created for report {report_id}: {report['acknowledgement']}")
+            # Log to transparency registry with deployment details
+            initial = report.get('aqi', 180)
+            if isinstance(initial, str): initial = 180
+            # Simulate an improvement
+            reduction = random.randint(15, 45)
+            final = max(40, initial - reduction)
 
-                print(f"Updated report {report_id} status to {new_status}")
-                return jsonify({
-                    'status': 'success',
-                    'message': f'Report status updated to {new_status}',
-                    'report_id': report_id,
-                    'new_status': new_status,
-                    'acknowledgement': report.get('acknowledgement')
-                }), 200
-        
-        return jsonify({'error': 'Report not found'}), 404
+            add_transparency_record(
+                initial_aqi=initial,
+                ai_recommendation=report.get('ai_recommendation', 'Inspection'),
+                gov_action=f"Resources Deployed: {violation_type} at {location} - Action Completed",
+                final_aqi=final,
+                compliance=100
+            )
+
+            print(f"Acknowledgement created for report {report_id}: {report['acknowledgement']}")
+
+        print(f"Updated report {report_id} status to {new_status}")
+        return jsonify({
+            'status': 'success',
+            'message': f'Report status updated to {new_status}',
+            'report_id': report_id,
+            'new_status': new_status,
+            'acknowledgement': report.get('acknowledgement')
+        }), 200
         
     except Exception as e:
         print(f"Error in update_report_status: {str(e)}")
@@ -350,18 +408,30 @@ def report_violation():
             return jsonify({'error': 'No selected file'}), 400
             
         if file and allowed_file(file.filename):
-            # Generate a unique filename to prevent collisions
-            ext = file.filename.rsplit('.', 1)[1].lower()
-            unique_filename = f"{uuid.uuid4().hex}.{ext}"
+            # Read and decode the upload once; hashing, thumbnail, storage and
+            # YOLO all work from these in-memory buffers
+            try:
+                image = ingest_image(file.stream)
+            except ImageRejected as e:
+                print(f"❌ DEBUG - Image rejected: {e}")
+                return jsonify({'error': str(e)}), 400
+            print(f"🔍 DEBUG - Ingested {image.width}x{image.height} image, sha256 {image.sha256[:12]}")
+            
+            # Generate a unique filename to prevent collisions (extension from the magic bytes)
+            unique_filename = f"{uuid.uuid4().hex}.{image.extension}"
             filename = secure_filename(unique_filename)
             
-            # Ensure upload folder exists
+            # Ensure upload folders exist
             os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+            os.makedirs(Config.THUMBNAIL_FOLDER, exist_ok=True)
             print(f"🔍 DEBUG - Upload folder: {Config.UPLOAD_FOLDER}")
             
             filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
+            thumbnail_name = f"{filename.rsplit('.', 1)[0]}.jpg"
+            thumbnail_path = os.path.join(Config.THUMBNAIL_FOLDER, thumbnail_name)
             print(f"🔍 DEBUG - Saving file to: {filepath}")
-            file.save(filepath)
+            image.write(filepath)
+            image.write_thumbnail(thumbnail_path)
             print(f"✅ DEBUG - File saved successfully")
             
             # Additional metadata from form
@@ -371,60 +441,100 @@ def report_violation():
             
             print(f"🔍 DEBUG - Form data - name: '{reporter_name}', location: '{location}', description: '{description}'")
             
-            # Real ML classification
-            print(f"🔍 HYBRID CLASSIFICATION: Processing {filename}")
+            print(f"🔍 HYBRID CLASSIFICATION: {filename}")
             print(f"📝 User name: '{reporter_name}'")
             print(f"📍 Location: '{location}'")
             print(f"📝 Description: '{description}'")
             
-            # Hybrid classification using text + YOLO
-            classification = model_loader.classify_hybrid_violation(filepath, description)
-            
-            print(f"🔍 DEBUG - Classification result: {classification}")
-            
-            if not classification:
-                print(f"❌ Hybrid classification failed for: {filepath}")
-                return jsonify({'error': 'Failed to classify image'}), 500
-            
-            # Create report object and store it
+            # Create report object; classification fields are set by the worker
             report_id = uuid.uuid4().hex[:8].upper()
+            timestamp = datetime.utcnow().isoformat() + 'Z'
             new_report = {
                 'id': report_id,
-                'violation_type': classification['violation_type'],
-                'severity': classification['severity'],
-                'confidence': classification['confidence'],
+                'violation_type': None,
+                'severity': None,
+                'confidence': None,
                 'location': location,
-                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'timestamp': timestamp,
                 'image_url': f"/uploads/{filename}",
+                'thumbnail_url': f"/uploads/thumbnails/{thumbnail_name}",
+                'image_sha256': image.sha256,
+                'image_dhash': f"{image.dhash:016x}",
                 'reporter_name': reporter_name,
                 'description': description,
                 'status': 'pending',
-                'ai_recommendation': classification['action_required'],
-                # Add hybrid classification metadata
-                'text_classification': classification.get('text_classification', {}),
-                'yolo_detection': classification.get('yolo_detection', {}),
-                'fusion_logic': classification.get('fusion_logic', 'text_primary_yolo_secondary')
+                'ai_recommendation': None,
+                'text_classification': {},
+                'yolo_detection': {},
+                'fusion_logic': None,
+                'classification_status': 'queued',
+                'classification_error': None,
+                'classified_at': None,
+                'classification_cache': None
             }
             
-            # Store the report
-            reports_storage.append(new_report)
-            print(f"✅ DEBUG - Stored new report: {report_id}")
-            print(f"✅ DEBUG - Total reports in storage: {len(reports_storage)}")
+            # Same or near-identical photo seen before: reuse its YOLO detection
+            # and only redo the (cheap) text fusion for this description
+            cached_detection, match = get_classification_cache().lookup(image.sha256, image.dhash)
+            if cached_detection is not None:
+                print(f"✅ CLASSIFICATION CACHE HIT ({match}): skipping YOLO for {filename}")
+                classification = model_loader.classify_hybrid_violation(image.bgr, description, yolo_result=cached_detection)
+                apply_classification(new_report, classification)
+                new_report.update({
+                    'classification_status': 'done',
+                    'classified_at': datetime.utcnow().isoformat() + 'Z',
+                    'classification_cache': match
+                })
+                get_report_repository().add(new_report)
+                print(f"✅ DEBUG - Stored new report: {report_id}")
+                
+                response_data = {
+                    'id': report_id,
+                    'violation_type': new_report['violation_type'],
+                    'severity': new_report['severity'],
+                    'confidence': new_report['confidence'],
+                    'location': location,
+                    'timestamp': timestamp,
+                    'status': 'success',
+                    'classification_status': 'done',
+                    'classification_cache': match,
+                    'status_url': f"/api/reports/{report_id}",
+                    'message': 'Violation reported successfully',
+                    'complaint_id': report_id
+                }
+                return jsonify(response_data), 200
+            
+            # Classification runs on the background job queue; the report is
+            # stored now and filled in when the worker finishes
+            print(f"🔍 QUEUEING HYBRID CLASSIFICATION: {filename}")
+            # Stored before queueing so the worker's updates always find the report
+            repository = get_report_repository()
+            job_queue = get_classification_queue()
+            repository.add(new_report)
+            if not job_queue.submit(new_report, image.bgr, description):
+                repository.delete(report_id)
+                os.remove(filepath)
+                os.remove(thumbnail_path)
+                print(f"❌ Classification queue full, rejected upload {filename}")
+                response = jsonify({'error': 'Too many reports are being processed, please retry shortly'})
+                response.headers['Retry-After'] = str(REPORT_RETRY_AFTER_SECONDS)
+                return response, 503
+            
+            print(f"✅ DEBUG - Stored new report: {report_id} (classification queued)")
             
             response_data = {
                 'id': report_id,
-                'violation_type': classification['violation_type'],
-                'severity': classification['severity'],
-                'confidence': classification['confidence'],
                 'location': location,
-                'timestamp': datetime.utcnow().isoformat() + 'Z',
-                'status': 'success',
-                'message': 'Violation reported successfully',
+                'timestamp': timestamp,
+                'status': 'accepted',
+                'classification_status': new_report['classification_status'],
+                'status_url': f"/api/reports/{report_id}",
+                'message': 'Violation report received, classification in progress',
                 'complaint_id': report_id
             }
             
             print(f"✅ DEBUG - Response data: {response_data}")
-            return jsonify(response_data), 200
+            return jsonify(response_data), 202
         
         print("❌ DEBUG - File type not allowed")
         return jsonify({'error': 'File type not allowed'}), 400
@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify, request
+import logging
+from ..services.drift_monitor import get_drift_monitor
+
+logger = logging.getLogger(__name__)
+drift_bp = Blueprint('drift', __name__)
+
+
+@drift_bp.route('/drift', methods=['GET'])
+def get_drift():
+    """
+    Live-vs-training drift (PSI and binned KS per input feature) for each
+    model, nationally or for one city (?city=), optionally one model (?model=).
+    """
+    try:
+        monitor = get_drift_monitor()
+        model = request.args.get('model')
+        if model and model not in monitor.models:
+            return jsonify({'error': f'Unknown model: {model}', 'models': monitor.models}), 400
+
+        report = monitor.report(request.args.get('city'), model)
+        report['tracked_cities'] = len(monitor.tracked_cities())
+        return jsonify(report), 200
+
+    except Exception as e:
+        logger.error(f"[DRIFT] Error building drift report: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -6,6 +6,7 @@ import logging
 from ..model_loader import model_loader
 from ..config import Config
 from ..services.live_aqi_service import get_live_aqi_service
+from ..services.city_registry import get_city_registry
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +16,6 @@ predict_bp = Blueprint('predict', __name__)
 AQI_MIN = 0
 AQI_MAX = 500
 
-_SUPPORTED_CITIES_CACHE = []
-
 @predict_bp.route('/predict/geo/<lat>/<lon>', methods=['GET'])
 def predict_by_geo(lat, lon):
     """Predict AQI based on geographic coordinates."""
@@ -44,38 +43,14 @@ def predict_by_geo(lat, lon):
 
 @predict_bp.route('/supported-cities', methods=['GET'])
 def get_supported_cities():
-    """Returns cities validated against the live AQI API."""
-    global _SUPPORTED_CITIES_CACHE
-    if _SUPPORTED_CITIES_CACHE:
-        return jsonify({'status': 'success', 'cities': _SUPPORTED_CITIES_CACHE})
-
-    major_cities = [
-        "Delhi", "Mumbai", "Kolkata", "Chennai", "Bengaluru", "Hyderabad", "Ahmedabad",
-        "Pune", "Surat", "Jaipur", "Lucknow", "Kanpur", "Nagpur", "Indore", "Thane",
-        "Bhopal", "Visakhapatnam", "Patna", "Vadodara", "Ghaziabad", 
-        "Agra", "Nashik", "Rajkot", "Varanasi", "Srinagar", "Noida", 
-        "Chandigarh", "Guwahati", "Solapur", "Hubli-Dharwad", "Gwalior", 
-        "Tiruchirappalli", "Bareilly", "Aligarh", "Bhubaneswar", "Mira-Bhayandar",
-        "Warangal", "Guntur", "Saharanpur", "Bikaner", "Amravati"
-    ]
-
-    # Validate cities in parallel
-    from concurrent.futures import ThreadPoolExecutor
-    service = get_live_aqi_service()
-    
-    def validate(city):
-        res = service.fetch_live_pollution(city)
-        if res and res.get('aqi') is not None:
-            return city
-        return None
-
-    with ThreadPoolExecutor(max_workers=15) as executor:
-        results = list(executor.map(validate, major_cities))
-    
-    valid_cities = sorted([c for c in results if c])
-    _SUPPORTED_CITIES_CACHE = valid_cities
-    
-    return jsonify({'status': 'success', 'count': len(valid_cities), 'cities': valid_cities})
+    """Returns cities validated against the live AQI API (served from memory)."""
+    snapshot = get_city_registry().get_snapshot()
+    return jsonify({
+        'status': 'success',
+        'count': len(snapshot['cities']),
+        'cities': snapshot['cities'],
+        'validated_at': snapshot['validated_at'],
+    })
 
 
 def _get_training_feature_info(scaler):
@@ -313,17 +288,7 @@ def predict_aqi(city):
                         hist_features = hist_scaled[:, :-1]  # shape (29, 11)
 
                         # Build live features vector (same ordering as feature_cols)
-                        fv9 = build_feature_vector_from_reading({
-                            'pm25': pollution_reading.get('pm25'),
-                            'pm10': pollution_reading.get('pm10'),
-                            'no2': pollution_reading.get('no2'),
-                            'so2': pollution_reading.get('so2'),
-                            'o3': pollution_reading.get('o3'),
-                            'co': pollution_reading.get('co'),
-                            'temperature': pollution_reading.get('temperature', None),
-                            'humidity': pollution_reading.get('humidity', None),
-                            'wind_speed': pollution_reading.get('wind_speed', None),
-                        }, scaler)
+                        fv9 = build_feature_vector_from_reading(pollution_reading, scaler)
 
                         violations = pollution_reading.get('violations_7d', 0)
                         aqi_val = float(pollution_reading.get('aqi') or 0.0)
@@ -399,22 +364,20 @@ def predict_aqi(city):
             logger.info("[CSV] Data scaled successfully")
         
         else:
-            # Rebuild live sequence from buffer in training feature order
-            logger.info("[LIVE] Rebuilding live sequence from buffer with training feature order")
-            buffer = live_aqi_service.get_buffer(city)
+            # Rebuild live sequence in training feature order. Prefer a full
+            # 30-day window of daily aggregates (the model was trained on
+            # daily rows); otherwise fall back to the raw reading buffer.
+            daily_window = live_aqi_service.get_daily_window(city, 30)
+            if len(daily_window) == 30:
+                logger.info("[LIVE] Rebuilding live sequence from 30-day daily history")
+                rows = daily_window
+                data_source = 'live_daily'
+            else:
+                logger.info("[LIVE] Rebuilding live sequence from buffer with training feature order")
+                rows = live_aqi_service.get_buffer(city)[-30:]
             seq_rows = []
-            for reading in buffer[-30:]:
-                fv9 = build_feature_vector_from_reading({
-                    'pm25': reading.get('pm25'),
-                    'pm10': reading.get('pm10'),
-                    'no2': reading.get('no2'),
-                    'so2': reading.get('so2'),
-                    'o3': reading.get('o3'),
-                    'co': reading.get('co'),
-                    'temperature': reading.get('temperature', None),
-                    'humidity': reading.get('humidity', None),
-                    'wind_speed': reading.get('wind_speed', None),
-                }, scaler)
+            for reading in rows:
+                fv9 = build_feature_vector_from_reading(reading, scaler)
                 violations = reading.get('violations_7d', 0)
                 aqi_val = float(reading.get('aqi') or 0.0)
                 row = np.concatenate([fv9, [violations, aqi_val]])
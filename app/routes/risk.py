@@ -1,25 +1,173 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 import pandas as pd
 import numpy as np
 import os
 import logging
+from typing import Dict, FrozenSet, Iterable, Optional
 from ..model_loader import model_loader
 from ..config import Config
 from ..services.live_aqi_service import get_live_aqi_service
 from ..services.environmental_intelligence import get_environmental_intelligence
+from ..services.risk_leaderboard import LEGACY_RISK_MAP, get_risk_leaderboard
+from ..services.risk_state import CityRiskState
 
 logger = logging.getLogger(__name__)
 risk_bp = Blueprint('risk', __name__)
 
+LEADERBOARD_MAX_PER_PAGE = 100
+
+# Sections of the /risk/<city> response that can be requested with ?fields=
+RISK_SECTIONS = (
+    'risk', 'pollutants', 'source', 'environment',
+    'early_warning', 'recommendations', 'legacy', 'description', 'trend',
+)
+
+
+@risk_bp.route('/risk/leaderboard', methods=['GET'])
+def get_risk_leaderboard_route():
+    """Ranked composite risk for every tracked city (?page=1&per_page=20)"""
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        if page < 1 or not 1 <= per_page <= LEADERBOARD_MAX_PER_PAGE:
+            return jsonify({'error': f'page must be >= 1 and per_page between 1 and {LEADERBOARD_MAX_PER_PAGE}'}), 400
+
+        ranking = get_risk_leaderboard().get_ranking()
+        entries = ranking['entries']
+        start = (page - 1) * per_page
+
+        return jsonify({
+            'status': 'success',
+            'generated_at': ranking['generated_at'],
+            'total': len(entries),
+            'page': page,
+            'per_page': per_page,
+            'cities': list(entries[start:start + per_page]),
+        }), 200
+
+    except Exception as e:
+        logger.error(f"[ERROR] Risk leaderboard failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def parse_risk_fields(raw: Optional[str]) -> FrozenSet[str]:
+    """Parse ?fields=a,b into a set of RISK_SECTIONS (all sections when omitted)."""
+    if not raw:
+        return frozenset(RISK_SECTIONS)
+    fields = frozenset(f.strip() for f in raw.split(',') if f.strip())
+    unknown = fields - set(RISK_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {sorted(unknown)}. Must be any of: {list(RISK_SECTIONS)}")
+    return fields
+
+
+def build_risk_sections(context: Dict, fields: Iterable[str] = RISK_SECTIONS,
+                        state: Optional[CityRiskState] = None) -> Dict:
+    """
+    Compute only the requested sections of the risk response for a context.
+    Sections that are not requested (e.g. the legacy model or the
+    recommendations) are not computed at all. When the city's precomputed
+    risk state for this reading is passed, its scores are used as-is.
+    """
+    fields = frozenset(fields)
+    intelligence = get_environmental_intelligence()
+    weather = context['weather']
+    response = {}
+
+    # Risk category is shared by several sections
+    if state is not None:
+        composite_risk_score, risk_category, escalation_prob = (
+            state.risk_score, state.risk_category, state.escalation_probability
+        )
+    elif fields & {'risk', 'recommendations', 'description'}:
+        composite_risk_score, risk_category, escalation_prob = intelligence.compute_composite_risk_score(context)
+
+    if 'risk' in fields:
+        response.update({
+            'risk_score': composite_risk_score,
+            'risk_level': risk_category,
+            'escalation_probability': round(escalation_prob * 100, 1),
+            'latest_aqi': round(context['aqi'], 1),
+        })
+
+    if 'pollutants' in fields:
+        # Live pollutant values (from WAQI API or None if unavailable)
+        response['pollutants'] = {
+            key: context['pollutants'].get(key) for key in ('pm25', 'pm10', 'no2', 'so2', 'o3', 'co')
+        }
+
+    if 'source' in fields:
+        source_type, source_description = intelligence.infer_pollution_source(context)
+        response['pollution_source'] = source_type
+        response['source_description'] = source_description
+
+    if 'environment' in fields:
+        response['environmental_context'] = {
+            'temperature': round(weather['temperature'], 1) if weather['temperature'] else None,
+            'humidity': round(weather['humidity'], 1) if weather['humidity'] else None,
+            'wind_speed': round(weather['wind_speed'], 2) if weather['wind_speed'] else None,
+            'pressure': round(weather['pressure'], 1) if weather['pressure'] else None,
+        }
+
+    if 'early_warning' in fields:
+        early_warning = state.early_warning if state is not None else intelligence.detect_early_warning(context)
+        response['early_warning'] = {
+            'triggered': True,
+            'alert_level': early_warning[0],
+            'severity': early_warning[1],
+        } if early_warning else None
+
+    if 'recommendations' in fields:
+        # Top 3 recommendations
+        response['recommendations'] = intelligence.generate_government_recommendations(
+            context, risk_category, limit=3
+        )
+
+    if 'legacy' in fields:
+        # Legacy ML model for comparison/validation
+        # Features: [AQI, violations_7d (estimated), wind_speed, temperature, humidity]
+        X = np.array([[
+            context['aqi'],
+            0,
+            weather['wind_speed'] or 2.0,
+            weather['temperature'] or 25.0,
+            weather['humidity'] or 60.0,
+        ]])
+        legacy_risk_class = int(model_loader.get_risk_evaluator().predict(X)[0])
+        response['legacy_risk_level'] = LEGACY_RISK_MAP.get(legacy_risk_class, "Unknown")
+
+    if 'description' in fields:
+        # Health Tip / Description
+        response['description'] = intelligence.generate_health_tip(context, risk_category)
+
+    if 'trend' in fields:
+        # Rolling statistics over the last buffered readings (live data only)
+        response['trend'] = state.trend_json() if state is not None else None
+
+    return response
+
+
 @risk_bp.route('/risk/<city>', methods=['GET'])
 def get_risk(city):
+    """Risk for a city; ?fields=risk,pollutants,... limits the computed sections"""
     try:
+        try:
+            fields = parse_risk_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         live_aqi_service = get_live_aqi_service()
         intelligence = get_environmental_intelligence()
         
-        # Try to fetch live data
-        pollution_reading, data_source = live_aqi_service.fetch_and_buffer(city)
+        # A reading buffered within BUFFER_TIMEOUT already has its risk state
+        # computed: serve that, and only go to WAQI when it is out of date
+        state = intelligence.get_city_state(city)
+        if state is not None and live_aqi_service.is_buffer_fresh(city):
+            pollution_reading, data_source = state.reading, "live"
+        else:
+            pollution_reading, data_source = live_aqi_service.fetch_and_buffer(city)
         
+        state = None
         if pollution_reading is None:
             # Fallback to CSV
             if not os.path.exists(Config.AQI_DATASET_PATH):
@@ -76,84 +224,28 @@ def get_risk(city):
             }
         else:
             # Use live pollution data with advanced intelligence
-            context = intelligence.compute_environmental_context(pollution_reading)
+            # Risk state is updated when the reading is buffered; reuse it
+            state = intelligence.get_city_state(city)
+            if state is not None and state.matches(pollution_reading):
+                context = state.context
+            else:
+                state = None
+                context = intelligence.compute_environmental_context(pollution_reading)
             latest_aqi = context['aqi']
-            data_source = "live"
-        
-        # Compute advanced composite risk score
-        composite_risk_score, risk_category, escalation_prob = intelligence.compute_composite_risk_score(context)
-        
-        # Infer pollution source
-        source_type, source_description = intelligence.infer_pollution_source(context)
-        
-        # Detect early warning
-        early_warning = intelligence.detect_early_warning(context)
+            data_source = "stale" if pollution_reading.get('stale') else "live"
         
-        # Generate recommendations
-        recommendations = intelligence.generate_government_recommendations(context, risk_category)
-        
-        # Also run legacy ML model for comparison/validation
-        model = model_loader.get_risk_model()
-        
-        feature_cols = ['AQI', 'violations_7d', 'wind_speed', 'temperature', 'humidity']
-        X = np.array([[
-            latest_aqi,
-            0,  # violations_7d (estimated)
-            context['weather']['wind_speed'] or 2.0,
-            context['weather']['temperature'] or 25.0,
-            context['weather']['humidity'] or 60.0,
-        ]]).reshape(1, -1)
-        
-        legacy_risk_class = int(model.predict(X)[0])
-        legacy_risk_map = {0: "Low", 1: "Moderate", 2: "High", 3: "Extreme"}
-        
-        logger.info(
-            f"[RISK] {city}: Composite={composite_risk_score} ({risk_category}), "
-            f"Legacy={legacy_risk_class} ({legacy_risk_map.get(legacy_risk_class)}), "
-            f"Escalation={escalation_prob*100:.1f}%, Source={source_type}"
-        )
-        
-        # Build comprehensive response
         response = {
             'city': city,
             'data_source': data_source,
-            # Primary AI-driven risk
-            'risk_score': composite_risk_score,
-            'risk_level': risk_category,
-            'escalation_probability': round(escalation_prob * 100, 1),
-            'latest_aqi': round(latest_aqi, 1),
-            # Live pollutant values (from WAQI API or None if unavailable)
-            'pollutants': {
-                'pm25': context['pollutants'].get('pm25'),
-                'pm10': context['pollutants'].get('pm10'),
-                'no2':  context['pollutants'].get('no2'),
-                'so2':  context['pollutants'].get('so2'),
-                'o3':   context['pollutants'].get('o3'),
-                'co':   context['pollutants'].get('co'),
-            },
-            # Pollution source intelligence
-            'pollution_source': source_type,
-            'source_description': source_description,
-            # Environmental context
-            'environmental_context': {
-                'temperature': round(context['weather']['temperature'], 1) if context['weather']['temperature'] else None,
-                'humidity': round(context['weather']['humidity'], 1) if context['weather']['humidity'] else None,
-                'wind_speed': round(context['weather']['wind_speed'], 2) if context['weather']['wind_speed'] else None,
-                'pressure': round(context['weather']['pressure'], 1) if context['weather']['pressure'] else None,
-            },
-            # Early warning if triggered
-            'early_warning': {
-                'triggered': early_warning is not None,
-                'alert_level': early_warning[0] if early_warning else None,
-                'severity': early_warning[1] if early_warning else None,
-            } if early_warning else None,
-            # Government recommendations
-            'recommendations': recommendations[:3],  # Top 3 recommendations
-            # Legacy model score for validation
-            'legacy_risk_level': legacy_risk_map.get(legacy_risk_class, "Unknown"),
-            # Health Tip / Description
-            'description': intelligence.generate_health_tip(context, risk_category),
+            'data_age_seconds': pollution_reading.get('stale_age_seconds') if pollution_reading else None,
         }
+        response.update(build_risk_sections(context, fields, state))
+
+        logger.info(
+            f"[RISK] {city}: Composite={response.get('risk_score')} ({response.get('risk_level')}), "
+            f"Legacy={response.get('legacy_risk_level')}, Source={response.get('pollution_source')}, "
+            f"Sections={','.join(sorted(fields))}"
+        )
         
         return jsonify(response), 200
 
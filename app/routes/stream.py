@@ -0,0 +1,67 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+import logging
+from ..services.event_broadcaster import get_event_broadcaster, get_live_poller
+
+logger = logging.getLogger(__name__)
+stream_bp = Blueprint('stream', __name__)
+
+MAX_STREAM_CITIES = 50
+HEARTBEAT_SECONDS = 15  # Comment line sent when idle so proxies keep the connection open
+RETRY_MILLISECONDS = 5000  # Client reconnect delay
+
+
+@stream_bp.route('/stream', methods=['GET'])
+def stream_events():
+    """
+    Server-Sent Events: new readings, risk-level changes and early warnings.
+    ?cities=Delhi,Mumbai limits the stream to those cities (default: all).
+    """
+    raw = request.args.get('cities')
+    cities = None
+    if raw:
+        cities = frozenset(c.strip() for c in raw.split(',') if c.strip())
+        if not cities or len(cities) > MAX_STREAM_CITIES:
+            return jsonify({'error': f'cities must list 1 to {MAX_STREAM_CITIES} city names'}), 400
+
+    broadcaster = get_event_broadcaster()
+    poller = get_live_poller()
+    poller.start()
+    poller.wake()
+
+    def generate():
+        # Subscribed only once the response is actually streamed, so the
+        # finally below always runs for it (a response that is never
+        # iterated never holds a queue)
+        subscription = broadcaster.subscribe(cities)
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n"
+            for payload in broadcaster.snapshot_events(cities):
+                yield payload
+            while True:
+                event = subscription.get(timeout=HEARTBEAT_SECONDS)
+                if event is None:
+                    if subscription.closed:
+                        return
+                    yield ": keep-alive\n\n"
+                else:
+                    yield event.payload
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@stream_bp.route('/stream/stats', methods=['GET'])
+def stream_stats():
+    """Subscriber and event counters for the live stream"""
+    try:
+        stats = get_event_broadcaster().get_stats()
+        stats['last_poll'] = get_live_poller().last_poll
+        return jsonify({'status': 'success', **stats}), 200
+    except Exception as e:
+        logger.error(f"[ERROR] Stream stats failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
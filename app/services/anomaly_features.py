@@ -0,0 +1,93 @@
+"""
+Anomaly Feature Schema
+
+Builds Isolation Forest inputs from live readings in the exact column
+order the ISO scaler was fitted on (train_isolation_forest.py:
+['PM2.5', 'NO2', 'CO', 'SO2', 'O3']). The column -> reading field map is
+compiled once from the scaler; a batch of readings is gathered into one
+matrix, missing pollutants are imputed from the training statistics the
+scaler stores (its per-column means), and scaling is done in place.
+"""
+
+import logging
+import operator
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..model_loader import model_loader
+
+logger = logging.getLogger(__name__)
+
+
+# train_isolation_forest.py feature_cols
+TRAINING_COLUMNS = ('PM2.5', 'NO2', 'CO', 'SO2', 'O3')
+
+# Training column -> PollutionReading field
+READING_FIELDS = {
+    'PM2.5': 'pm25',
+    'NO2': 'no2',
+    'CO': 'co',
+    'SO2': 'so2',
+    'O3': 'o3',
+}
+
+
+class AnomalyFeatureSchema:
+    """Column map and training statistics of a fitted ISO scaler."""
+
+    def __init__(self, scaler, training_columns: Sequence[str] = TRAINING_COLUMNS):
+        columns = tuple(getattr(scaler, 'feature_names_in_', training_columns))
+        if set(columns) != set(training_columns) or len(columns) != len(training_columns):
+            raise ValueError(f"Scaler columns {columns} do not match the training columns {tuple(training_columns)}")
+
+        self.columns: Tuple[str, ...] = columns
+        self.fields: Tuple[str, ...] = tuple(READING_FIELDS[c] for c in columns)
+        # attrgetter with several names returns a tuple per reading without a Python loop body
+        self._getter = operator.attrgetter(*self.fields)
+
+        # Training statistics in scaler column order
+        self.fill_values = np.asarray(scaler.mean_, dtype=np.float64).copy()
+        self._mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self._scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns)
+
+    def raw_matrix(self, readings) -> np.ndarray:
+        """(readings x columns) pollutant values, NaN where a reading has none."""
+        rows = list(map(self._getter, readings))
+        return np.array(rows, dtype=np.float64).reshape(len(rows), self.n_features)
+
+    def impute(self, X: np.ndarray) -> np.ndarray:
+        """Replace NaNs (in place) with the training mean of their column."""
+        missing = np.isnan(X)
+        if missing.any():
+            X[missing] = np.broadcast_to(self.fill_values, X.shape)[missing]
+        return X
+
+    def scale(self, X: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """StandardScaler.transform without the validation overhead (in place by default)."""
+        out = X if out is None else out
+        np.subtract(X, self._mean, out=out)
+        np.divide(out, self._scale, out=out)
+        return out
+
+    def build(self, readings) -> Tuple[np.ndarray, np.ndarray]:
+        """Scaled model input for a batch of readings, plus the raw (unimputed) values."""
+        raw = self.raw_matrix(readings)
+        return self.scale(self.impute(raw.copy())), raw
+
+
+# Global singleton instance
+_anomaly_feature_schema = None
+
+
+def get_anomaly_feature_schema() -> AnomalyFeatureSchema:
+    """Get or create the schema for the loaded ISO scaler."""
+    global _anomaly_feature_schema
+    if _anomaly_feature_schema is None:
+        _anomaly_feature_schema = AnomalyFeatureSchema(model_loader.get_iso_scaler())
+        logger.info(f"[ANOMALY] Feature schema: {', '.join(_anomaly_feature_schema.columns)}")
+    return _anomaly_feature_schema
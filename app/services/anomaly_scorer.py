@@ -0,0 +1,214 @@
+"""
+Streaming Anomaly Scorer
+
+Scores every buffered reading once, at ingestion time (it is registered
+as a LiveAQIService reading listener). The result is stored on the
+reading itself, so /api/anomalies/<city> is a filter over stored scores
+instead of re-building and re-scoring the whole buffer on each request.
+
+Detection is a two-stage cascade:
+1. EwmaPrefilter keeps per-city, per-pollutant EWMA mean / variance and
+   flags readings whose z-score is unusual (O(1) per reading).
+2. Only flagged readings, readings seen during the prefilter's warm-up
+   and a random sample (SAMPLE_RATE) of the rest are confirmed by the
+   Isolation Forest. The sample measures how often the prefilter agrees
+   with full scoring, and how many anomalies it would let through.
+Readings that skip the model keep anomaly_score None and is_anomaly False.
+
+Features come from AnomalyFeatureSchema (scaler column order, missing
+pollutants imputed with the training means).
+"""
+
+import logging
+import random
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..model_loader import model_loader
+from .anomaly_features import TRAINING_COLUMNS, AnomalyFeatureSchema, get_anomaly_feature_schema
+from .pollution_reading import PollutionReading
+
+logger = logging.getLogger(__name__)
+
+
+class EwmaPrefilter:
+    """Stage one: per-city EWMA z-scores per pollutant, updated in O(1)."""
+
+    ALPHA = 0.1  # EWMA weight of the newest reading
+    Z_THRESHOLD = 3.0  # |z| above this on any pollutant sends the reading to the model
+    WARMUP = 6  # Readings per city before the EWMA statistics are trusted
+    REL_STD_FLOOR = 0.1  # Std never below 10% of the mean (flat series would flag every wiggle)
+
+    def __init__(self, n_features: int, alpha: float = ALPHA, z_threshold: float = Z_THRESHOLD,
+                 warmup: int = WARMUP):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        # city -> (mean, variance, observations) per feature
+        self._state: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def check(self, city: str, row: np.ndarray) -> Optional[bool]:
+        """
+        Update the city's statistics with `row` (NaN = missing) and return
+        True if it looks anomalous, False if clearly normal, or None while
+        the statistics are still warming up.
+        """
+        observed = ~np.isnan(row)
+        state = self._state.get(city)
+        if state is None:
+            zeros = np.zeros(self.n_features)
+            state = (np.where(observed, row, 0.0), zeros, observed.astype(float))
+            self._state[city] = state
+            return None
+
+        mean, var, seen = state
+        warm = seen >= self.warmup
+        std = np.maximum(np.sqrt(var), self.REL_STD_FLOOR * np.abs(mean) + 1e-6)
+        z = np.abs(np.where(observed, row, mean) - mean) / std
+
+        diff = np.where(observed, row - mean, 0.0)
+        first = observed & (seen == 0)
+        increment = np.where(first, diff, self.alpha * diff)
+        new_var = np.where(first, 0.0, (1 - self.alpha) * (var + diff * increment))
+        self._state[city] = (mean + increment, np.where(observed, new_var, var), seen + observed)
+
+        if bool(np.any(observed & warm & (z > self.z_threshold))):
+            return True
+        if not np.any(observed & warm):
+            return None
+        return False
+
+    def clear_city(self, city: str) -> None:
+        self._state.pop(city, None)
+
+
+class AnomalyScorer:
+    """Per-reading cascade scoring on schema-ordered, training-imputed features."""
+
+    SAMPLE_RATE = 0.1  # Fraction of prefilter-normal readings still checked by the model
+
+    def __init__(self, prefilter: bool = True, sample_rate: float = SAMPLE_RATE, seed: Optional[int] = None):
+        self._lock = threading.Lock()
+        self.prefilter = EwmaPrefilter(len(TRAINING_COLUMNS)) if prefilter else None
+        self.sample_rate = sample_rate
+        self._random = random.Random(seed)
+        self.scored = 0
+        self._counts = {
+            'readings': 0,
+            'skipped': 0,           # Prefilter normal, model not run
+            'warmup': 0,            # Prefilter undecided, model run
+            'escalated': 0,         # Prefilter flagged, model run
+            'confirmed': 0,         # ... and the model agreed
+            'sampled': 0,           # Prefilter normal, model run anyway
+            'sampled_anomalies': 0,  # ... and the model disagreed (missed by the prefilter)
+        }
+
+    @staticmethod
+    def _schema() -> AnomalyFeatureSchema:
+        return get_anomaly_feature_schema()
+
+    def _score_scaled(self, readings: Sequence[PollutionReading], X_scaled: np.ndarray) -> np.ndarray:
+        scores = model_loader.get_iso_evaluator().decision_function(X_scaled)
+
+        # Isolation Forest labels negative decision scores as anomalies (-1)
+        # Score before the flag: readers treat is_anomaly as "scored" (see PollutionReading)
+        for reading, score in zip(readings, scores.tolist()):
+            reading.anomaly_score = round(score, 6)
+            reading.is_anomaly = score < 0
+        self.scored += len(readings)
+        return scores
+
+    def score_readings(self, readings: Sequence[PollutionReading]) -> np.ndarray:
+        """Score readings with the model (no prefilter) in one batch and store the results on them."""
+        if not readings:
+            return np.zeros(0)
+        X_scaled, _ = self._schema().build(readings)
+        return self._score_scaled(readings, X_scaled)
+
+    def score_reading(self, city: str, reading: PollutionReading) -> float:
+        """Score one reading with the model (no prefilter) and store the result on it."""
+        return float(self.score_readings([reading])[0])
+
+    def on_reading(self, city: str, reading: PollutionReading) -> None:
+        """LiveAQIService reading listener: run the cascade on each new reading once."""
+        if reading.is_anomaly is not None:
+            return
+        if self.prefilter is None:
+            self.score_readings([reading])
+            return
+
+        X_scaled, raw = self._schema().build([reading])
+        with self._lock:
+            verdict = self.prefilter.check(city, raw[0])
+            sampled = verdict is False and self._random.random() < self.sample_rate
+            self._counts['readings'] += 1
+
+        if verdict is False and not sampled:
+            reading.is_anomaly = False
+            with self._lock:
+                self._counts['skipped'] += 1
+            return
+
+        score = float(self._score_scaled([reading], X_scaled)[0])
+        with self._lock:
+            if verdict is None:
+                self._counts['warmup'] += 1
+            elif verdict:
+                self._counts['escalated'] += 1
+                self._counts['confirmed'] += score < 0
+            else:
+                self._counts['sampled'] += 1
+                self._counts['sampled_anomalies'] += score < 0
+
+    def ensure_scored(self, city: str, readings) -> List[PollutionReading]:
+        """Score (in one batch) any readings buffered before the listener was registered."""
+        readings = list(readings)
+        self.score_readings([r for r in readings if r.is_anomaly is None])
+        return readings
+
+    def get_stats(self) -> Dict:
+        """Cascade counters plus skip and agreement rates."""
+        with self._lock:
+            counts = dict(self._counts)
+        checked = counts['sampled'] + counts['escalated']
+        # Agreement between the prefilter verdict and the model on readings both judged
+        agreed = (counts['sampled'] - counts['sampled_anomalies']) + counts['confirmed']
+        return {
+            **counts,
+            'prefilter_enabled': self.prefilter is not None,
+            'sample_rate': self.sample_rate,
+            'model_runs': self.scored,
+            'skip_fraction': round(counts['skipped'] / counts['readings'], 4) if counts['readings'] else None,
+            'agreement_rate': round(agreed / checked, 4) if checked else None,
+            'escalation_precision': round(counts['confirmed'] / counts['escalated'], 4) if counts['escalated'] else None,
+            # Share of prefilter-normal readings the model flags, i.e. anomalies let through
+            'estimated_miss_rate': round(counts['sampled_anomalies'] / counts['sampled'], 4) if counts['sampled'] else None,
+        }
+
+    def clear_city(self, city: str) -> None:
+        if self.prefilter is not None:
+            with self._lock:
+                self.prefilter.clear_city(city)
+
+    def alert_json(self, reading: PollutionReading) -> Dict:
+        return {
+            'timestamp': reading.timestamp,
+            'pollutants': {f: getattr(reading, f) for f in self._schema().fields},
+            'anomaly_score': reading.anomaly_score,
+            'message': 'Unusual pollutant levels detected',
+        }
+
+
+# Global singleton instance
+_anomaly_scorer: Optional[AnomalyScorer] = None
+
+
+def get_anomaly_scorer() -> AnomalyScorer:
+    """Get or create the global AnomalyScorer instance."""
+    global _anomaly_scorer
+    if _anomaly_scorer is None:
+        _anomaly_scorer = AnomalyScorer()
+    return _anomaly_scorer
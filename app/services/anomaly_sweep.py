@@ -0,0 +1,245 @@
+"""
+National Anomaly Sweep
+
+Scores the whole hourly dataset (city_hour.csv) with the Isolation
+Forest artifacts, one city partition per task in a process pool, and
+writes the results to a compact indexed file (Config.ANOMALY_INDEX_PATH):
+
+    cities          city names, sorted
+    offsets         rows of city i are [offsets[i], offsets[i + 1])
+    ts              epoch seconds of every scored hour (sorted within a city)
+    score           decision_function score of every scored hour (float32)
+    anomaly_row     global row numbers of the anomalies (sorted)
+    anomaly_values  pollutant values of the anomalies (float32, FEATURE_COLS order)
+
+Historical range queries (/api/anomalies/<city>?from=&to=) are two binary
+searches into one city's slice, without touching the CSV or the model.
+"""
+
+import os
+import logging
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# Scaler / Isolation Forest training column order
+FEATURE_COLS = ['PM2.5', 'NO2', 'CO', 'SO2', 'O3']
+
+# Per-process model cache (filled by _init_worker in each pool worker)
+_worker_models: Dict[str, object] = {}
+
+
+def clamp_workers(workers: Optional[int]) -> int:
+    """Pool size within 1..cpu_count (every worker loads its own copy of the model)."""
+    cpus = os.cpu_count() or 1
+    if workers is None:
+        return cpus
+    return max(1, min(workers, cpus))
+
+
+def _init_worker(model_path: str, scaler_path: str) -> None:
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+    # One process per core already; avoid every worker spawning a thread per core too
+    model.n_jobs = 1
+    _worker_models['model'] = model
+    _worker_models['scaler'] = scaler
+
+
+def _score_partition(task: Tuple[str, np.ndarray, np.ndarray]) -> Tuple[str, np.ndarray, np.ndarray]:
+    """Score one city's (already cleaned) rows; returns (city, ts, scores)."""
+    city, ts, values = task
+    X_scaled = _worker_models['scaler'].transform(pd.DataFrame(values, columns=FEATURE_COLS))
+    scores = _worker_models['model'].decision_function(X_scaled)
+    return city, ts, scores.astype(np.float32)
+
+
+def load_partitions(dataset_path: str) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    Read city_hour.csv and split it into per-city (city, ts, values) tasks.
+    Missing values are forward/back filled within each city (as in
+    training) with vectorised group fills; rows still incomplete are dropped.
+    """
+    df = pd.read_csv(dataset_path, usecols=['City', 'Datetime'] + FEATURE_COLS)
+    df['Datetime'] = pd.to_datetime(df['Datetime'])
+    df = df.sort_values(['City', 'Datetime'], kind='stable').reset_index(drop=True)
+
+    grouped = df.groupby('City', sort=False)[FEATURE_COLS]
+    df[FEATURE_COLS] = grouped.ffill()
+    df[FEATURE_COLS] = df.groupby('City', sort=False)[FEATURE_COLS].bfill()
+    df = df.dropna(subset=FEATURE_COLS)
+
+    ts = df['Datetime'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    values = df[FEATURE_COLS].to_numpy(dtype=float)
+    cities = df['City'].to_numpy()
+
+    # Rows are sorted by city, so each partition is one contiguous slice
+    boundaries = np.flatnonzero(cities[1:] != cities[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(df)]))
+    return [(str(cities[s]), ts[s:e], values[s:e]) for s, e in zip(starts, ends) if e > s]
+
+
+def run_sweep(dataset_path: Optional[str] = None, output_path: Optional[str] = None,
+              workers: Optional[int] = None) -> Dict:
+    """Score every city in a process pool and write the anomaly index."""
+    dataset_path = dataset_path or Config.HOURLY_DATASET_PATH
+    output_path = output_path or Config.ANOMALY_INDEX_PATH
+    workers = clamp_workers(workers)
+    started = time.time()
+    partitions = load_partitions(dataset_path)
+    values_by_city = {city: values for city, _, values in partitions}
+    logger.info(f"[SWEEP] Scoring {sum(len(p[1]) for p in partitions)} rows in {len(partitions)} cities")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(Config.ISOLATION_FOREST_PATH, Config.ISO_SCALER_PATH)) as pool:
+        results = sorted(pool.map(_score_partition, partitions), key=lambda r: r[0])
+
+    cities = [city for city, _, _ in results]
+    lengths = [len(ts) for _, ts, _ in results]
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    ts = np.concatenate([r[1] for r in results]) if results else np.zeros(0, np.int64)
+    score = np.concatenate([r[2] for r in results]) if results else np.zeros(0, np.float32)
+    values = np.concatenate([values_by_city[c] for c in cities]) if results else np.zeros((0, len(FEATURE_COLS)))
+
+    # Isolation Forest labels negative decision scores as anomalies
+    anomaly_row = np.flatnonzero(score < 0)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = output_path + '.tmp.npz'
+    np.savez(
+        tmp_path,
+        cities=np.array(cities, dtype=str),
+        offsets=offsets,
+        ts=ts,
+        score=score,
+        anomaly_row=anomaly_row,
+        anomaly_values=values[anomaly_row].astype(np.float32),
+    )
+    os.replace(tmp_path, output_path)
+
+    summary = {
+        'cities': len(cities),
+        'rows_scored': int(len(ts)),
+        'anomalies': int(len(anomaly_row)),
+        'seconds': round(time.time() - started, 2),
+    }
+    logger.info(f"[SWEEP] Wrote {output_path}: {summary}")
+    return summary
+
+
+class AnomalyIndex:
+    """Read side of the sweep output: per-city time-range anomaly queries."""
+
+    def __init__(self, path: str):
+        with np.load(path) as data:
+            self.cities = [str(c) for c in data['cities']]
+            self.offsets = data['offsets']
+            self.ts = data['ts']
+            self.score = data['score']
+            self.anomaly_row = data['anomaly_row']
+            self.anomaly_values = data['anomaly_values']
+        self._city_index = {c.lower(): i for i, c in enumerate(self.cities)}
+
+    def has_city(self, city: str) -> bool:
+        return city.lower() in self._city_index
+
+    def query(self, city: str, start: Optional[float] = None, end: Optional[float] = None) -> Optional[Dict]:
+        """Anomalies of `city` with start <= ts <= end (epoch seconds); None if unknown city."""
+        i = self._city_index.get(city.lower())
+        if i is None:
+            return None
+        first, last = self.offsets[i], self.offsets[i + 1]
+        city_ts = self.ts[first:last]
+        lo = first + (np.searchsorted(city_ts, start, 'left') if start is not None else 0)
+        hi = first + (np.searchsorted(city_ts, end, 'right') if end is not None else last - first)
+
+        a_lo, a_hi = np.searchsorted(self.anomaly_row, [lo, hi])
+        rows = self.anomaly_row[a_lo:a_hi]
+        alerts = [
+            {
+                'timestamp': datetime.fromtimestamp(int(self.ts[row]), tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                'pollutants': {col: round(float(v), 3) for col, v in zip(FEATURE_COLS, values)},
+                'anomaly_score': round(float(self.score[row]), 6),
+                'message': 'Unusual pollutant levels detected',
+            }
+            for row, values in zip(rows.tolist(), self.anomaly_values[a_lo:a_hi])
+        ]
+        return {
+            'city': self.cities[i],
+            'total_hours_checked': int(hi - lo),
+            'anomaly_count': len(alerts),
+            'alerts': alerts,
+        }
+
+
+class AnomalySweepJob:
+    """Runs the sweep in a background thread, one at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.status = {'state': 'idle'}
+
+    def start(self, workers: Optional[int] = None) -> bool:
+        """Start a sweep; returns False if one is already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            workers = clamp_workers(workers)
+            self.status = {'state': 'running', 'workers': workers, 'started_at': datetime.utcnow().isoformat()}
+            self._thread = threading.Thread(target=self._run, args=(workers,), name="anomaly-sweep", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, workers: Optional[int]) -> None:
+        try:
+            summary = run_sweep(workers=workers)
+            self.status = {**self.status, 'state': 'finished', 'summary': summary,
+                           'finished_at': datetime.utcnow().isoformat()}
+        except Exception as e:
+            logger.error(f"[SWEEP] Failed: {str(e)}")
+            self.status = {**self.status, 'state': 'failed', 'error': str(e),
+                           'finished_at': datetime.utcnow().isoformat()}
+
+
+# Global singleton instances
+_anomaly_index = None
+_anomaly_index_mtime = None
+_anomaly_index_lock = threading.Lock()
+_anomaly_sweep_job = None
+
+
+def get_anomaly_index() -> Optional[AnomalyIndex]:
+    """Get the sweep index (reloaded after a new sweep), or None if not built yet."""
+    global _anomaly_index, _anomaly_index_mtime
+    if not os.path.exists(Config.ANOMALY_INDEX_PATH):
+        return None
+    mtime = os.path.getmtime(Config.ANOMALY_INDEX_PATH)
+    if _anomaly_index is None or mtime != _anomaly_index_mtime:
+        with _anomaly_index_lock:
+            if _anomaly_index is None or mtime != _anomaly_index_mtime:
+                _anomaly_index = AnomalyIndex(Config.ANOMALY_INDEX_PATH)
+                _anomaly_index_mtime = mtime
+    return _anomaly_index
+
+
+def get_anomaly_sweep_job() -> AnomalySweepJob:
+    """Get or create the global AnomalySweepJob instance."""
+    global _anomaly_sweep_job
+    if _anomaly_sweep_job is None:
+        _anomaly_sweep_job = AnomalySweepJob()
+    return _anomaly_sweep_job
@@ -0,0 +1,167 @@
+"""
+Circuit Breaker
+
+Tracks consecutive upstream failures per key (an upstream such as 'waqi',
+or an upstream/city pair such as 'waqi:Delhi') so callers can stop waiting
+on an API that is known to be failing and serve cached data instead.
+The registry holds at most `max_breakers` breakers and can drop breakers
+that never recover, so unknown or invalid keys do not accumulate.
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Three-state breaker:
+    - closed: calls go through; consecutive failures are counted
+    - open: calls are short-circuited until a probe succeeds
+    - half_open: a probe is in flight; request threads still short-circuit
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._last_failure_at = None
+        self._last_success_at = None
+        self._total_failures = 0
+        self._total_short_circuits = 0
+        self._failed_probes = 0  # Consecutive half-open probes that failed
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def failed_probes(self) -> int:
+        return self._failed_probes
+
+    def allow_request(self) -> bool:
+        """Return True if a request thread may call the upstream."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            self._total_short_circuits += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"[BREAKER] {self.name} closed after successful probe")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._failed_probes = 0
+            self._opened_at = None
+            self._last_success_at = time.time()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._total_failures += 1
+            self._last_failure_at = time.time()
+
+            if self._state == self.HALF_OPEN:
+                # Probe failed: stay open for another reset window
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._failed_probes += 1
+            elif self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                logger.warning(
+                    f"[BREAKER] {self.name} opened after "
+                    f"{self._consecutive_failures} consecutive failures"
+                )
+
+    def try_begin_probe(self) -> bool:
+        """
+        Move an open breaker whose reset window has elapsed to half_open.
+        Returns True if the caller should run a probe.
+        """
+        with self._lock:
+            if self._state != self.OPEN:
+                return False
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._state = self.HALF_OPEN
+            return True
+
+    def snapshot(self) -> Dict:
+        """Return a JSON-serialisable view of the breaker state."""
+        with self._lock:
+            open_for = None
+            if self._opened_at is not None:
+                open_for = round(time.monotonic() - self._opened_at, 1)
+            return {
+                'name': self.name,
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'total_failures': self._total_failures,
+                'short_circuited_requests': self._total_short_circuits,
+                'failed_probes': self._failed_probes,
+                'open_for_seconds': open_for,
+                'last_failure_at': self._last_failure_at,
+                'last_success_at': self._last_success_at,
+            }
+
+
+class CircuitBreakerRegistry:
+    """Lazily creates and holds one CircuitBreaker per key (at most max_breakers)."""
+
+    MAX_BREAKERS = 1000
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, max_breakers: int = MAX_BREAKERS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_breakers = max_breakers
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    if len(self._breakers) >= self.max_breakers:
+                        self._evict_one()
+                    breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+                    self._breakers[name] = breaker
+        return breaker
+
+    def _evict_one(self) -> None:
+        # Caller holds self._lock. Oldest closed breaker first (it carries no
+        # state worth keeping), otherwise the oldest breaker.
+        victim = next((n for n, b in self._breakers.items() if b.state == CircuitBreaker.CLOSED), None)
+        if victim is None:
+            victim = next(iter(self._breakers))
+        del self._breakers[victim]
+
+    def remove(self, name: str) -> None:
+        """Forget a breaker; the next get() starts a fresh, closed one."""
+        with self._lock:
+            self._breakers.pop(name, None)
+
+    def open_breakers(self) -> List[CircuitBreaker]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [b for b in breakers if b.state != CircuitBreaker.CLOSED]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.snapshot() for b in breakers}
@@ -0,0 +1,161 @@
+"""
+City Registry Service
+
+Holds the list of cities offered to the frontend. The list is loaded at
+startup from the persisted registry (last validation result) and is
+revalidated against the WAQI API on a background schedule, so
+/api/supported-cities always answers from memory.
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ..config import Config
+from .live_aqi_service import get_live_aqi_service
+
+logger = logging.getLogger(__name__)
+
+
+MAJOR_CITIES = [
+    "Delhi", "Mumbai", "Kolkata", "Chennai", "Bengaluru", "Hyderabad", "Ahmedabad",
+    "Pune", "Surat", "Jaipur", "Lucknow", "Kanpur", "Nagpur", "Indore", "Thane",
+    "Bhopal", "Visakhapatnam", "Patna", "Vadodara", "Ghaziabad",
+    "Agra", "Nashik", "Rajkot", "Varanasi", "Srinagar", "Noida",
+    "Chandigarh", "Guwahati", "Solapur", "Hubli-Dharwad", "Gwalior",
+    "Tiruchirappalli", "Bareilly", "Aligarh", "Bhubaneswar", "Mira-Bhayandar",
+    "Warangal", "Guntur", "Saharanpur", "Bikaner", "Amravati"
+]
+
+
+class CityRegistry:
+    """
+    In-memory supported-cities list with background revalidation.
+    The current list is an immutable snapshot dict swapped atomically,
+    so readers never take a lock.
+    """
+
+    REVALIDATE_INTERVAL = 6 * 60 * 60  # Seconds between validation runs
+    MAX_WORKERS = 15
+
+    def __init__(self, registry_path: Optional[str] = None):
+        # Resolved per instance (not at import), so Config.CITY_REGISTRY_PATH can be patched
+        self.registry_path = registry_path or Config.CITY_REGISTRY_PATH
+        self._snapshot = self._load()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self) -> Dict:
+        """Load the last validation result, or fall back to the full registry."""
+        try:
+            if os.path.exists(self.registry_path):
+                with open(self.registry_path) as f:
+                    data = json.load(f)
+                cities = [c for c in data.get('cities', []) if c in MAJOR_CITIES]
+                if cities:
+                    logger.info(f"[CITIES] Loaded {len(cities)} validated cities from registry")
+                    return {'cities': sorted(cities), 'validated_at': data.get('validated_at')}
+        except Exception as e:
+            logger.error(f"[CITIES] Failed to load city registry: {str(e)}")
+
+        return {'cities': sorted(MAJOR_CITIES), 'validated_at': None}
+
+    def _persist(self, snapshot: Dict) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.registry_path), exist_ok=True)
+            tmp_path = f"{self.registry_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.registry_path)
+        except Exception as e:
+            logger.error(f"[CITIES] Failed to persist city registry: {str(e)}")
+
+    def get_snapshot(self) -> Dict:
+        """Return the current {'cities': [...], 'validated_at': ...} snapshot."""
+        return self._snapshot
+
+    def revalidate(self) -> Dict:
+        """Validate every registry city against WAQI and publish the result."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return self._snapshot  # A refresh is already running
+
+        try:
+            service = get_live_aqi_service()
+            if not service.is_upstream_available(MAJOR_CITIES[0]):
+                logger.warning("[CITIES] WAQI circuit open, keeping previous city list")
+                return self._snapshot
+
+            def validate(city):
+                res = service.fetch_live_pollution(city)
+                if res and res.get('aqi') is not None:
+                    return city
+                return None
+
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+                results = list(executor.map(validate, MAJOR_CITIES))
+
+            valid_cities = sorted(c for c in results if c)
+            if not valid_cities:
+                logger.warning("[CITIES] Validation returned no cities, keeping previous list")
+                return self._snapshot
+
+            snapshot = {
+                'cities': valid_cities,
+                'validated_at': datetime.utcnow().isoformat() + 'Z',
+            }
+            self._snapshot = snapshot
+            self._persist(snapshot)
+            logger.info(f"[CITIES] Revalidated: {len(valid_cities)}/{len(MAJOR_CITIES)} cities live")
+            return snapshot
+        finally:
+            self._refresh_lock.release()
+
+    def start(self) -> None:
+        """Start the background revalidation loop (idempotent)."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="city-registry-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        # Validate immediately if the persisted result is missing or out of date
+        if not self._is_fresh():
+            self._safe_revalidate()
+        while not self._stop.wait(self.REVALIDATE_INTERVAL):
+            self._safe_revalidate()
+
+    def _safe_revalidate(self) -> None:
+        try:
+            self.revalidate()
+        except Exception as e:
+            logger.error(f"[CITIES] Background revalidation failed: {str(e)}")
+
+    def _is_fresh(self) -> bool:
+        validated_at = self._snapshot.get('validated_at')
+        if not validated_at:
+            return False
+        try:
+            validated = datetime.fromisoformat(validated_at.rstrip('Z'))
+        except ValueError:
+            return False
+        return (datetime.utcnow() - validated).total_seconds() < self.REVALIDATE_INTERVAL
+
+
+# Global singleton instance
+_city_registry = None
+
+
+def get_city_registry() -> CityRegistry:
+    """Get or create the global CityRegistry instance."""
+    global _city_registry
+    if _city_registry is None:
+        _city_registry = CityRegistry()
+    return _city_registry
@@ -0,0 +1,218 @@
+"""
+Classification Cache
+
+Citizens often resubmit the same photo, or a re-saved / resized copy of
+it. The YOLO detection for an image is cached under two keys taken from
+ingestion (IngestedImage):
+- the SHA-256 of the uploaded bytes, for exact resubmissions, and
+- the 64-bit dHash of the decoded pixels, for near-duplicates whose hash
+  is within MAX_DISTANCE bits (Hamming distance).
+
+Near-duplicate lookup uses multi-index hashing: each hash is split into
+BANDS 8-bit bands and indexed per band. Two hashes within MAX_DISTANCE <
+BANDS bits must agree on at least one band (pigeonhole), so only entries
+sharing a band are compared instead of the whole cache.
+
+Entries are appended to a JSON-lines file (Config.CLASSIFICATION_CACHE_PATH)
+and replayed on start-up, so the cache survives restarts. Each entry
+records a fingerprint of the YOLO weights (Config.FIRE_SMOKE_MODEL_PATH)
+that produced it; entries from other weights (a retrained or replaced
+best.pt) are dropped on load instead of being served. Only the YOLO
+result is cached: text classification depends on each report's
+description and is cheap, so it is always recomputed.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def weights_fingerprint(path: Optional[str] = None) -> str:
+    """Short content hash of the YOLO weights file ('missing' when it does not exist)."""
+    path = path or Config.FIRE_SMOKE_MODEL_PATH
+    if not os.path.exists(path):
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class ClassificationCache:
+    """YOLO detections keyed by content hash, with a Hamming-distance perceptual index."""
+
+    MAX_DISTANCE = 4  # dHash bits two images may differ by and still count as the same photo
+    BANDS = 8  # 8-bit bands of the 64-bit dHash (must exceed MAX_DISTANCE)
+
+    def __init__(self, path: Optional[str] = None, max_distance: int = MAX_DISTANCE,
+                 model_fingerprint: Optional[str] = None):
+        if max_distance >= self.BANDS:
+            raise ValueError(f"max_distance must be below {self.BANDS}")
+        # Resolved per instance (not at import), so Config.CLASSIFICATION_CACHE_PATH can be patched
+        self.path = path or Config.CLASSIFICATION_CACHE_PATH
+        self.max_distance = max_distance
+        # Weights the cached detections must come from (read once: the model is loaded once per process)
+        self.model_fingerprint = model_fingerprint or weights_fingerprint()
+        self._lock = threading.Lock()
+        self._exact: Dict[str, Dict] = {}
+        self._dhashes: Dict[str, int] = {}
+        self._bands: List[Dict[int, List[str]]] = [defaultdict(list) for _ in range(self.BANDS)]
+        self._counts = {'lookups': 0, 'exact_hits': 0, 'near_hits': 0, 'misses': 0, 'stored': 0}
+        self._load()
+
+    # ------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        loaded, stale = [], 0
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if entry.get('model') != self.model_fingerprint:
+                        stale += 1
+                        continue
+                    self._index(entry['sha256'], int(entry['dhash'], 16), entry['yolo_detection'])
+                    loaded.append(line if line.endswith('\n') else line + '\n')
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"[CACHE] Skipping unreadable cache line: {str(e)}")
+        if stale:
+            # Detections from other weights will never be served again: drop them from the file
+            logger.info(f"[CACHE] Dropping {stale} entries from other model weights")
+            self._rewrite(loaded)
+        logger.info(f"[CACHE] Loaded {len(loaded)} cached classifications from {self.path}")
+
+    def _rewrite(self, lines: List[str]) -> None:
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"[CACHE] Failed to compact cache file: {str(e)}")
+
+    def _append(self, sha256: str, phash: int, yolo_detection: Dict) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            line = json.dumps({
+                'sha256': sha256,
+                'dhash': f"{phash:016x}",
+                'yolo_detection': yolo_detection,
+                'model': self.model_fingerprint,
+                'cached_at': datetime.utcnow().isoformat() + 'Z',
+            })
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except Exception as e:
+            logger.error(f"[CACHE] Failed to persist cache entry: {str(e)}")
+
+    # ------------------------------------------------------
+    # Index
+    # ------------------------------------------------------
+
+    def _band_keys(self, phash: int):
+        for band in range(self.BANDS):
+            yield band, (phash >> (8 * band)) & 0xFF
+
+    def _index(self, sha256: str, phash: int, yolo_detection: Dict) -> None:
+        if sha256 not in self._exact:
+            for band, key in self._band_keys(phash):
+                self._bands[band][key].append(sha256)
+        self._exact[sha256] = yolo_detection
+        self._dhashes[sha256] = phash
+
+    def _nearest(self, phash: int) -> Optional[str]:
+        best, best_distance = None, self.max_distance + 1
+        seen = set()
+        for band, key in self._band_keys(phash):
+            for sha256 in self._bands[band].get(key, ()):
+                if sha256 in seen:
+                    continue
+                seen.add(sha256)
+                distance = hamming(phash, self._dhashes[sha256])
+                if distance < best_distance:
+                    best, best_distance = sha256, distance
+        return best
+
+    # ------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------
+
+    def lookup(self, sha256: str, phash: int) -> Tuple[Optional[Dict], Optional[str]]:
+        """(cached yolo_detection, 'exact' | 'near'), or (None, None) on a miss."""
+        with self._lock:
+            self._counts['lookups'] += 1
+            if sha256 in self._exact:
+                self._counts['exact_hits'] += 1
+                return self._exact[sha256], 'exact'
+            nearest = self._nearest(phash)
+            if nearest is not None:
+                self._counts['near_hits'] += 1
+                return self._exact[nearest], 'near'
+            self._counts['misses'] += 1
+            return None, None
+
+    def store(self, sha256: str, phash: int, yolo_detection: Dict) -> None:
+        with self._lock:
+            if sha256 in self._exact:
+                return
+            self._index(sha256, phash, yolo_detection)
+            self._counts['stored'] += 1
+            self._append(sha256, phash, yolo_detection)
+
+    def on_classified(self, report: Dict, classification: Dict) -> None:
+        """ClassificationJobQueue result listener: cache real YOLO detections by the report's image hashes."""
+        yolo_detection = classification.get('yolo_detection') or {}
+        # Fallback results (missing model, unreadable image) carry no method and are not cached
+        if yolo_detection.get('method') != 'yolo_v8':
+            return
+        if not report.get('image_sha256') or not report.get('image_dhash'):
+            return
+        self.store(report['image_sha256'], int(report['image_dhash'], 16), yolo_detection)
+
+    def get_stats(self) -> Dict:
+        """Hit counters and hit rates since start-up."""
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._exact)
+        lookups = counts['lookups']
+        return {
+            **counts,
+            'entries': entries,
+            'max_distance': self.max_distance,
+            'model_fingerprint': self.model_fingerprint,
+            'hit_rate': round((counts['exact_hits'] + counts['near_hits']) / lookups, 4) if lookups else None,
+            'exact_hit_rate': round(counts['exact_hits'] / lookups, 4) if lookups else None,
+            'near_hit_rate': round(counts['near_hits'] / lookups, 4) if lookups else None,
+        }
+
+
+# Global singleton instance
+_classification_cache: Optional[ClassificationCache] = None
+
+
+def get_classification_cache() -> ClassificationCache:
+    """Get or create the global ClassificationCache (loaded from disk)."""
+    global _classification_cache
+    if _classification_cache is None:
+        _classification_cache = ClassificationCache()
+    return _classification_cache
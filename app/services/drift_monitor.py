@@ -0,0 +1,281 @@
+"""
+Input Drift Monitor
+
+Tracks how far live model inputs sit from the training distribution.
+For every model input feature, Config.DRIFT_REFERENCE_PATH stores the
+training histogram (decile bin edges and the share of training rows per
+bin, built by training/build_drift_reference.py). Live readings are
+binned against the same edges, per city and nationally, as they are
+buffered (a LiveAQIService reading listener).
+
+Only observed values are binned. An input the reading does not carry
+(a missing pollutant or weather field) is skipped rather than replaced
+by the default or training mean the model would receive, and inputs the
+live path never supplies (violations_7d) report 'not_observed'. Neither
+counts towards a model's max_psi or status.
+
+Memory is bounded: a histogram is a fixed array of bin counts, counts
+are halved once they pass DECAY_AT (so recent readings dominate), and at
+most MAX_CITIES cities are tracked. Binning is a bisect per feature, so a
+reading costs tens of microseconds. PSI and a binned two-sample KS
+statistic are computed from the bin counts on request.
+"""
+
+import os
+import json
+import logging
+import threading
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import Config
+from .anomaly_features import get_anomaly_feature_schema
+from .pollution_reading import PollutionReading
+
+logger = logging.getLogger(__name__)
+
+
+NATIONAL = '*'
+
+
+# Live input rows hold None (or NaN) for values the reading does not supply
+
+
+def _lstm_row(reading: PollutionReading) -> Sequence[Optional[float]]:
+    # The reading's own pollutants and weather, as build_feature_vector_from_reading
+    # (routes/predict.py) passes them through; violations_7d is never in a live reading
+    return (
+        reading.pm25, reading.pm10, reading.no2, reading.co, reading.so2, reading.o3,
+        reading.wind_speed, reading.temperature, reading.humidity,
+        None,
+        float(reading.aqi),
+    )
+
+
+def _risk_row(reading: PollutionReading) -> Sequence[Optional[float]]:
+    # The risk call sites pass violations_7d = 0 and `or`-default the weather
+    return (float(reading.aqi), None, reading.wind_speed, reading.temperature, reading.humidity)
+
+
+def _iso_row(reading: PollutionReading) -> Sequence[float]:
+    return get_anomaly_feature_schema().raw_matrix([reading])[0].tolist()
+
+
+# Model -> (training feature columns, live input row as the model sees it)
+MODEL_FEATURES: Dict[str, Tuple[Tuple[str, ...], Callable[[PollutionReading], Sequence[float]]]] = {
+    'lstm': (
+        ('PM2.5', 'PM10', 'NO2', 'CO', 'SO2', 'O3', 'wind_speed', 'temperature', 'humidity', 'violations_7d', 'AQI'),
+        _lstm_row,
+    ),
+    'risk_model': (('AQI', 'violations_7d', 'wind_speed', 'temperature', 'humidity'), _risk_row),
+    'isolation_forest': (('PM2.5', 'NO2', 'CO', 'SO2', 'O3'), _iso_row),
+}
+
+REFERENCE_QUANTILES = np.linspace(0.1, 0.9, 9)  # Decile edges -> 10 bins
+
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+
+def build_reference(frames: Dict) -> Dict:
+    """
+    Training histograms for every model feature.
+
+    Args:
+        frames: model name -> training DataFrame holding that model's feature columns
+    """
+    reference = {'models': {}}
+    for model, (columns, _) in MODEL_FEATURES.items():
+        df = frames[model]
+        features = {}
+        for column in columns:
+            values = df[column].dropna().to_numpy(dtype=float)
+            edges = np.unique(np.quantile(values, REFERENCE_QUANTILES))
+            counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+            features[column] = {
+                'edges': edges.round(6).tolist(),
+                'proportions': (counts / counts.sum()).round(6).tolist(),
+                'count': int(len(values)),
+            }
+        reference['models'][model] = features
+    return reference
+
+
+def psi(actual: np.ndarray, expected: np.ndarray, eps: float = 1e-4) -> float:
+    """Population stability index between two bin-proportion vectors."""
+    actual = np.clip(actual, eps, None)
+    expected = np.clip(expected, eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def binned_ks(actual: np.ndarray, expected: np.ndarray) -> float:
+    """Two-sample KS statistic evaluated at the bin edges."""
+    return float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected))))
+
+
+class DriftMonitor:
+    """Streaming per-feature histograms of live model inputs."""
+
+    DECAY_AT = 2000  # Halve a histogram's counts once it holds this many readings
+    MIN_SAMPLES = 30  # Readings needed before a feature gets a drift status
+    MAX_CITIES = 500  # Cities with their own histograms (others count nationally only)
+
+    def __init__(self, reference: Dict):
+        # model -> [(feature, edges list, expected proportions)]
+        self._features: Dict[str, List[Tuple[str, List[float], np.ndarray]]] = {}
+        for model, (columns, _) in MODEL_FEATURES.items():
+            features = reference.get('models', {}).get(model)
+            if not features:
+                continue
+            self._features[model] = [
+                (column, list(features[column]['edges']), np.asarray(features[column]['proportions']))
+                for column in columns
+            ]
+        # (model, city) -> bin counts, one array per feature
+        self._histograms: Dict[Tuple[str, str], List[np.ndarray]] = {}
+        self._totals: Dict[Tuple[str, str], float] = {}
+        self._cities = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> 'DriftMonitor':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @property
+    def models(self) -> List[str]:
+        return list(self._features)
+
+    # ------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------
+
+    def _histogram(self, model: str, city: str) -> Optional[List[np.ndarray]]:
+        key = (model, city)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            if city != NATIONAL and city not in self._cities:
+                if len(self._cities) >= self.MAX_CITIES:
+                    return None
+                self._cities.add(city)
+            histogram = self._histograms[key] = [np.zeros(len(edges) + 1) for _, edges, _ in self._features[model]]
+            self._totals[key] = 0.0
+        return histogram
+
+    def record(self, model: str, city: str, row: Sequence[float]) -> None:
+        """Add one live input row (model feature order) to the city and national histograms."""
+        features = self._features.get(model)
+        if features is None:
+            return
+        # (feature index, bin) for the values this row actually observed
+        bins = [
+            (i, bisect_right(edges, value))
+            for i, ((_, edges, _), value) in enumerate(zip(features, row))
+            if value is not None and value == value
+        ]
+        with self._lock:
+            for name in (city, NATIONAL):
+                histogram = self._histogram(model, name)
+                if histogram is None:
+                    continue
+                for i, b in bins:
+                    histogram[i][b] += 1
+                key = (model, name)
+                self._totals[key] += 1
+                if self._totals[key] >= self.DECAY_AT:
+                    for counts in histogram:
+                        counts *= 0.5
+                    self._totals[key] *= 0.5
+
+    def on_reading(self, city: str, reading: PollutionReading) -> None:
+        """LiveAQIService reading listener: record the reading as each model would see it."""
+        for model in self._features:
+            self.record(model, city, MODEL_FEATURES[model][1](reading))
+
+    # ------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------
+
+    def report(self, city: Optional[str] = None, model: Optional[str] = None) -> Dict:
+        """PSI / KS per feature for one city (or nationally), per model."""
+        name = city or NATIONAL
+        models = [model] if model else self.models
+        result = {}
+        for model_name in models:
+            with self._lock:
+                histogram = self._histograms.get((model_name, name))
+                snapshot = [counts.copy() for counts in histogram] if histogram else None
+                total = self._totals.get((model_name, name), 0.0)
+
+            features = {}
+            worst = 0.0
+            scored = False
+            for i, (feature, _, expected) in enumerate(self._features[model_name]):
+                if snapshot is None:
+                    features[feature] = {'status': 'no_data'}
+                    continue
+                observed = snapshot[i].sum()
+                if observed == 0:
+                    features[feature] = {'status': 'not_observed'}
+                    continue
+                if len(expected) == 1:
+                    # Constant in training: every value lands in one bin either way
+                    features[feature] = {'status': 'constant', 'samples': round(observed, 1)}
+                    continue
+                actual = snapshot[i] / observed
+                feature_psi = psi(actual, expected)
+                entry = {
+                    'psi': round(feature_psi, 4),
+                    'ks': round(binned_ks(actual, expected), 4),
+                    'samples': round(observed, 1),
+                    'status': self._status(feature_psi, observed),
+                }
+                if entry['status'] != 'insufficient_data':
+                    worst = max(worst, feature_psi)
+                    scored = True
+                features[feature] = entry
+
+            if snapshot is None:
+                status = 'no_data'
+            elif not scored:
+                status = 'insufficient_data'
+            else:
+                status = self._status(worst, total)
+            result[model_name] = {
+                'samples': round(total, 1),
+                'max_psi': round(worst, 4),
+                'status': status,
+                'features': features,
+            }
+        return {'city': city or 'national', 'models': result}
+
+    def _status(self, value: float, samples: float) -> str:
+        if samples < self.MIN_SAMPLES:
+            return 'insufficient_data'
+        if value >= PSI_SIGNIFICANT:
+            return 'significant_drift'
+        if value >= PSI_MODERATE:
+            return 'moderate_drift'
+        return 'stable'
+
+    def tracked_cities(self) -> List[str]:
+        with self._lock:
+            return sorted(self._cities)
+
+
+# Global singleton instance
+_drift_monitor = None
+
+
+def get_drift_monitor() -> DriftMonitor:
+    """Get or create the global DriftMonitor (empty reference if none was built)."""
+    global _drift_monitor
+    if _drift_monitor is None:
+        if os.path.exists(Config.DRIFT_REFERENCE_PATH):
+            _drift_monitor = DriftMonitor.from_file(Config.DRIFT_REFERENCE_PATH)
+        else:
+            logger.warning(f"[DRIFT] No reference histograms at {Config.DRIFT_REFERENCE_PATH}")
+            _drift_monitor = DriftMonitor({})
+    return _drift_monitor
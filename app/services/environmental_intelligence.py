@@ -10,7 +10,11 @@ Provides advanced AI-driven environmental analysis including:
 
 import numpy as np
 import logging
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from .pollution_reading import PollutionReading
+from .recommendation_rules import get_recommendation_engine
+from .risk_state import CityRiskState, RollingTrend
 
 logger = logging.getLogger(__name__)
 
@@ -21,47 +25,67 @@ class EnvironmentalIntelligence:
     and AI-driven heuristics.
     """
 
+    # Dominant pollutant -> (source type, description)
+    POLLUTION_SOURCES = {
+        'pm25': ('Combustion-driven', 'High PM2.5 indicates combustion sources (vehicles, industry, biomass burning)'),
+        'pm10': ('Dust-driven', 'High PM10 suggests dust resuspension, construction, or natural sources'),
+        'no2': ('Traffic-driven', 'Elevated NO2 strongly indicates vehicular traffic emissions'),
+        'so2': ('Industrial-driven', 'High SO2 points to industrial emissions or power generation'),
+        'o3': ('Photochemical', 'Ozone levels indicate secondary photochemical formation from NOx+VOC'),
+        'co': ('Vehicle-driven', 'Elevated CO indicates incomplete combustion from traffic or heating'),
+    }
+
+    TREND_WINDOW = 12  # Readings in the rolling PM2.5 / AQI statistics
+
     def __init__(self):
         """Initialize intelligence engine."""
+        # city -> latest CityRiskState (swapped atomically, read without locks)
+        self._city_states: Dict[str, CityRiskState] = {}
+        # city -> (pm25 trend, aqi trend); mutated only by the reading listener
+        self._city_trends: Dict[str, Tuple[RollingTrend, RollingTrend]] = {}
         logger.info("✅ Environmental Intelligence Service initialized")
 
-    def compute_environmental_context(self, reading: Dict) -> Dict:
+    def compute_environmental_context(self, reading: PollutionReading) -> Dict:
         """
         Build a comprehensive environmental context object from live reading.
         
         Args:
-            reading: Live pollution + weather data from WAQI API
+            reading: Live pollution + weather reading from WAQI API
+                (legacy reading dicts are converted)
             
         Returns:
             Structured environmental context with all derived metrics
         """
+        if not isinstance(reading, PollutionReading):
+            reading = PollutionReading.from_dict(reading)
+
         context = {
-            'aqi': float(reading.get('aqi') or 0),
+            'aqi': float(reading.aqi or 0),
             'pollutants': {
-                'pm25': reading.get('pm25'),
-                'pm10': reading.get('pm10'),
-                'no2': reading.get('no2'),
-                'so2': reading.get('so2'),
-                'o3': reading.get('o3'),
-                'co': reading.get('co'),
-                'dominant': reading.get('dominantpol'),
+                'pm25': reading.pm25,
+                'pm10': reading.pm10,
+                'no2': reading.no2,
+                'so2': reading.so2,
+                'o3': reading.o3,
+                'co': reading.co,
+                'dominant': reading.dominantpol,
             },
             'weather': {
-                'temperature': reading.get('temperature'),
-                'humidity': reading.get('humidity'),
-                'pressure': reading.get('pressure'),
-                'wind_speed': reading.get('wind_speed'),
-                'wind_direction': reading.get('wind_direction'),
-                'wind_gust': reading.get('wind_gust'),
-                'dew_point': reading.get('dew_point'),
+                'temperature': reading.temperature,
+                'humidity': reading.humidity,
+                'pressure': reading.pressure,
+                'wind_speed': reading.wind_speed,
+                'wind_direction': reading.wind_direction,
+                'wind_gust': reading.wind_gust,
+                'dew_point': reading.dew_point,
             },
             'forecast': {
-                'pm25_avg_3d': reading.get('forecast_pm25_avg'),
-                'pm10_avg_3d': reading.get('forecast_pm10_avg'),
-                'uvi_avg_3d': reading.get('forecast_uvi_avg'),
+                'pm25_avg_3d': reading.forecast_pm25_avg,
+                'pm10_avg_3d': reading.forecast_pm10_avg,
+                'uvi_avg_3d': reading.forecast_uvi_avg,
             },
-            'timestamp': reading.get('timestamp'),
-            'station': reading.get('station'),
+            'timestamp': reading.timestamp,
+            'station': reading.station,
         }
         return context
 
@@ -78,7 +102,23 @@ class EnvironmentalIntelligence:
         Returns:
             Tuple of (risk_score 0-100, risk_category, escalation_probability)
         """
+        composite_score, category, escalation_prob, pollution_risk, stagnation_risk, forecast_risk = \
+            self._score_components(context)
+        
+        logger.info(
+            f"[RISK] Composite: {composite_score:.1f} ({category}), "
+            f"Pollution: {pollution_risk:.1f}, Stagnation: {stagnation_risk:.1f}, "
+            f"Forecast: {forecast_risk:.1f}, Escalation: {escalation_prob*100:.1f}%"
+        )
         
+        return int(composite_score), category, float(escalation_prob)
+
+    def _score_components(self, context: Dict) -> Tuple[float, str, float, float, float, float]:
+        """
+        Returns:
+            Tuple of (composite_score, category, escalation_prob,
+            pollution_risk, stagnation_risk, forecast_risk)
+        """
         # 1. Pollution Risk (50% weight)
         pollution_risk = self._compute_pollution_risk(context['pollutants'], context['aqi'])
         
@@ -112,13 +152,7 @@ class EnvironmentalIntelligence:
         else:
             category = "Critical"
         
-        logger.info(
-            f"[RISK] Composite: {composite_score:.1f} ({category}), "
-            f"Pollution: {pollution_risk:.1f}, Stagnation: {stagnation_risk:.1f}, "
-            f"Forecast: {forecast_risk:.1f}, Escalation: {escalation_prob*100:.1f}%"
-        )
-        
-        return int(composite_score), category, float(escalation_prob)
+        return composite_score, category, float(escalation_prob), pollution_risk, stagnation_risk, forecast_risk
 
     def _compute_pollution_risk(self, pollutants: Dict, aqi: float) -> float:
         """Compute pollution risk component (0-100)."""
@@ -218,16 +252,7 @@ class EnvironmentalIntelligence:
         """
         dominant = context['pollutants'].get('dominant')
         
-        source_map = {
-            'pm25': ('Combustion-driven', 'High PM2.5 indicates combustion sources (vehicles, industry, biomass burning)'),
-            'pm10': ('Dust-driven', 'High PM10 suggests dust resuspension, construction, or natural sources'),
-            'no2': ('Traffic-driven', 'Elevated NO2 strongly indicates vehicular traffic emissions'),
-            'so2': ('Industrial-driven', 'High SO2 points to industrial emissions or power generation'),
-            'o3': ('Photochemical', 'Ozone levels indicate secondary photochemical formation from NOx+VOC'),
-            'co': ('Vehicle-driven', 'Elevated CO indicates incomplete combustion from traffic or heating'),
-        }
-        
-        source, description = source_map.get(dominant, ('Mixed-source', 'No dominant pollutant identified'))
+        source, description = self.POLLUTION_SOURCES.get(dominant, ('Mixed-source', 'No dominant pollutant identified'))
         
         logger.info(f"[SOURCE] {source}: {description}")
         return source, description
@@ -261,90 +286,213 @@ class EnvironmentalIntelligence:
         
         return None
 
-    def generate_government_recommendations(self, context: Dict, risk_category: str) -> list:
+    # ======================================================
+    # INCREMENTAL PER-CITY STATE
+    # ======================================================
+
+    def update_city_state(self, city: str, reading: PollutionReading) -> CityRiskState:
+        """
+        Recompute a city's derived risk state for a new reading.
+        Registered as a LiveAQIService reading listener, so it runs once per
+        buffered reading, serialised per city by the service's lock stripe.
+        """
+        context = self.compute_environmental_context(reading)
+        composite_score, category, escalation_prob, pollution_risk, stagnation_risk, forecast_risk = \
+            self._score_components(context)
+
+        trends = self._city_trends.get(city)
+        if trends is None:
+            trends = self._city_trends[city] = (RollingTrend(self.TREND_WINDOW), RollingTrend(self.TREND_WINDOW))
+        pm25_trend, aqi_trend = trends
+        pm25_trend.add(reading.ts, reading.pm25)
+        aqi_trend.add(reading.ts, float(reading.aqi))
+
+        state = CityRiskState(
+            city=city,
+            reading=reading,
+            context=context,
+            risk_score=int(composite_score),
+            risk_category=category,
+            escalation_probability=escalation_prob,
+            pollution_risk=pollution_risk,
+            stagnation_risk=stagnation_risk,
+            forecast_risk=forecast_risk,
+            early_warning=self.detect_early_warning(context),
+            pm25_trend_per_hour=pm25_trend.slope_per_hour,
+            pm25_mean=pm25_trend.mean,
+            aqi_mean=aqi_trend.mean,
+            samples=aqi_trend.count,
+        )
+        self._city_states[city] = state
+        logger.debug(f"[STATE] {city}: {state.risk_score} ({category})")
+        return state
+
+    def get_city_state(self, city: str) -> Optional[CityRiskState]:
+        """Latest precomputed risk state for a city, or None if no reading was buffered."""
+        return self._city_states.get(city)
+
+    def tracked_cities(self) -> List[str]:
+        """Cities with a precomputed risk state."""
+        return list(self._city_states)
+
+    def clear_city_state(self, city: str) -> None:
+        self._city_states.pop(city, None)
+        self._city_trends.pop(city, None)
+
+    # ======================================================
+    # BATCH (COLUMNAR) SCORING
+    # ======================================================
+
+    RISK_CATEGORIES = np.array(["Low", "Moderate", "High", "Critical"], dtype=object)
+
+    @staticmethod
+    def contexts_to_columns(contexts: List[Dict]) -> Dict[str, np.ndarray]:
+        """
+        Convert a list of environmental contexts into the float columns taken
+        by compute_risk_batch. Missing values (None) become NaN.
+        """
+        def column(section, key):
+            return np.array([c[section].get(key) for c in contexts], dtype=float)
+
+        return {
+            'aqi': np.array([c['aqi'] for c in contexts], dtype=float),
+            'pm25': column('pollutants', 'pm25'),
+            'pm10': column('pollutants', 'pm10'),
+            'no2': column('pollutants', 'no2'),
+            'wind_speed': column('weather', 'wind_speed'),
+            'humidity': column('weather', 'humidity'),
+            'pressure': column('weather', 'pressure'),
+            'forecast_pm25': column('forecast', 'pm25_avg_3d'),
+        }
+
+    @staticmethod
+    def readings_to_columns(readings: List[PollutionReading]) -> Dict[str, np.ndarray]:
+        """
+        Same columns as contexts_to_columns, read straight from PollutionReading
+        records (skips building a context dict per reading).
+        """
+        def column(name):
+            return np.array([getattr(r, name) for r in readings], dtype=float)
+
+        return {
+            'aqi': np.array([r.aqi or 0 for r in readings], dtype=float),
+            'pm25': column('pm25'),
+            'pm10': column('pm10'),
+            'no2': column('no2'),
+            'wind_speed': column('wind_speed'),
+            'humidity': column('humidity'),
+            'pressure': column('pressure'),
+            'forecast_pm25': column('forecast_pm25_avg'),
+        }
+
+    def compute_risk_batch(self, aqi, pm25=None, pm10=None, no2=None, wind_speed=None,
+                           humidity=None, pressure=None, forecast_pm25=None) -> Dict[str, np.ndarray]:
         """
-        Generate dynamic, data-driven government recommendations.
+        Columnar equivalent of compute_composite_risk_score + detect_early_warning
+        for N readings (cities, stations or a historical series).
+
+        Every argument is an array-like of length N; NaN (or None) marks a
+        missing value exactly like None does in the scalar path. Results match
+        the scalar methods element for element.
+
+        Returns:
+            Dict of arrays: risk_score (int), risk_category (str),
+            escalation_probability, pollution_risk, stagnation_risk,
+            forecast_risk, early_warning (bool), early_warning_severity (int)
+        """
+        aqi = np.nan_to_num(np.asarray(aqi, dtype=float), nan=0.0)
+        n = aqi.shape[0]
+
+        def col(values):
+            if values is None:
+                return np.full(n, np.nan)
+            return np.asarray(values, dtype=float)
+
+        pm25_raw = col(pm25)
+        forecast_pm25 = col(forecast_pm25)
+        # Scalar path uses `value or 0` for these inputs
+        pm25_0 = np.nan_to_num(pm25_raw, nan=0.0)
+        pm10_0 = np.nan_to_num(col(pm10), nan=0.0)
+        no2_0 = np.nan_to_num(col(no2), nan=0.0)
+        wind_0 = np.nan_to_num(col(wind_speed), nan=0.0)
+        humidity_0 = np.nan_to_num(col(humidity), nan=0.0)
+        pressure_0 = np.nan_to_num(col(pressure), nan=0.0)
+
+        # 1. Pollution risk (see _compute_pollution_risk)
+        pollution_risk = np.minimum(100, (
+            np.minimum(100, (aqi / 500) * 100)
+            + np.minimum(30, (pm25_0 / 300) * 30)
+            + np.minimum(15, (pm10_0 / 500) * 15)
+            + np.minimum(20, (no2_0 / 200) * 20)
+        ))
+
+        # 2. Stagnation risk (see _compute_stagnation_risk)
+        stagnation_risk = np.select([wind_0 < 1.5, wind_0 < 3.0], [40.0, 20.0], 0.0)
+        stagnation_risk += np.where((humidity_0 > 70) & (wind_0 < 2.0), 25, 0)
+        stagnation_risk += np.where(pressure_0 > 1010, 20, 0)
+        stagnation_risk += np.where(humidity_0 > 80, 15, 0)
+        stagnation_risk = np.clip(stagnation_risk, 0, 100)
+
+        # 3. Forecast risk (see _compute_forecast_risk)
+        has_forecast = ~np.isnan(forecast_pm25) & ~np.isnan(pm25_raw)
+        trend_diff = forecast_pm25 - pm25_raw
+        with np.errstate(invalid='ignore'):
+            conditions = [~has_forecast, trend_diff > 20, trend_diff > 10, trend_diff > 0]
+        forecast_risk = np.select(conditions, [25.0, 60.0, 40.0, 20.0], 10.0)
+        escalation_prob = np.select(conditions, [0.2, 0.7, 0.5, 0.3], 0.1)
+
+        composite = np.clip(
+            0.50 * pollution_risk + 0.25 * stagnation_risk + 0.25 * forecast_risk, 0, 100
+        )
+        category_index = np.select([composite < 25, composite < 50, composite < 75], [0, 1, 2], 3)
+
+        # Early warning (see detect_early_warning)
+        with np.errstate(invalid='ignore'):
+            early_warning = (wind_0 < 1.0) & (pm25_0 > 50) & (forecast_pm25 > pm25_0)
+        severity = np.where(
+            early_warning,
+            np.minimum(100, np.trunc(np.nan_to_num((forecast_pm25 / 300) * 100))),
+            0,
+        ).astype(int)
+
+        return {
+            'risk_score': np.trunc(composite).astype(int),
+            'risk_category': self.RISK_CATEGORIES[category_index],
+            'escalation_probability': escalation_prob,
+            'pollution_risk': pollution_risk,
+            'stagnation_risk': stagnation_risk,
+            'forecast_risk': forecast_risk,
+            'early_warning': early_warning,
+            'early_warning_severity': severity,
+        }
+
+    def generate_government_recommendations(self, context: Dict, risk_category: str,
+                                            limit: Optional[int] = None) -> list:
+        """
+        Generate dynamic, data-driven government recommendations from the
+        rule table (see recommendation_rules.py).
         
         Args:
             context: Environmental context
             risk_category: Current risk category (Low/Moderate/High/Critical)
+            limit: Stop after this many recommendations (rule order)
             
         Returns:
             List of recommendation dictionaries with action, reason, priority
         """
-        recommendations = []
-        
-        pollutants = context['pollutants']
-        weather = context['weather']
-        aqi = context['aqi']
-        pm25 = pollutants.get('pm25') or 0
-        pm10 = pollutants.get('pm10') or 0
-        no2 = pollutants.get('no2') or 0
-        so2 = pollutants.get('so2') or 0
-        wind_speed = weather.get('wind_speed') or 0
-        humidity = weather.get('humidity') or 0
-        
-        # Priority levels
-        priority_map = {"Critical": 1, "High": 2, "Moderate": 3, "Low": 4}
-        base_priority = priority_map.get(risk_category, 4)
-        
-        # Traffic-related recommendations
-        if no2 > 80 or pm25 > 150:
-            recommendations.append({
-                'action': 'Implement traffic restrictions in hotspot zones',
-                'reason': f'NO2={no2:.1f} ppb indicates heavy traffic; PM2.5={pm25:.1f} µg/m³ poses health risk',
-                'priority': base_priority,
-                'time_horizon': 'Immediate',
-            })
-        
-        # Dust control
-        if pm10 > 200 and wind_speed < 2.0:
-            recommendations.append({
-                'action': 'Deploy water spraying vehicles in high-pollution zones',
-                'reason': f'PM10={pm10:.1f} µg/m³ with low wind speed ({wind_speed:.1f} m/s) allows dust accumulation',
-                'priority': base_priority,
-                'time_horizon': '2-4 hours',
-            })
-        
-        # Industrial audit
-        if so2 > 30:
-            recommendations.append({
-                'action': 'Conduct emergency industrial pollution audit',
-                'reason': f'SO2={so2:.1f} ppb exceeds safe levels; likely industrial source',
-                'priority': base_priority - 1 if base_priority > 1 else 1,
-                'time_horizon': '24 hours',
-            })
-        
-        # Construction halt
-        if wind_speed < 1.0 and aqi > 200:
-            recommendations.append({
-                'action': 'Halt construction activities in stagnant air conditions',
-                'reason': f'Wind speed={wind_speed:.1f} m/s + AQI={aqi} creates critical environment',
-                'priority': base_priority,
-                'time_horizon': 'Immediate',
-            })
-        
-        # Health/respiratory alert
-        if pm25 > 100 and humidity > 70:
-            recommendations.append({
-                'action': 'Issue respiratory health alert; increase medical preparedness',
-                'reason': f'High PM2.5={pm25:.1f} + humidity={humidity:.0f}% increases respiratory risk',
-                'priority': base_priority,
-                'time_horizon': 'Immediate',
-            })
-        
-        # School/event closures
-        if aqi > 250:
-            recommendations.append({
-                'action': 'Consider closing schools and outdoor events',
-                'reason': f'AQI={aqi} reaches hazardous levels; vulnerable groups at severe risk',
-                'priority': 1,
-                'time_horizon': 'Immediate',
-            })
-        
+        recommendations = get_recommendation_engine().recommend(context, risk_category, limit)
         logger.info(f"[RECOMMENDATIONS] Generated {len(recommendations)} actions for {risk_category} risk")
         return recommendations
 
+    def generate_government_recommendations_batch(self, contexts: List[Dict], risk_categories: List[str],
+                                                  limit: Optional[int] = None) -> List[list]:
+        """
+        Recommendations for many contexts with one vectorised rule pass.
+        Element i equals generate_government_recommendations(contexts[i], risk_categories[i], limit).
+        """
+        engine = get_recommendation_engine()
+        return engine.recommend_batch(engine.columns_from_contexts(contexts), risk_categories, limit)
+
     def generate_health_tip(self, context: Dict, risk_category: str) -> str:
         """
         Generate a concise, health-focused tip for citizens.
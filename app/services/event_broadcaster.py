@@ -0,0 +1,284 @@
+"""
+Live Event Broadcaster
+
+In-process fan-out of live events (new readings, risk-category changes,
+early warnings) to Server-Sent Events subscribers of /api/stream.
+
+Events are produced once per buffered reading by a LiveAQIService
+reading listener and copied into every interested subscriber's bounded
+queue. A slow client never blocks producers or other clients: when its
+queue is full the oldest event is dropped and counted.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .city_registry import get_city_registry
+from .environmental_intelligence import get_environmental_intelligence
+from .live_aqi_service import get_live_aqi_service
+from .pollution_reading import PollutionReading
+
+logger = logging.getLogger(__name__)
+
+
+class LiveEvent:
+    """One event, serialised once and shared by all subscribers."""
+
+    __slots__ = ('event_id', 'event_type', 'city', 'data', 'payload')
+
+    def __init__(self, event_id: int, event_type: str, city: str, data: Dict):
+        self.event_id = event_id
+        self.event_type = event_type
+        self.city = city
+        self.data = data
+        self.payload = f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    """Bounded per-client event queue (drop-oldest when full)."""
+
+    def __init__(self, cities: Optional[FrozenSet[str]], max_queue: int):
+        self.cities = cities  # None means every city
+        self._events = deque(maxlen=max_queue)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def wants(self, city: str) -> bool:
+        return self.cities is None or city in self.cities
+
+    def put(self, event: LiveEvent) -> None:
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: float) -> Optional[LiveEvent]:
+        """Next event, or None after `timeout` seconds (or once closed)."""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class EventBroadcaster:
+    """Turns buffered readings into live events and fans them out."""
+
+    MAX_QUEUE = 100  # Events buffered per client before the oldest are dropped
+
+    def __init__(self):
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._subscribe_lock = threading.Lock()
+        self._event_ids = iter(range(1, 1 << 62))
+        self._id_lock = threading.Lock()
+        # city -> (risk category, early warning alert level) of the last event
+        self._last_status: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self.published = 0
+
+    # ------------------------------------------------------
+    # Subscribers
+    # ------------------------------------------------------
+
+    def subscribe(self, cities: Optional[FrozenSet[str]] = None, max_queue: int = MAX_QUEUE) -> Subscription:
+        subscription = Subscription(cities, max_queue)
+        with self._subscribe_lock:
+            self._subscribers = self._subscribers + (subscription,)
+        logger.info(f"[STREAM] Subscriber added ({len(self._subscribers)} active)")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        with self._subscribe_lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+        logger.info(f"[STREAM] Subscriber removed ({len(self._subscribers)} active)")
+
+    def subscribed_cities(self) -> Optional[FrozenSet[str]]:
+        """Union of cities wanted by subscribers (None if any subscriber wants all)."""
+        cities = set()
+        for subscription in self._subscribers:
+            if subscription.cities is None:
+                return None
+            cities |= subscription.cities
+        return frozenset(cities)
+
+    def get_stats(self) -> Dict:
+        subscribers = self._subscribers
+        return {
+            'subscribers': len(subscribers),
+            'events_published': self.published,
+            'events_dropped': sum(s.dropped for s in subscribers),
+        }
+
+    # ------------------------------------------------------
+    # Producing events
+    # ------------------------------------------------------
+
+    def _next_id(self) -> int:
+        with self._id_lock:
+            self.published += 1
+            return next(self._event_ids)
+
+    def publish(self, event_type: str, city: str, data: Dict) -> LiveEvent:
+        event = LiveEvent(self._next_id(), event_type, city, data)
+        for subscription in self._subscribers:
+            if subscription.wants(city):
+                subscription.put(event)
+        return event
+
+    @staticmethod
+    def reading_event_data(city: str, reading: PollutionReading, state=None) -> Dict:
+        data = {
+            'city': city,
+            'aqi': reading.aqi,
+            'pm25': reading.pm25,
+            'pm10': reading.pm10,
+            'dominant_pollutant': reading.dominantpol,
+            'timestamp': reading.timestamp,
+        }
+        if state is not None:
+            data.update({
+                'risk_score': state.risk_score,
+                'risk_level': state.risk_category,
+                'escalation_probability': round(state.escalation_probability * 100, 1),
+            })
+        return data
+
+    def on_reading(self, city: str, reading: PollutionReading) -> None:
+        """
+        LiveAQIService reading listener. Registered after
+        EnvironmentalIntelligence.update_city_state, so the city's risk
+        state already reflects this reading.
+        """
+        state = get_environmental_intelligence().get_city_state(city)
+        if state is not None and not state.matches(reading):
+            state = None
+
+        self.publish('reading', city, self.reading_event_data(city, reading, state))
+        if state is None:
+            return
+
+        category = state.risk_category
+        alert_level = state.early_warning[0] if state.early_warning else None
+        previous_category, previous_alert = self._last_status.get(city, (None, None))
+        self._last_status[city] = (category, alert_level)
+
+        if previous_category is not None and category != previous_category:
+            self.publish('risk_change', city, {
+                'city': city,
+                'previous_level': previous_category,
+                'risk_level': category,
+                'risk_score': state.risk_score,
+                'timestamp': reading.timestamp,
+            })
+
+        if alert_level is not None and alert_level != previous_alert:
+            self.publish('early_warning', city, {
+                'city': city,
+                'alert_level': alert_level,
+                'severity': state.early_warning[1],
+                'risk_level': category,
+                'timestamp': reading.timestamp,
+            })
+
+    def snapshot_events(self, cities: Optional[FrozenSet[str]]) -> List[str]:
+        """SSE payloads describing the current state of the requested cities."""
+        intelligence = get_environmental_intelligence()
+        names = cities if cities is not None else intelligence.tracked_cities()
+        payloads = []
+        for city in sorted(names):
+            state = intelligence.get_city_state(city)
+            if state is not None:
+                data = self.reading_event_data(city, state.reading, state)
+                payloads.append(f"event: snapshot\ndata: {json.dumps(data)}\n\n")
+        return payloads
+
+
+class LivePoller:
+    """
+    Background poller feeding the stream: refreshes the cities that stream
+    subscribers watch once per polling cycle (LiveAQIService.BUFFER_TIMEOUT).
+    Every refresh goes through fetch_and_buffer, so the reading listeners
+    (risk state, broadcaster) see it like any other buffered reading.
+
+    Cities whose buffer is still fresh are skipped, and wakes (one per new
+    subscriber) are coalesced to at most one early poll per
+    MIN_WAKE_INTERVAL, so reconnecting clients do not turn into WAQI sweeps.
+    """
+
+    MIN_WAKE_INTERVAL = 10  # Seconds between polls triggered by wake()
+
+    def __init__(self, broadcaster: EventBroadcaster, interval: Optional[float] = None):
+        self.broadcaster = broadcaster
+        self.service = get_live_aqi_service()
+        self.interval = interval if interval is not None else self.service.BUFFER_TIMEOUT
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.last_poll: Optional[float] = None
+
+    def start(self) -> None:
+        """Start the poll loop (idempotent)."""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-stream-poller", daemon=True)
+                self._thread.start()
+
+    def wake(self) -> None:
+        """Poll now instead of waiting for the next cycle (e.g. a new subscriber)."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            woken = self._wake.wait(self.interval)
+            if woken and self.last_poll is not None:
+                # Wakes arriving during the delay are served by the same poll
+                delay = self.last_poll + self.MIN_WAKE_INTERVAL - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            self._wake.clear()
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"[STREAM] Poll failed: {str(e)}")
+
+    def poll_once(self) -> int:
+        """Fetch and buffer every watched city without a fresh reading; returns the number polled."""
+        cities = self.broadcaster.subscribed_cities()
+        if cities is None:
+            cities = get_city_registry().get_snapshot()['cities']
+        stale = [city for city in sorted(cities) if not self.service.is_buffer_fresh(city)]
+        for city in stale:
+            self.service.fetch_and_buffer(city)
+        self.last_poll = time.time()
+        return len(stale)
+
+
+# Global singleton instances
+_event_broadcaster = None
+_live_poller = None
+
+
+def get_event_broadcaster() -> EventBroadcaster:
+    """Get or create the global EventBroadcaster instance."""
+    global _event_broadcaster
+    if _event_broadcaster is None:
+        _event_broadcaster = EventBroadcaster()
+    return _event_broadcaster
+
+
+def get_live_poller() -> LivePoller:
+    """Get or create the global LivePoller instance."""
+    global _live_poller
+    if _live_poller is None:
+        _live_poller = LivePoller(get_event_broadcaster())
+    return _live_poller
@@ -0,0 +1,154 @@
+"""
+Upload Ingestion
+
+Reads an uploaded image from the request stream once and decodes it
+once. The file type is taken from its magic bytes (not the filename),
+dimensions are checked from the header before any pixels are decoded,
+and JPEGs are decoded straight to roughly the detector's input size with
+PIL draft mode (DCT scaling), so a 12 MP photo never exists at full
+resolution in memory.
+
+The resulting IngestedImage carries the raw bytes and the decoded pixels,
+and every consumer works from those buffers: the content and perceptual
+hashes, the thumbnail, the storage writer (raw bytes, no re-encode) and
+YOLO (the pixel array). Nothing re-reads or re-decodes the file.
+"""
+
+import io
+import hashlib
+import logging
+from typing import IO, Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+# (magic bytes, stored file extension, PIL format)
+MAGIC_NUMBERS = (
+    (b'\xff\xd8\xff', 'jpg', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'png', 'PNG'),
+    (b'GIF87a', 'gif', 'GIF'),
+    (b'GIF89a', 'gif', 'GIF'),
+)
+
+MAX_UPLOAD_BYTES = 16 * 1024 * 1024
+MIN_SIDE = 16  # Pixels; anything smaller cannot show a violation
+MAX_PIXELS = 50_000_000  # Header-declared size limit (decompression bomb guard)
+DETECTOR_SIZE = 640  # YOLOv8 input size; larger images are downscaled to this on decode
+THUMBNAIL_SIZE = 256
+DHASH_SIZE = 8  # dHash grid -> 64-bit perceptual hash
+
+
+class ImageRejected(ValueError):
+    """Upload is not an acceptable image (type, size or corrupt data)."""
+
+
+def sniff_format(data: bytes) -> Optional[tuple]:
+    """(extension, PIL format) from the leading magic bytes, or None."""
+    for magic, extension, pil_format in MAGIC_NUMBERS:
+        if data.startswith(magic):
+            return extension, pil_format
+    return None
+
+
+class IngestedImage:
+    """One upload: raw bytes, decoded (detector-sized) RGB pixels and their shared derivatives."""
+
+    __slots__ = ('data', 'extension', 'width', 'height', 'pixels', '_sha256', '_dhash')
+
+    def __init__(self, data: bytes, extension: str, width: int, height: int, pixels: np.ndarray):
+        self.data = data
+        self.extension = extension
+        self.width = width  # Original dimensions
+        self.height = height
+        self.pixels = pixels  # RGB, at most DETECTOR_SIZE on the long side
+        self._sha256: Optional[str] = None
+        self._dhash: Optional[int] = None
+
+    @property
+    def sha256(self) -> str:
+        """Hex digest of the uploaded bytes."""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+    @property
+    def dhash(self) -> int:
+        """64-bit difference hash of the decoded pixels (near-duplicates differ in a few bits)."""
+        if self._dhash is None:
+            self._dhash = dhash(self.pixels)
+        return self._dhash
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """Pixels in the channel order ultralytics expects for arrays (a view, no copy)."""
+        return self.pixels[..., ::-1]
+
+    def write(self, path: str) -> None:
+        """Store the upload exactly as received."""
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+    def thumbnail(self, size: int = THUMBNAIL_SIZE) -> bytes:
+        """JPEG thumbnail built from the already-decoded pixels."""
+        im = Image.fromarray(self.pixels)
+        im.thumbnail((size, size), Image.BILINEAR)
+        out = io.BytesIO()
+        im.save(out, format='JPEG', quality=80)
+        return out.getvalue()
+
+    def write_thumbnail(self, path: str, size: int = THUMBNAIL_SIZE) -> None:
+        with open(path, 'wb') as f:
+            f.write(self.thumbnail(size))
+
+
+def dhash(pixels: np.ndarray, hash_size: int = DHASH_SIZE) -> int:
+    """Difference hash: brighter-than-right-neighbour bits of a (hash_size+1 x hash_size) grey thumbnail."""
+    grey = Image.fromarray(pixels).convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    cells = np.asarray(grey, dtype=np.int16)
+    bits = (cells[:, 1:] > cells[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def ingest_image(stream: IO[bytes], max_bytes: int = MAX_UPLOAD_BYTES,
+                 target_size: int = DETECTOR_SIZE) -> IngestedImage:
+    """
+    Read and decode an upload once.
+
+    Raises:
+        ImageRejected: unknown type, too large, too small or undecodable
+    """
+    data = stream.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ImageRejected(f'Image larger than {max_bytes // (1024 * 1024)} MB')
+
+    sniffed = sniff_format(data)
+    if sniffed is None:
+        raise ImageRejected('File is not a JPEG, PNG or GIF image')
+    extension, pil_format = sniffed
+
+    try:
+        # Opening only parses the header; pixels are decoded by load()/convert()
+        im = Image.open(io.BytesIO(data), formats=[pil_format])
+        width, height = im.size
+        if min(width, height) < MIN_SIDE:
+            raise ImageRejected(f'Image is {width}x{height}, smaller than {MIN_SIDE}px')
+        if width * height > MAX_PIXELS:
+            raise ImageRejected(f'Image is {width}x{height}, larger than {MAX_PIXELS} pixels')
+
+        if pil_format == 'JPEG':
+            # Decode at the smallest DCT scale (1/2, 1/4, 1/8) still >= target_size
+            im.draft('RGB', (target_size, target_size))
+        im = im.convert('RGB')
+        if max(im.size) > target_size:
+            im.thumbnail((target_size, target_size), Image.BILINEAR)
+        pixels = np.asarray(im)
+    except ImageRejected:
+        raise
+    except Exception as e:
+        raise ImageRejected(f'Could not decode image: {str(e)}')
+
+    logger.info(f"[INGEST] {pil_format} {width}x{height} -> {pixels.shape[1]}x{pixels.shape[0]}, {len(data)} bytes")
+    return IngestedImage(data, extension, width, height, pixels)
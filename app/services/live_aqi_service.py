@@ -7,11 +7,16 @@ for LSTM sequence generation and anomaly detection.
 
 import requests
 import logging
+import threading
+import time
 from datetime import datetime
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Optional, Tuple
 import numpy as np
 
+from .circuit_breaker import CircuitBreakerRegistry
+from .pollution_reading import PollutionReading
+from .tiered_history import HistoryBucket, TieredHistory
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,6 +25,10 @@ class LiveAQIService:
     """
     Service to fetch and manage live pollution data from WAQI API.
     Maintains rolling buffer of last 24 readings per city for time-series predictions.
+
+    Per-city state is copy-on-write: writers build a new immutable tuple under
+    the city's lock stripe and swap the reference in, so readers always get a
+    consistent snapshot without taking a lock.
     """
 
     # WAQI API Token (set via environment variable or hardcoded for demo)
@@ -30,13 +39,42 @@ class LiveAQIService:
     MAX_BUFFER_SIZE = 24  # Last 24 readings
     BUFFER_TIMEOUT = 300  # Refresh buffer every 5 minutes (in seconds)
 
+    # Circuit breaker configuration
+    UPSTREAM_NAME = "waqi"
+    REQUEST_TIMEOUT = 5  # Seconds per WAQI call
+    BREAKER_FAILURE_THRESHOLD = 3  # Consecutive failures before opening
+    BREAKER_RESET_TIMEOUT = 30  # Seconds an open breaker waits before a probe
+    PROBE_INTERVAL = 5  # Seconds between background probe sweeps
+    MAX_FAILED_PROBES = 10  # Failed probes before a city's breaker is dropped (unknown/invalid city)
+    MAX_BREAKERS = 500  # Per-city breakers kept at once
+
+    # Number of lock stripes guarding per-city state
+    LOCK_STRIPES = 16
+
     def __init__(self):
         """Initialize the live AQI service with empty buffers."""
-        self.city_buffers: Dict[str, List[Dict]] = defaultdict(list)
+        self.city_buffers: Dict[str, Tuple[PollutionReading, ...]] = {}
         self.buffer_timestamps: Dict[str, float] = {}
-        self.last_csv_fallback: Dict[str, Dict] = {}
-
-    def fetch_live_pollution(self, city: str) -> Optional[Dict]:
+        # city -> (last good reading, epoch seconds it was fetched)
+        self.last_good_readings: Dict[str, Tuple[PollutionReading, float]] = {}
+        # city -> hourly/daily rollups of every buffered reading
+        self.histories: Dict[str, TieredHistory] = {}
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        # Callbacks (city, reading) run after every buffer append
+        self._reading_listeners: Tuple[Callable[[str, PollutionReading], None], ...] = ()
+        # Callbacks (city) run when a city's buffer is cleared
+        self._clear_listeners: Tuple[Callable[[str], None], ...] = ()
+
+        self.breakers = CircuitBreakerRegistry(
+            failure_threshold=self.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=self.BREAKER_RESET_TIMEOUT,
+            max_breakers=self.MAX_BREAKERS,
+        )
+        self._last_probe_city: Optional[str] = None
+        self._probe_thread: Optional[threading.Thread] = None
+        self._probe_lock = threading.Lock()
+
+    def fetch_live_pollution(self, city: str) -> Optional[PollutionReading]:
         """
         Fetch live pollution data, weather, and forecast from WAQI API.
 
@@ -44,14 +82,14 @@ class LiveAQIService:
             city: City name (e.g., 'Delhi', 'Mumbai')
 
         Returns:
-            Comprehensive dictionary with pollution, weather, and forecast data
+            PollutionReading with pollution, weather, and forecast data
         """
         try:
             # Build API URL
             url = f"{self.WAQI_BASE_URL}/{city}/?token={self.WAQI_TOKEN}"
 
             # Fetch with timeout
-            response = requests.get(url, timeout=5)
+            response = requests.get(url, timeout=self.REQUEST_TIMEOUT)
             response.raise_for_status()
 
             data = response.json()
@@ -61,12 +99,14 @@ class LiveAQIService:
                 logger.warning(
                     f"WAQI API returned non-ok status: {data.get('status')} for {city}"
                 )
+                self._record_city_failure(city)
                 return None
 
             # Extract main AQI
             aqi = data.get('data', {}).get('aqi')
             if aqi is None:
                 logger.warning(f"No AQI value in WAQI response for {city}")
+                self._record_city_failure(city)
                 return None
 
             # Safely extract pollutants, weather, forecast, and metadata
@@ -104,53 +144,160 @@ class LiveAQIService:
                 except (TypeError, ValueError):
                     return None
 
-            pollution_reading = {
+            pollution_reading = PollutionReading(
                 # Core AQI
-                'aqi': int(aqi),
-                # Pollutants (µg/m³ or ppb) - explicit floats
-                'pm25': _v('pm25'),
-                'pm10': _v('pm10'),
-                'no2': _v('no2'),
-                'so2': _v('so2'),
-                'o3': _v('o3'),
-                'co': _v('co'),
-                'dominantpol': dominantpol or get_dominant_pollutant(),
+                aqi=int(aqi),
+                # Pollutants (µg/m³ or ppb)
+                pm25=_v('pm25'),
+                pm10=_v('pm10'),
+                no2=_v('no2'),
+                so2=_v('so2'),
+                o3=_v('o3'),
+                co=_v('co'),
+                dominantpol=dominantpol or get_dominant_pollutant(),
                 # Weather data
-                'temperature': iaqi.get('t', {}).get('v'),
-                'humidity': iaqi.get('h', {}).get('v'),
-                'pressure': iaqi.get('p', {}).get('v'),
-                'wind_speed': iaqi.get('w', {}).get('v'),
-                'wind_direction': iaqi.get('wd', {}).get('v'),
-                'wind_gust': iaqi.get('wg', {}).get('v'),
-                'dew_point': iaqi.get('dew', {}).get('v'),
+                temperature=_v('t'),
+                humidity=_v('h'),
+                pressure=_v('p'),
+                wind_speed=_v('w'),
+                wind_direction=_v('wd'),
+                wind_gust=_v('wg'),
+                dew_point=_v('dew'),
                 # Metadata
-                'timestamp': datetime.utcnow().isoformat(),
-                'station': city_info.get('name', city),
-                'geo': city_info.get('geo'),
+                ts=time.time(),
+                station=city_info.get('name', city),
+                geo=city_info.get('geo'),
                 # Forecast (pm25, pm10, uvi averages for next 3 days)
-                'forecast_pm25_avg': self._extract_forecast_avg(forecast, 'pm25'),
-                'forecast_pm10_avg': self._extract_forecast_avg(forecast, 'pm10'),
-                'forecast_uvi_avg': self._extract_forecast_avg(forecast, 'uvi'),
-            }
+                forecast_pm25_avg=self._extract_forecast_avg(forecast, 'pm25'),
+                forecast_pm10_avg=self._extract_forecast_avg(forecast, 'pm10'),
+                forecast_uvi_avg=self._extract_forecast_avg(forecast, 'uvi'),
+            )
 
             logger.info(
                 f"✅ Live data fetched for {city}: AQI={aqi}, "
-                f"PM2.5={pollution_reading['pm25']}, PM10={pollution_reading['pm10']}, "
-                f"DominantPol={pollution_reading['dominantpol']}, Temp={pollution_reading['temperature']}°C"
+                f"PM2.5={pollution_reading.pm25}, PM10={pollution_reading.pm10}, "
+                f"DominantPol={pollution_reading.dominantpol}, Temp={pollution_reading.temperature}°C"
             )
 
+            self._record_success(city)
             return pollution_reading
 
         except requests.exceptions.Timeout:
             logger.error(f"❌ API timeout for {city}")
+            self._record_upstream_failure(city)
             return None
         except requests.exceptions.ConnectionError:
             logger.error(f"❌ Connection error for {city}")
+            self._record_upstream_failure(city)
+            return None
+        except requests.exceptions.RequestException as e:
+            logger.error(f"❌ HTTP error for {city}: {str(e)}")
+            self._record_upstream_failure(city)
             return None
         except Exception as e:
             logger.error(f"❌ Error fetching live data for {city}: {str(e)}")
+            self._record_city_failure(city)
             return None
 
+    # ======================================================
+    # CIRCUIT BREAKERS
+    # ======================================================
+
+    def _city_breaker(self, city: str):
+        return self.breakers.get(f"{self.UPSTREAM_NAME}:{city}")
+
+    def _upstream_breaker(self):
+        return self.breakers.get(self.UPSTREAM_NAME)
+
+    def _record_success(self, city: str) -> None:
+        self._upstream_breaker().record_success()
+        self._city_breaker(city).record_success()
+
+    def _record_city_failure(self, city: str) -> None:
+        self._city_breaker(city).record_failure()
+        self._ensure_probe_thread()
+
+    def _record_upstream_failure(self, city: str) -> None:
+        self._last_probe_city = city
+        self._upstream_breaker().record_failure()
+        self._record_city_failure(city)
+
+    def is_upstream_available(self, city: str) -> bool:
+        """
+        Check both the upstream and the per-city breaker without blocking.
+        Returns False if either is open, in which case callers should serve
+        the last good reading instead of calling WAQI.
+        """
+        return self._upstream_breaker().allow_request() and self._city_breaker(city).allow_request()
+
+    def get_breaker_states(self) -> Dict[str, Dict]:
+        """Return a snapshot of every circuit breaker (for /health)."""
+        return self.breakers.snapshot()
+
+    def _ensure_probe_thread(self) -> None:
+        """Start the background probe thread the first time a failure is seen."""
+        if self._probe_thread is not None:
+            return
+        with self._probe_lock:
+            if self._probe_thread is None:
+                self._probe_thread = threading.Thread(
+                    target=self._probe_loop, name="waqi-breaker-probe", daemon=True
+                )
+                self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(self.PROBE_INTERVAL)
+            try:
+                self.probe_open_breakers()
+            except Exception as e:
+                logger.error(f"[BREAKER] Probe sweep failed: {str(e)}")
+
+    def probe_open_breakers(self) -> None:
+        """
+        Retry the upstream for every breaker whose reset window has elapsed.
+        A successful probe closes the breaker and refreshes the city's
+        last good reading; a failed probe re-opens it for another window.
+        A city breaker whose last MAX_FAILED_PROBES probes all failed (an
+        unknown or invalid city) is dropped instead of probed forever; the
+        next request for that city starts a fresh breaker.
+        """
+        for breaker in self.breakers.open_breakers():
+            if not breaker.try_begin_probe():
+                continue
+
+            if breaker.name == self.UPSTREAM_NAME:
+                city = self._last_probe_city or "Delhi"
+            else:
+                city = breaker.name.split(":", 1)[1]
+
+            logger.info(f"[BREAKER] Probing {breaker.name} with {city}")
+            reading = self.fetch_live_pollution(city)
+            if reading:
+                self._store_good_reading(city, reading)
+            else:
+                if breaker.state == breaker.HALF_OPEN:
+                    # Failure was attributed to the city only; keep this breaker open
+                    breaker.record_failure()
+                if breaker.name != self.UPSTREAM_NAME and breaker.failed_probes >= self.MAX_FAILED_PROBES:
+                    logger.warning(
+                        f"[BREAKER] {breaker.name} failed {breaker.failed_probes} probes, no longer probing"
+                    )
+                    self.breakers.remove(breaker.name)
+
+    def _store_good_reading(self, city: str, pollution_reading: PollutionReading) -> None:
+        with self._lock_for(city):
+            self._append_locked(city, pollution_reading)
+            self.last_good_readings[city] = (pollution_reading, time.time())  # Cache for fallback
+
+    def get_stale_reading(self, city: str) -> Optional[PollutionReading]:
+        """Return a copy of the last good reading marked stale with its age."""
+        cached = self.last_good_readings.get(city)
+        if cached is None:
+            return None
+        reading, fetched_at = cached
+        return reading.as_stale(round(time.time() - fetched_at, 1))
+
     def _extract_forecast_avg(self, forecast: Dict, pollutant: str) -> Optional[float]:
         """Extract 3-day average forecast for a pollutant."""
         try:
@@ -162,27 +309,64 @@ class LiveAQIService:
             pass
         return None
 
-    def add_to_buffer(self, city: str, pollution_reading: Dict) -> None:
+    def _lock_for(self, city: str) -> threading.Lock:
+        """Return the lock stripe guarding a city's state."""
+        return self._locks[hash(city) % self.LOCK_STRIPES]
+
+    def _append_locked(self, city: str, pollution_reading: PollutionReading) -> None:
+        """Append to a city's buffer; caller must hold the city's stripe lock."""
+        buffer = self.city_buffers.get(city, ())
+        # Maintain max buffer size (FIFO) by publishing a new trimmed tuple
+        self.city_buffers[city] = (buffer + (pollution_reading,))[-self.MAX_BUFFER_SIZE:]
+        self.buffer_timestamps[city] = datetime.utcnow().timestamp()
+
+        history = self.histories.get(city)
+        if history is None:
+            history = self.histories[city] = TieredHistory()
+        history.add(pollution_reading)
+
+        # Listeners run under the stripe lock, so they see a city's readings in order
+        for listener in self._reading_listeners:
+            try:
+                listener(city, pollution_reading)
+            except Exception as e:
+                logger.error(f"Reading listener failed for {city}: {str(e)}")
+
+    def add_reading_listener(self, listener: Callable[[str, PollutionReading], None]) -> None:
+        """
+        Register a callback invoked with (city, reading) after each buffered
+        reading (idempotent). Listeners must be quick: they run while the
+        city's lock stripe is held.
+        """
+        if listener not in self._reading_listeners:
+            self._reading_listeners = self._reading_listeners + (listener,)
+
+    def remove_reading_listener(self, listener: Callable[[str, PollutionReading], None]) -> None:
+        self._reading_listeners = tuple(l for l in self._reading_listeners if l != listener)
+
+    def add_clear_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback invoked with the city when its buffer is cleared (idempotent)."""
+        if listener not in self._clear_listeners:
+            self._clear_listeners = self._clear_listeners + (listener,)
+
+    def is_buffer_fresh(self, city: str) -> bool:
+        """True if a reading was buffered for the city within BUFFER_TIMEOUT."""
+        buffered_at = self.buffer_timestamps.get(city)
+        return buffered_at is not None and datetime.utcnow().timestamp() - buffered_at < self.BUFFER_TIMEOUT
+
+    def add_to_buffer(self, city: str, pollution_reading: PollutionReading) -> None:
         """
         Add a pollution reading to the city's rolling buffer.
 
         Args:
             city: City name
-            pollution_reading: Dictionary with AQI and pollutants
+            pollution_reading: PollutionReading with AQI and pollutants
         """
-        if city not in self.city_buffers:
-            self.city_buffers[city] = []
-
-        self.city_buffers[city].append(pollution_reading)
-
-        # Maintain max buffer size (FIFO)
-        if len(self.city_buffers[city]) > self.MAX_BUFFER_SIZE:
-            self.city_buffers[city].pop(0)
-
-        self.buffer_timestamps[city] = datetime.utcnow().timestamp()
+        with self._lock_for(city):
+            self._append_locked(city, pollution_reading)
         logger.info(f"Buffer updated for {city}: {len(self.city_buffers[city])} readings")
 
-    def get_buffer(self, city: str) -> List[Dict]:
+    def get_buffer(self, city: str) -> Tuple[PollutionReading, ...]:
         """
         Get the rolling buffer for a city.
 
@@ -190,12 +374,26 @@ class LiveAQIService:
             city: City name
 
         Returns:
-            List of pollution readings (last 24 or fewer)
+            Immutable snapshot of pollution readings (last 24 or fewer)
+        """
+        return self.city_buffers.get(city, ())
+
+    def get_daily_window(self, city: str, size: int = 30) -> Tuple[HistoryBucket, ...]:
+        """
+        Get up to `size` contiguous daily aggregates for a city, oldest first.
+        The last bucket is today (still accumulating). Empty when fewer than
+        TieredHistory.MIN_COVERAGE of the days were actually observed.
         """
-        return self.city_buffers.get(city, [])
+        history = self.histories.get(city)
+        return history.daily_window(size) if history else ()
+
+    def get_hourly_window(self, city: str, size: int = 24) -> Tuple[HistoryBucket, ...]:
+        """Get up to `size` contiguous hourly aggregates for a city, oldest first (empty when too sparse)."""
+        history = self.histories.get(city)
+        return history.hourly_window(size) if history else ()
 
     def get_features_vector(
-        self, city: str, pollution_reading: Dict
+        self, city: str, pollution_reading: PollutionReading
     ) -> Tuple[np.ndarray, bool]:
         """
         Construct a feature vector from a pollution reading.
@@ -204,37 +402,20 @@ class LiveAQIService:
 
         Args:
             city: City name
-            pollution_reading: Dictionary with pollutant values
+            pollution_reading: PollutionReading (legacy dicts are converted)
 
         Returns:
             Tuple of (feature_vector as np.ndarray, has_all_features flag)
         """
-        features = [
-            pollution_reading.get('pm25'),  # PM2.5
-            pollution_reading.get('pm10'),  # PM10
-            pollution_reading.get('no2'),   # NO2
-            pollution_reading.get('co'),    # CO
-            pollution_reading.get('so2'),   # SO2
-            pollution_reading.get('o3'),    # O3
-            2.0,                             # wind_speed (default)
-            25.0,                            # temperature (default)
-            60.0,                            # humidity (default)
-            0,                               # violations_7d (default)
-            pollution_reading.get('aqi'),   # AQI
-        ]
-
-        # Check if all pollutants are present (not counting defaults)
-        has_all = all(f is not None for f in features[:6])  # Check first 6 (pollutants)
-
-        # Convert None to 0 for feature vector
-        features = np.array([f if f is not None else 0.0 for f in features])
-
-        return features, has_all
+        if not isinstance(pollution_reading, PollutionReading):
+            pollution_reading = PollutionReading.from_dict(pollution_reading)
+        return pollution_reading.to_feature_row()
 
     def create_lstm_sequence(self, city: str, fill_size: int = 30) -> Tuple[Optional[np.ndarray], bool]:
         """
-        Create a sequence for LSTM from buffer.
-        If buffer has less than fill_size, repeats last value.
+        Create a sequence for LSTM.
+        Uses the daily tier when it spans fill_size days (the model was trained
+        on daily rows); otherwise uses the raw buffer and repeats the last value.
 
         Args:
             city: City name
@@ -243,6 +424,11 @@ class LiveAQIService:
         Returns:
             Tuple of (sequence as np.ndarray of shape (1, fill_size, 11), is_filled_with_live_data flag)
         """
+        daily = self.get_daily_window(city, fill_size)
+        if len(daily) == fill_size:
+            sequence = np.array([bucket.to_feature_row() for bucket in daily])
+            return sequence.reshape(1, fill_size, 11), True
+
         buffer = self.get_buffer(city)
 
         if not buffer:
@@ -250,10 +436,7 @@ class LiveAQIService:
             return None, False
 
         # Extract feature vectors from buffer
-        sequences = []
-        for reading in buffer:
-            features, _ = self.get_features_vector(city, reading)
-            sequences.append(features)
+        sequences = [reading.to_feature_row()[0] for reading in buffer]
 
         # If buffer has less than fill_size, repeat the last reading
         if len(sequences) < fill_size:
@@ -281,7 +464,7 @@ class LiveAQIService:
         seq, _ = self.create_lstm_sequence(city, fill_size)
         return seq
 
-    def fetch_and_buffer(self, city: str) -> Tuple[Optional[Dict], str]:
+    def fetch_and_buffer(self, city: str) -> Tuple[Optional[PollutionReading], str]:
         """
         Fetch live data and add to buffer, with fallback to CSV.
 
@@ -289,37 +472,54 @@ class LiveAQIService:
             city: City name
 
         Returns:
-            Tuple of (pollution_reading dict, data_source string: 'live' or 'fallback')
+            Tuple of (PollutionReading, data_source string: 'live' or 'fallback')
         """
+        # Skip the upstream entirely while its breaker is open
+        if not self.is_upstream_available(city):
+            logger.warning(f"Circuit open for {city}, serving last good reading")
+            cached = self.get_stale_reading(city)
+            return cached, "fallback" if cached else "error"
+
         # Try live API
         pollution_reading = self.fetch_live_pollution(city)
 
         if pollution_reading:
             # Add to buffer
-            self.add_to_buffer(city, pollution_reading)
-            self.last_csv_fallback[city] = pollution_reading  # Cache for fallback
+            self._store_good_reading(city, pollution_reading)
             return pollution_reading, "live"
         else:
             logger.warning(f"Live API failed for {city}, returning cached data if available")
             # Return last cached value or None
-            cached = self.last_csv_fallback.get(city)
+            cached = self.get_stale_reading(city)
             return cached, "fallback" if cached else "error"
 
     def clear_buffer(self, city: str) -> None:
-        """Clear buffer for a specific city (for testing)."""
-        if city in self.city_buffers:
-            self.city_buffers[city] = []
-            logger.info(f"Cleared buffer for {city}")
+        """Clear buffer for a specific city (for testing), and any state derived from it."""
+        with self._lock_for(city):
+            if city in self.city_buffers:
+                self.city_buffers[city] = ()
+            self.buffer_timestamps.pop(city, None)
+            self.histories.pop(city, None)
+            for listener in self._clear_listeners:
+                try:
+                    listener(city)
+                except Exception as e:
+                    logger.error(f"Clear listener failed for {city}: {str(e)}")
+        logger.info(f"Cleared buffer for {city}")
 
     def get_buffer_stats(self, city: str) -> Dict:
         """Get statistics about the buffer for debugging."""
         buffer = self.get_buffer(city)
+        history = self.histories.get(city)
         return {
             'city': city,
             'buffer_size': len(buffer),
             'max_size': self.MAX_BUFFER_SIZE,
             'oldest_reading': buffer[0]['timestamp'] if buffer else None,
             'newest_reading': buffer[-1]['timestamp'] if buffer else None,
+            # Observed buckets (no carried-forward gaps)
+            'hourly_buckets': len(history.hourly) if history else 0,
+            'daily_buckets': len(history.daily) if history else 0,
         }
 
 
@@ -0,0 +1,179 @@
+"""
+Pollution Reading Record
+
+Compact, slotted record for one live WAQI reading. Replaces the ~20-key
+dict previously built per reading: values are stored as floats, the
+timestamp as float epoch seconds, and station / pollutant names are
+interned so the 24 buffered readings per city share their strings.
+
+Readings still support read-only dict-style access (reading.get('pm25'),
+reading['aqi'], 'aqi' in reading) so existing route code keeps working.
+
+Readings are shared, unlocked, between the buffers and every reader, so
+all fields are fixed at construction except the two anomaly fields:
+AnomalyScorer writes anomaly_score and then is_anomaly once per reading
+after it is buffered (is_anomaly None means "not scored yet"). Each is a
+single attribute store, so a reader sees either the unscored or the
+scored value; one that sees is_anomaly set also sees its score.
+"""
+
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+def _to_float(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _intern(value) -> Optional[str]:
+    return sys.intern(str(value)) if value is not None else None
+
+
+class PollutionReading:
+    """Live reading with float fields; immutable except anomaly_score / is_anomaly (set by AnomalyScorer)."""
+
+    POLLUTANT_FIELDS = ('pm25', 'pm10', 'no2', 'so2', 'o3', 'co')
+    WEATHER_FIELDS = (
+        'temperature', 'humidity', 'pressure', 'wind_speed',
+        'wind_direction', 'wind_gust', 'dew_point',
+    )
+    FORECAST_FIELDS = ('forecast_pm25_avg', 'forecast_pm10_avg', 'forecast_uvi_avg')
+
+    __slots__ = (
+        ('aqi',) + POLLUTANT_FIELDS + ('dominantpol',) + WEATHER_FIELDS
+        + FORECAST_FIELDS + ('ts', 'station', 'geo', 'stale', 'stale_age_seconds')
+        + ('anomaly_score', 'is_anomaly')
+    )
+
+    # Keys exposed through the dict-style accessors / to_json
+    KEYS = frozenset(__slots__) | {'timestamp'}
+
+    # Defaults used by to_feature_row for fields the live API does not provide
+    DEFAULT_WIND_SPEED = 2.0
+    DEFAULT_TEMPERATURE = 25.0
+    DEFAULT_HUMIDITY = 60.0
+
+    def __init__(self, aqi: int, pm25=None, pm10=None, no2=None, so2=None, o3=None, co=None,
+                 dominantpol=None, temperature=None, humidity=None, pressure=None,
+                 wind_speed=None, wind_direction=None, wind_gust=None, dew_point=None,
+                 forecast_pm25_avg=None, forecast_pm10_avg=None, forecast_uvi_avg=None,
+                 ts: Optional[float] = None, station=None, geo=None,
+                 stale: bool = False, stale_age_seconds: Optional[float] = None,
+                 anomaly_score: Optional[float] = None, is_anomaly: Optional[bool] = None):
+        self.aqi = int(aqi)
+        self.pm25 = _to_float(pm25)
+        self.pm10 = _to_float(pm10)
+        self.no2 = _to_float(no2)
+        self.so2 = _to_float(so2)
+        self.o3 = _to_float(o3)
+        self.co = _to_float(co)
+        self.dominantpol = _intern(dominantpol)
+        self.temperature = _to_float(temperature)
+        self.humidity = _to_float(humidity)
+        self.pressure = _to_float(pressure)
+        self.wind_speed = _to_float(wind_speed)
+        self.wind_direction = _to_float(wind_direction)
+        self.wind_gust = _to_float(wind_gust)
+        self.dew_point = _to_float(dew_point)
+        self.forecast_pm25_avg = _to_float(forecast_pm25_avg)
+        self.forecast_pm10_avg = _to_float(forecast_pm10_avg)
+        self.forecast_uvi_avg = _to_float(forecast_uvi_avg)
+        self.ts = float(ts) if ts is not None else time.time()
+        self.station = _intern(station)
+        self.geo = tuple(float(g) for g in geo) if geo else None
+        self.stale = stale
+        self.stale_age_seconds = stale_age_seconds
+        # Set once at ingestion by the streaming anomaly scorer
+        self.anomaly_score = _to_float(anomaly_score)
+        self.is_anomaly = is_anomaly
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PollutionReading':
+        """Build a reading from a legacy reading dict."""
+        kwargs = {k: data.get(k) for k in cls.__slots__ if k not in ('ts', 'stale', 'stale_age_seconds')}
+        timestamp = data.get('timestamp')
+        if isinstance(timestamp, str):
+            try:
+                parsed = datetime.fromisoformat(timestamp.rstrip('Z'))
+                kwargs['ts'] = parsed.replace(tzinfo=timezone.utc).timestamp()
+            except ValueError:
+                kwargs['ts'] = None
+        elif timestamp is not None:
+            kwargs['ts'] = float(timestamp)
+        return cls(**kwargs)
+
+    @property
+    def timestamp(self) -> str:
+        """ISO-8601 UTC timestamp (same format as datetime.utcnow().isoformat())."""
+        return datetime.fromtimestamp(self.ts, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+    def as_stale(self, age_seconds: Optional[float]) -> 'PollutionReading':
+        """Return a copy marked stale with its age in seconds."""
+        copy = object.__new__(PollutionReading)
+        for name in self.__slots__:
+            setattr(copy, name, getattr(self, name))
+        copy.stale = True
+        copy.stale_age_seconds = age_seconds
+        return copy
+
+    # ------------------------------------------------------
+    # Read-only mapping interface (compatibility with dict readings)
+    # ------------------------------------------------------
+
+    def get(self, key: str, default=None):
+        if key not in self.KEYS:
+            return default
+        return self.timestamp if key == 'timestamp' else getattr(self, key)
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.KEYS
+
+    # ------------------------------------------------------
+    # Serialisation
+    # ------------------------------------------------------
+
+    def to_json(self) -> Dict:
+        """Return the reading as a JSON-serialisable dict (legacy key layout)."""
+        data = {name: getattr(self, name) for name in self.__slots__ if name != 'ts'}
+        data['geo'] = list(self.geo) if self.geo else None
+        data['timestamp'] = self.timestamp
+        return data
+
+    def to_feature_row(self) -> Tuple[np.ndarray, bool]:
+        """
+        Feature row in LSTM training layout:
+        [PM2.5, PM10, NO2, CO, SO2, O3, wind_speed, temperature, humidity, violations_7d, AQI]
+
+        Weather and violations use fixed defaults; missing pollutants become 0.
+
+        Returns:
+            Tuple of (feature row as np.ndarray, has_all_pollutants flag)
+        """
+        pollutants = (self.pm25, self.pm10, self.no2, self.co, self.so2, self.o3)
+        has_all = None not in pollutants
+        row = np.array([
+            *(p if p is not None else 0.0 for p in pollutants),
+            self.DEFAULT_WIND_SPEED,
+            self.DEFAULT_TEMPERATURE,
+            self.DEFAULT_HUMIDITY,
+            0.0,
+            float(self.aqi),
+        ])
+        return row, has_all
+
+    def __repr__(self) -> str:
+        return f"PollutionReading(station={self.station!r}, aqi={self.aqi}, pm25={self.pm25}, ts={self.ts})"
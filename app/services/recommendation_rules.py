@@ -0,0 +1,281 @@
+"""
+Recommendation Rule Engine
+
+Government recommendations are described by a declarative rule table
+(Config.RECOMMENDATION_RULES_PATH, JSON) instead of hard-coded `if`
+blocks. At load time every rule's condition is compiled into a
+vectorised predicate over float columns, so one NumPy pass decides which
+rules fire for thousands of readings at once; the per-reading path runs
+the same predicates on scalars.
+
+Editing the JSON file changes the rules without a code change: the file
+is re-read when its modification time changes (checked at most every
+RELOAD_CHECK_INTERVAL seconds) or on an explicit reload().
+"""
+
+import os
+import json
+import logging
+import operator
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# Rule inputs; missing values count as 0 (as `value or 0` did in the old checks)
+RULE_FIELDS = ('aqi', 'pm25', 'pm10', 'no2', 'so2', 'wind_speed', 'humidity')
+
+# Field -> (context section, key); None section means a top-level key
+_CONTEXT_KEYS = {
+    'aqi': (None, 'aqi'),
+    'pm25': ('pollutants', 'pm25'),
+    'pm10': ('pollutants', 'pm10'),
+    'no2': ('pollutants', 'no2'),
+    'so2': ('pollutants', 'so2'),
+    'wind_speed': ('weather', 'wind_speed'),
+    'humidity': ('weather', 'humidity'),
+}
+
+_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+PRIORITY_MAP = {"Critical": 1, "High": 2, "Moderate": 3, "Low": 4}
+
+
+class RuleError(ValueError):
+    """Raised when a rule table is malformed."""
+
+
+class CompiledRule:
+    """One rule with its condition compiled to a column predicate."""
+
+    __slots__ = ('rule_id', 'predicate', 'action', 'reason', 'time_horizon',
+                 'priority_base_offset', 'priority_min', 'priority_fixed')
+
+    def __init__(self, spec: Dict):
+        try:
+            self.rule_id = spec['id']
+            self.action = spec['action']
+            self.reason = spec['reason']
+            self.time_horizon = spec['time_horizon']
+            self.predicate = _compile_condition(spec['when'])
+        except KeyError as e:
+            raise RuleError(f"Rule {spec.get('id', '?')} is missing {e}")
+
+        priority = spec.get('priority', 'base')
+        self.priority_fixed = None
+        self.priority_base_offset = 0
+        self.priority_min = 1
+        if isinstance(priority, int):
+            self.priority_fixed = priority
+        elif isinstance(priority, dict):
+            self.priority_base_offset = int(priority.get('base_offset', 0))
+            self.priority_min = int(priority.get('min', 1))
+        elif priority != 'base':
+            raise RuleError(f"Rule {self.rule_id} has invalid priority: {priority!r}")
+
+        # Fail at load time rather than on the first reading that fires the rule
+        try:
+            self.reason.format(**{name: 0.0 for name in RULE_FIELDS})
+        except (KeyError, ValueError) as e:
+            raise RuleError(f"Rule {self.rule_id} has an invalid reason template: {e}")
+
+    def priority(self, base_priority: int) -> int:
+        if self.priority_fixed is not None:
+            return self.priority_fixed
+        return max(self.priority_min, base_priority + self.priority_base_offset)
+
+    def build(self, values: Dict, base_priority: int) -> Dict:
+        return {
+            'action': self.action,
+            'reason': self.reason.format_map(values),
+            'priority': self.priority(base_priority),
+            'time_horizon': self.time_horizon,
+        }
+
+
+def _compile_condition(spec: Dict) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+    """Compile a {'any'|'all': [...]} / {'field','op','value'} tree into a predicate."""
+    if 'any' in spec or 'all' in spec:
+        combine = np.logical_or if 'any' in spec else np.logical_and
+        children = [_compile_condition(child) for child in spec.get('any', spec.get('all'))]
+        if not children:
+            raise RuleError("Empty any/all condition")
+
+        def predicate(columns):
+            result = children[0](columns)
+            for child in children[1:]:
+                result = combine(result, child(columns))
+            return result
+        return predicate
+
+    field, op, value = spec.get('field'), spec.get('op'), spec.get('value')
+    if field not in RULE_FIELDS:
+        raise RuleError(f"Unknown rule field: {field!r}")
+    if op not in _OPERATORS:
+        raise RuleError(f"Unknown rule operator: {op!r}")
+    compare = _OPERATORS[op]
+    value = float(value)
+    return lambda columns: compare(columns[field], value)
+
+
+class _RowValues:
+    """Mapping view of one row of the input columns (for str.format_map)."""
+
+    __slots__ = ('columns', 'row')
+
+    def __init__(self, columns: Dict[str, list], row: int):
+        self.columns = columns
+        self.row = row
+
+    def __getitem__(self, name: str):
+        return self.columns[name][self.row]
+
+
+class RecommendationRuleEngine:
+    """Compiled rule set with hot reload from the rule table file."""
+
+    RELOAD_CHECK_INTERVAL = 30  # Seconds between modification-time checks
+
+    def __init__(self, rules_path: Optional[str] = None):
+        # Resolved per instance (not at import), so Config.RECOMMENDATION_RULES_PATH can be patched
+        self.rules_path = rules_path or Config.RECOMMENDATION_RULES_PATH
+        self._rules: Sequence[CompiledRule] = ()
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    @property
+    def rules(self) -> Sequence[CompiledRule]:
+        self._reload_if_changed()
+        return self._rules
+
+    def reload(self) -> bool:
+        """
+        Re-read and compile the rule table. A malformed table is logged and
+        the previous rules are kept (on first load the error is raised).
+        """
+        with self._reload_lock:
+            try:
+                mtime = os.path.getmtime(self.rules_path)
+                with open(self.rules_path, encoding='utf-8') as f:
+                    table = json.load(f)
+                rules = tuple(CompiledRule(spec) for spec in table['rules'])
+            except Exception as e:
+                if not self._rules:
+                    raise
+                logger.error(f"[RULES] Failed to reload {self.rules_path}, keeping previous rules: {str(e)}")
+                return False
+
+            self._rules = rules
+            self._mtime = mtime
+            self._last_check = time.time()
+            logger.info(f"[RULES] Loaded {len(rules)} recommendation rules")
+            return True
+
+    def _reload_if_changed(self) -> None:
+        now = time.time()
+        if now - self._last_check < self.RELOAD_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        try:
+            if os.path.getmtime(self.rules_path) != self._mtime:
+                self.reload()
+        except OSError as e:
+            logger.error(f"[RULES] Cannot stat {self.rules_path}: {str(e)}")
+
+    # ------------------------------------------------------
+    # Inputs
+    # ------------------------------------------------------
+
+    @staticmethod
+    def context_values(context: Dict) -> Dict:
+        """Rule inputs for one context, with `or 0` for missing values."""
+        values = {}
+        for name, (section, key) in _CONTEXT_KEYS.items():
+            source = context if section is None else context[section]
+            values[name] = source.get(key) or 0
+        return values
+
+    @staticmethod
+    def columns_from_contexts(contexts: List[Dict]) -> Dict[str, np.ndarray]:
+        """Float columns of the rule inputs for a list of contexts (missing -> 0)."""
+        columns = {}
+        for name, (section, key) in _CONTEXT_KEYS.items():
+            raw = [(c if section is None else c[section]).get(key) for c in contexts]
+            columns[name] = np.nan_to_num(np.array(raw, dtype=float), nan=0.0)
+        return columns
+
+    # ------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------
+
+    def evaluate(self, columns: Dict[str, np.ndarray], rules: Optional[Sequence[CompiledRule]] = None) -> np.ndarray:
+        """Boolean matrix (readings x rules): which rules fire for which reading."""
+        rules = self.rules if rules is None else rules
+        n = len(next(iter(columns.values())))
+        if not rules:
+            return np.zeros((n, 0), dtype=bool)
+        return np.column_stack([np.broadcast_to(rule.predicate(columns), (n,)) for rule in rules])
+
+    def recommend(self, context: Dict, risk_category: str, limit: Optional[int] = None) -> List[Dict]:
+        """Recommendations for one context, in rule order (first `limit` only if given)."""
+        values = self.context_values(context)
+        base_priority = PRIORITY_MAP.get(risk_category, 4)
+
+        recommendations = []
+        for rule in self.rules:
+            if limit is not None and len(recommendations) >= limit:
+                break
+            # Predicates work on scalars as well as columns
+            if rule.predicate(values):
+                recommendations.append(rule.build(values, base_priority))
+        return recommendations
+
+    def recommend_batch(self, columns: Dict[str, np.ndarray], risk_categories: Sequence[str],
+                        limit: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Recommendations for N readings from rule-input columns (see
+        columns_from_contexts). Rule predicates run once over all readings;
+        only the fired rules are formatted.
+        """
+        rules = self.rules
+        fired = self.evaluate(columns, rules)
+        base_priorities = [PRIORITY_MAP.get(c, 4) for c in risk_categories]
+
+        results: List[List[Dict]] = [[] for _ in range(len(fired))]
+        rows, rule_indices = np.nonzero(fired)  # Row-major, so rule order is kept per row
+        if not len(rows):
+            return results
+
+        # Python floats for formatting, converted once per column
+        values_by_field = {name: columns[name].tolist() for name in RULE_FIELDS}
+        for i, j in zip(rows.tolist(), rule_indices.tolist()):
+            if limit is None or len(results[i]) < limit:
+                results[i].append(rules[j].build(_RowValues(values_by_field, i), base_priorities[i]))
+        return results
+
+
+# Global singleton instance
+_recommendation_engine = None
+
+
+def get_recommendation_engine() -> RecommendationRuleEngine:
+    """Get or create the global RecommendationRuleEngine instance."""
+    global _recommendation_engine
+    if _recommendation_engine is None:
+        _recommendation_engine = RecommendationRuleEngine()
+    return _recommendation_engine
@@ -0,0 +1,260 @@
+"""
+Violation Report Classification Queue
+
+Hybrid classification (text + YOLOv8) used to run inside the
+report_violation request, pinning a Flask thread for the full inference
+time. Uploads are now accepted right away and classified here: a bounded
+queue feeds a small pool of worker threads, and each worker writes the
+result into the stored report dict when it is ready.
+
+Workers can classify in batches: a worker takes the next queued report,
+collects up to Config.CLASSIFICATION_BATCH_SIZE reports that arrive within
+Config.CLASSIFICATION_BATCH_WAIT_MS, and runs them through a single
+batched YOLO call (ModelLoader.classify_hybrid_batch); each result is
+mapped back to its report. Batching only pays off on accelerators: on CPU
+(evaluation/benchmark_yolo_batching.py) batch 1 had the best throughput,
+so the default is 1, which also skips the fill wait. Deployments set the
+size after benchmarking their own hardware.
+
+A report's `classification_status` moves queued -> processing -> done (or
+failed). When MAX_PENDING reports are already waiting, submit() refuses
+the job and the route answers 503 so clients back off instead of piling
+up work the workers cannot reach.
+
+Update listeners (add_update_listener) are called with (report id,
+changed fields) whenever the worker changes a report, so the report
+store can persist the change. Result listeners (add_result_listener) are
+called with (report, classification) after each successful
+classification, e.g. to cache it.
+"""
+
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import Config
+from ..model_loader import model_loader
+
+logger = logging.getLogger(__name__)
+
+
+def _classify_hybrid_batch(items: List[Tuple[Any, str]]) -> List[Dict]:
+    # Looked up per call so the loader's current method is always used
+    return model_loader.classify_hybrid_batch(items)
+
+
+# Report fields the worker writes
+CLASSIFICATION_STATE_FIELDS = (
+    'violation_type', 'severity', 'confidence', 'ai_recommendation',
+    'text_classification', 'yolo_detection', 'fusion_logic',
+    'classification_status', 'classification_error', 'classified_at',
+)
+
+
+def apply_classification(report: Dict, classification: Dict) -> None:
+    """Copy a classify_hybrid_violation result onto a stored report."""
+    report.update({
+        'violation_type': classification['violation_type'],
+        'severity': classification['severity'],
+        'confidence': classification['confidence'],
+        'ai_recommendation': classification['action_required'],
+        'text_classification': classification.get('text_classification', {}),
+        'yolo_detection': classification.get('yolo_detection', {}),
+        'fusion_logic': classification.get('fusion_logic', 'text_primary_yolo_secondary'),
+    })
+
+
+class ClassificationJobQueue:
+    """Bounded queue plus worker pool that classifies uploaded reports."""
+
+    WORKERS = 2  # Concurrent classification batches (YOLO is CPU-bound, keep this small)
+    MAX_PENDING = 32  # Queued reports before new uploads are turned away
+
+    def __init__(self, classify: Callable[[List[Tuple[Any, str]]], List[Dict]] = _classify_hybrid_batch,
+                 workers: int = WORKERS, max_pending: int = MAX_PENDING,
+                 batch_size: Optional[int] = None, batch_wait_ms: Optional[float] = None):
+        self.classify = classify
+        self.workers = workers
+        self.max_pending = max_pending
+        # Most images per YOLO call, and the longest a worker waits for a batch to fill
+        self.batch_size = max(1, batch_size or Config.CLASSIFICATION_BATCH_SIZE)
+        self.batch_wait_ms = Config.CLASSIFICATION_BATCH_WAIT_MS if batch_wait_ms is None else batch_wait_ms
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._result_listeners: Tuple[Callable[[Dict, Dict], None], ...] = ()
+        self._update_listeners: Tuple[Callable[[str, Dict], None], ...] = ()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._counts = {
+            'submitted': 0,
+            'rejected': 0,
+            'in_flight': 0,
+            'completed': 0,
+            'failed': 0,
+            'batches': 0,
+        }
+        self._wait_total = 0.0
+        self._run_total = 0.0
+        self._max_depth = 0
+
+    def add_result_listener(self, listener: Callable[[Dict, Dict], None]) -> None:
+        """Register a callback invoked with (report, classification) after each success (idempotent)."""
+        if listener not in self._result_listeners:
+            self._result_listeners = self._result_listeners + (listener,)
+
+    def add_update_listener(self, listener: Callable[[str, Dict], None]) -> None:
+        """Register a callback invoked with (report_id, changed fields) on every worker update (idempotent)."""
+        if listener not in self._update_listeners:
+            self._update_listeners = self._update_listeners + (listener,)
+
+    def _notify(self, report: Dict, classification: Dict) -> None:
+        for listener in self._result_listeners:
+            try:
+                listener(report, classification)
+            except Exception as e:
+                logger.error(f"[REPORTS] Result listener failed: {str(e)}")
+
+    def _publish(self, report: Dict, fields) -> None:
+        changes = {field: report.get(field) for field in fields}
+        for listener in self._update_listeners:
+            try:
+                listener(report.get('id'), changes)
+            except Exception as e:
+                logger.error(f"[REPORTS] Update listener failed: {str(e)}")
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"report-classifier-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"[REPORTS] Started {self.workers} classification workers")
+
+    def submit(self, report: Dict, image: Any, description: str = "") -> bool:
+        """
+        Queue a stored report for classification. `image` is whatever the
+        detector accepts: a file path or the decoded BGR array from ingestion.
+        Returns False (and leaves the report untouched) if the queue is full.
+        """
+        self._ensure_workers()
+        # Every key the worker writes exists up front, so serialising a report
+        # while it is being classified never sees the dict change size
+        report.update({'classification_status': 'queued', 'classification_error': None, 'classified_at': None})
+        try:
+            self._queue.put_nowait((report, image, description, time.perf_counter()))
+        except queue.Full:
+            for key in ('classification_status', 'classification_error', 'classified_at'):
+                report.pop(key, None)
+            with self._lock:
+                self._counts['rejected'] += 1
+            logger.warning(f"[REPORTS] Queue full ({self.max_pending}), rejected report {report.get('id')}")
+            return False
+        with self._lock:
+            self._counts['submitted'] += 1
+            self._max_depth = max(self._max_depth, self._queue.qsize())
+        return True
+
+    def _next_batch(self) -> List[Tuple]:
+        """Block for one job, then gather more until the batch is full or the wait runs out."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_wait_ms / 1000.0
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._run(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _run(self, batch: List[Tuple]) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            self._counts['in_flight'] += len(batch)
+            self._counts['batches'] += 1
+            self._wait_total += sum(started - enqueued for *_, enqueued in batch)
+        for report, *_ in batch:
+            report['classification_status'] = 'processing'
+            self._publish(report, ('classification_status',))
+
+        try:
+            classifications = self.classify([(image, description) for _, image, description, _ in batch])
+        except Exception as e:
+            logger.error(f"[REPORTS] Batch of {len(batch)} failed: {str(e)}")
+            classifications = [e] * len(batch)
+        if len(classifications) != len(batch):
+            logger.error(f"[REPORTS] Batch of {len(batch)} returned {len(classifications)} results")
+            missing = ValueError('No classification returned for this report')
+            classifications = list(classifications[:len(batch)])
+            classifications += [missing] * (len(batch) - len(classifications))
+
+        failed = 0
+        classified_at = datetime.utcnow().isoformat() + 'Z'
+        for (report, *_), classification in zip(batch, classifications):
+            try:
+                if isinstance(classification, Exception):
+                    raise classification
+                if not classification:
+                    raise ValueError('Failed to classify image')
+                apply_classification(report, classification)
+                report['classification_status'] = 'done'
+                self._notify(report, classification)
+            except Exception as e:
+                failed += 1
+                logger.error(f"[REPORTS] Classification failed for report {report.get('id')}: {str(e)}")
+                report['classification_error'] = str(e)
+                report['classification_status'] = 'failed'
+            report['classified_at'] = classified_at
+            self._publish(report, CLASSIFICATION_STATE_FIELDS)
+
+        with self._lock:
+            self._counts['in_flight'] -= len(batch)
+            self._counts['failed'] += failed
+            self._counts['completed'] += len(batch) - failed
+            self._run_total += (time.perf_counter() - started) * len(batch)
+
+    def join(self) -> None:
+        """Block until every queued report has been classified."""
+        self._queue.join()
+
+    def get_metrics(self) -> Dict:
+        """Queue depth, worker load, batch sizes and average wait / classification times."""
+        with self._lock:
+            counts = dict(self._counts)
+            finished = counts['completed'] + counts['failed']
+            started = finished + counts['in_flight']
+            return {
+                **counts,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_depth,
+                'max_pending': self.max_pending,
+                'workers': self.workers,
+                'batch_size': self.batch_size,
+                'avg_batch_size': round(started / counts['batches'], 2) if counts['batches'] else None,
+                'avg_wait_ms': round(1000 * self._wait_total / started, 2) if started else None,
+                'avg_classification_ms': round(1000 * self._run_total / finished, 2) if finished else None,
+            }
+
+
+# Global singleton instance
+_classification_queue: Optional[ClassificationJobQueue] = None
+
+
+def get_classification_queue() -> ClassificationJobQueue:
+    """Get or create the global ClassificationJobQueue instance."""
+    global _classification_queue
+    if _classification_queue is None:
+        _classification_queue = ClassificationJobQueue()
+    return _classification_queue
@@ -0,0 +1,364 @@
+"""
+Report Repository
+
+Citizen violation reports live in SQLite (Config.REPORTS_DB_PATH,
+instance/reports.db, not under version control) instead of a module-level
+list, so they survive restarts and lookups stop being linear scans:
+- `reports` keeps the full report as JSON next to the columns the routes
+  filter on: id (primary key), reporter_name, status, violation_type,
+  timestamp and an acknowledged flag, each indexed.
+- The database runs in WAL mode, so readers never block the writer.
+- Every query is a constant parameterised statement (sqlite3 caches the
+  compiled statement per connection), and each thread has its own
+  connection.
+
+add() commits before it returns, so an accepted report is on disk.
+Updates and deletes (mostly classification progress from the job queue
+workers) are batched: they land in an in-memory pending map (several
+updates to one report collapse into one row write) and a writer thread
+flushes it in a single transaction every FLUSH_INTERVAL seconds, or as
+soon as FLUSH_SIZE reports are pending. The global repository flushes
+whatever is still pending at interpreter exit. Single-report reads see
+pending changes directly; list queries flush first.
+
+Dashboard counts are materialised: reports per status, per violation type
+and verified (action_taken) reports per reporter are counted once from the
+table on start-up, then adjusted on every write by diffing the report's
+previous and new version. Counts and the contribution level lookup are
+dictionary reads instead of queries over all reports.
+"""
+
+import os
+import json
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS reports (
+        id TEXT PRIMARY KEY,
+        reporter_name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        violation_type TEXT,
+        timestamp TEXT NOT NULL,
+        acknowledged INTEGER NOT NULL DEFAULT 0,
+        data TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_reports_reporter_name ON reports (reporter_name)",
+    "CREATE INDEX IF NOT EXISTS idx_reports_status ON reports (status)",
+    "CREATE INDEX IF NOT EXISTS idx_reports_violation_type ON reports (violation_type)",
+    "CREATE INDEX IF NOT EXISTS idx_reports_timestamp ON reports (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_reports_acknowledged ON reports (acknowledged) WHERE acknowledged = 1",
+)
+
+UPSERT_SQL = """
+    INSERT INTO reports (id, reporter_name, status, violation_type, timestamp, acknowledged, data)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        reporter_name = excluded.reporter_name,
+        status = excluded.status,
+        violation_type = excluded.violation_type,
+        timestamp = excluded.timestamp,
+        acknowledged = excluded.acknowledged,
+        data = excluded.data
+"""
+DELETE_SQL = "DELETE FROM reports WHERE id = ?"
+GET_SQL = "SELECT data FROM reports WHERE id = ?"
+LIST_SQL = "SELECT data FROM reports ORDER BY timestamp, rowid"
+ACKNOWLEDGED_SQL = "SELECT data FROM reports WHERE acknowledged = 1 ORDER BY timestamp, rowid"
+ACKNOWLEDGED_BY_REPORTER_SQL = (
+    "SELECT data FROM reports WHERE acknowledged = 1 AND reporter_name = ? ORDER BY timestamp, rowid"
+)
+COUNT_BY_STATUS_SQL = "SELECT status, COUNT(*) FROM reports GROUP BY status"
+COUNT_BY_VIOLATION_TYPE_SQL = "SELECT violation_type, COUNT(*) FROM reports GROUP BY violation_type"
+COUNT_BY_REPORTER_STATUS_SQL = "SELECT reporter_name, COUNT(*) FROM reports WHERE status = ? GROUP BY reporter_name"
+
+# Status that counts towards a reporter's contribution level
+VERIFIED_STATUS = 'action_taken'
+# violation_type key for reports not classified yet
+UNCLASSIFIED = 'unclassified'
+
+# Marks a pending delete
+_DELETED = object()
+
+
+def reporter_key(reporter_name: Optional[str]) -> str:
+    """Name reports are stored and counted under (blank names are 'Anonymous')."""
+    return reporter_name or 'Anonymous'
+
+
+def _reporter(report: Dict) -> str:
+    return reporter_key(report.get('reporter_name'))
+
+
+def _status(report: Dict) -> str:
+    return report.get('status') or 'pending'
+
+
+def _row(report: Dict) -> tuple:
+    return (
+        report['id'],
+        _reporter(report),
+        _status(report),
+        report.get('violation_type'),
+        report.get('timestamp') or '',
+        1 if report.get('acknowledgement') else 0,
+        json.dumps(report),
+    )
+
+
+class ReportRepository:
+    """SQLite-backed report store with batched, write-behind writes."""
+
+    FLUSH_INTERVAL = 0.25  # Seconds between background flushes
+    FLUSH_SIZE = 64  # Pending reports that trigger an immediate flush
+
+    def __init__(self, db_path: Optional[str] = None, flush_interval: float = FLUSH_INTERVAL):
+        self.db_path = db_path or Config.REPORTS_DB_PATH
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        # Serialises read-modify-write updates and the pending map
+        self._lock = threading.RLock()
+        # One flush (one write transaction) at a time
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, object] = {}
+        # Batch being written by flush(): still visible to get() until committed
+        self._inflight: Dict[str, object] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Materialised counters, guarded by self._lock
+        self._by_status: Counter = Counter()
+        self._by_violation_type: Counter = Counter()
+        self._verified_by_reporter: Counter = Counter()
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        self._load_counters()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------
+    # Counters
+    # ------------------------------------------------------
+
+    def _load_counters(self) -> None:
+        conn = self._conn()
+        self._by_status = Counter(dict(conn.execute(COUNT_BY_STATUS_SQL).fetchall()))
+        self._by_violation_type = Counter({
+            (violation_type or UNCLASSIFIED): n
+            for violation_type, n in conn.execute(COUNT_BY_VIOLATION_TYPE_SQL)
+        })
+        self._verified_by_reporter = Counter(dict(
+            conn.execute(COUNT_BY_REPORTER_STATUS_SQL, (VERIFIED_STATUS,)).fetchall()
+        ))
+
+    def _count(self, report: Optional[object], delta: int) -> None:
+        # Caller holds self._lock
+        if report is None or report is _DELETED:
+            return
+        status = _status(report)
+        self._by_status[status] += delta
+        self._by_violation_type[report.get('violation_type') or UNCLASSIFIED] += delta
+        if status == VERIFIED_STATUS:
+            self._verified_by_reporter[_reporter(report)] += delta
+
+    # ------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background flusher (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"[REPORTS] Flush failed: {str(e)}")
+
+    def flush(self) -> int:
+        """Write every pending change in one transaction; returns the number of reports written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+
+            upserts = [_row(r) for r in pending.values() if r is not _DELETED]
+            deletes = [(report_id,) for report_id, r in pending.items() if r is _DELETED]
+            conn = self._conn()
+            try:
+                with conn:
+                    if upserts:
+                        conn.executemany(UPSERT_SQL, upserts)
+                    if deletes:
+                        conn.executemany(DELETE_SQL, deletes)
+            except Exception:
+                # Put the batch back (newer pending changes win) so nothing is lost
+                with self._lock:
+                    self._pending = {**pending, **self._pending}
+                    self._inflight = {}
+                raise
+            with self._lock:
+                self._inflight = {}
+            return len(pending)
+
+    def _lookup(self, report_id: str) -> Optional[Dict]:
+        # Current version (pending, in flight or stored), not copied; caller holds self._lock
+        pending = self._pending.get(report_id, self._inflight.get(report_id))
+        if pending is _DELETED:
+            return None
+        if pending is not None:
+            return pending
+        row = self._conn().execute(GET_SQL, (report_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _queue_write(self, report_id: str, report: object, previous: Optional[Dict]) -> None:
+        # Caller holds self._lock
+        self._count(previous, -1)
+        self._count(report, 1)
+        self._pending[report_id] = report
+        if len(self._pending) >= self.FLUSH_SIZE:
+            self._wake.set()
+
+    def _write_through(self) -> None:
+        # No background writer (scripts, tests): flush now, outside self._lock
+        if self._thread is None:
+            self.flush()
+
+    # ------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------
+
+    def add(self, report: Dict) -> None:
+        """Store a new report (a snapshot: later changes go through update()), committed before returning."""
+        report_id = report['id']
+        with self._lock:
+            self._queue_write(report_id, json.loads(json.dumps(report)), self._lookup(report_id))
+        self.flush()
+
+    def get(self, report_id: str) -> Optional[Dict]:
+        """One report by id (primary key lookup), including unflushed changes."""
+        with self._lock:
+            report = self._lookup(report_id)
+            return json.loads(json.dumps(report)) if report is not None else None
+
+    def update(self, report_id: str, changes: Dict) -> Optional[Dict]:
+        """Merge `changes` into a stored report; returns the updated report, or None if unknown."""
+        with self._lock:
+            previous = self._lookup(report_id)
+            if previous is None:
+                return None
+            report = {**previous, **json.loads(json.dumps(changes))}
+            self._queue_write(report_id, report, previous)
+            updated = json.loads(json.dumps(report))
+        self._write_through()
+        return updated
+
+    def delete(self, report_id: str) -> None:
+        with self._lock:
+            previous = self._lookup(report_id)
+            if previous is None:
+                return
+            self._queue_write(report_id, _DELETED, previous)
+        self._write_through()
+
+    def list_reports(self) -> List[Dict]:
+        """All reports, oldest first."""
+        self.flush()
+        return [json.loads(row[0]) for row in self._conn().execute(LIST_SQL)]
+
+    def count(self) -> int:
+        with self._lock:
+            return sum(self._by_status.values())
+
+    def list_acknowledged(self, reporter_name: Optional[str] = None) -> List[Dict]:
+        """Reports that carry an acknowledgement, optionally for one reporter."""
+        self.flush()
+        if reporter_name:
+            rows = self._conn().execute(ACKNOWLEDGED_BY_REPORTER_SQL, (reporter_name,))
+        else:
+            rows = self._conn().execute(ACKNOWLEDGED_SQL)
+        return [json.loads(row[0]) for row in rows]
+
+    def verified_count(self, reporter_name: str) -> int:
+        """Reports by this reporter that reached VERIFIED_STATUS (materialised counter)."""
+        with self._lock:
+            return self._verified_by_reporter[reporter_key(reporter_name)]
+
+    def get_stats(self) -> Dict:
+        """Report counts per status, per violation type and verified reports per reporter."""
+        with self._lock:
+            by_status = {k: n for k, n in self._by_status.items() if n}
+            by_violation_type = {k: n for k, n in self._by_violation_type.items() if n}
+            verified_by_reporter = {k: n for k, n in self._verified_by_reporter.most_common() if n}
+        return {
+            'total': sum(by_status.values()),
+            'by_status': by_status,
+            'by_violation_type': by_violation_type,
+            'verified_by_reporter': verified_by_reporter,
+        }
+
+
+# Global singleton instance
+_report_repository: Optional[ReportRepository] = None
+_report_repository_lock = threading.Lock()
+
+
+def get_report_repository() -> ReportRepository:
+    """
+    Get or create the global ReportRepository on first use, at the
+    Config.REPORTS_DB_PATH current at that time (background writer started,
+    pending writes flushed at exit).
+    """
+    global _report_repository
+    if _report_repository is None:
+        with _report_repository_lock:
+            if _report_repository is None:
+                repository = ReportRepository()
+                repository.start()
+                atexit.register(repository.stop)
+                _report_repository = repository
+    return _report_repository
+
+
+def update_report(report_id: str, changes: Dict) -> Optional[Dict]:
+    """ClassificationJobQueue update listener; resolves the repository per call."""
+    return get_report_repository().update(report_id, changes)
@@ -0,0 +1,127 @@
+"""
+Risk Leaderboard Service
+
+Ranks every tracked city (every city with a live buffer) by composite
+risk. All cities are scored together: one columnar pass through
+EnvironmentalIntelligence.compute_risk_batch and one batched predict on
+the legacy XGBoost risk model. The ranking is cached for the current
+polling cycle (LiveAQIService.BUFFER_TIMEOUT), so /api/risk/leaderboard
+is answered from memory between cycles.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..model_loader import model_loader
+from .live_aqi_service import LiveAQIService, get_live_aqi_service
+from .environmental_intelligence import get_environmental_intelligence
+
+logger = logging.getLogger(__name__)
+
+
+LEGACY_RISK_MAP = {0: "Low", 1: "Moderate", 2: "High", 3: "Extreme"}
+
+
+class RiskLeaderboard:
+    """
+    Cached national risk ranking.
+    The cached ranking is an immutable snapshot dict swapped atomically;
+    the lock only keeps concurrent cache misses from rebuilding it twice.
+    """
+
+    CYCLE_SECONDS = LiveAQIService.BUFFER_TIMEOUT
+
+    def __init__(self):
+        self._snapshot: Optional[Dict] = None
+        self._cache_key = None
+        self._build_lock = threading.Lock()
+
+    def _current_key(self, service: LiveAQIService):
+        # New polling cycle, or a city started being tracked mid-cycle
+        return int(time.time() // self.CYCLE_SECONDS), len(service.city_buffers)
+
+    def get_ranking(self) -> Dict:
+        """Return the ranking for the current polling cycle, building it if needed."""
+        service = get_live_aqi_service()
+        key = self._current_key(service)
+        if self._snapshot is not None and self._cache_key == key:
+            return self._snapshot
+
+        with self._build_lock:
+            if self._snapshot is None or self._cache_key != key:
+                self._snapshot = self._build(service)
+                self._cache_key = key
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        self._cache_key = None
+
+    def _build(self, service: LiveAQIService) -> Dict:
+        """Score the latest buffered reading of every tracked city in one pass."""
+        cities: List[str] = []
+        readings = []
+        for city, buffer in list(service.city_buffers.items()):
+            if buffer:
+                cities.append(city)
+                readings.append(buffer[-1])
+
+        entries = []
+        if readings:
+            intelligence = get_environmental_intelligence()
+            columns = intelligence.readings_to_columns(readings)
+            scores = intelligence.compute_risk_batch(**columns)
+
+            # Legacy model features: [AQI, violations_7d, wind_speed, temperature, humidity]
+            def with_default(values, default):
+                # Scalar path uses `value or default`, so 0 also falls back
+                return np.where(np.isnan(values) | (values == 0), default, values)
+
+            temperature = np.array([r.temperature for r in readings], dtype=float)
+            X = np.column_stack([
+                columns['aqi'],
+                np.zeros(len(readings)),
+                with_default(columns['wind_speed'], 2.0),
+                with_default(temperature, 25.0),
+                with_default(columns['humidity'], 60.0),
+            ])
+            legacy_classes = model_loader.get_risk_evaluator().predict(X)
+
+            for i, (city, reading) in enumerate(zip(cities, readings)):
+                entries.append({
+                    'city': city,
+                    'risk_score': int(scores['risk_score'][i]),
+                    'risk_level': scores['risk_category'][i],
+                    'escalation_probability': round(float(scores['escalation_probability'][i]) * 100, 1),
+                    'latest_aqi': round(float(columns['aqi'][i]), 1),
+                    'pm25': reading.pm25,
+                    'early_warning': bool(scores['early_warning'][i]),
+                    'legacy_risk_level': LEGACY_RISK_MAP.get(int(legacy_classes[i]), "Unknown"),
+                    'timestamp': reading.timestamp,
+                })
+
+            entries.sort(key=lambda e: (-e['risk_score'], -e['latest_aqi'], e['city']))
+            for rank, entry in enumerate(entries, start=1):
+                entry['rank'] = rank
+
+        logger.info(f"[LEADERBOARD] Ranked {len(entries)} cities")
+        return {
+            'generated_at': datetime.utcnow().isoformat() + 'Z',
+            'entries': tuple(entries),
+        }
+
+
+# Global singleton instance
+_risk_leaderboard = None
+
+
+def get_risk_leaderboard() -> RiskLeaderboard:
+    """Get or create the global RiskLeaderboard instance."""
+    global _risk_leaderboard
+    if _risk_leaderboard is None:
+        _risk_leaderboard = RiskLeaderboard()
+    return _risk_leaderboard
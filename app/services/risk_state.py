@@ -0,0 +1,128 @@
+"""
+Per-City Risk State
+
+Derived risk state kept by EnvironmentalIntelligence for every city with
+live readings. It is updated once per new reading (LiveAQIService calls
+its reading listeners after each buffer append), so serving a risk
+request is a read of precomputed values instead of a rerun of the
+scoring pipeline.
+"""
+
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+SECONDS_PER_HOUR = 3600
+
+
+class RollingTrend:
+    """
+    Least-squares slope and mean of a value over the last `size` samples.
+    Sums are updated in O(1) per sample; timestamps enter them relative to
+    an origin (in hours) to keep the squared sums well conditioned. Once
+    the window has rolled over `size` times, the origin moves to the oldest
+    sample and the sums are recomputed from the window, so `t` stays
+    bounded and add/remove rounding does not build up (amortised O(1)).
+    """
+
+    __slots__ = ('size', '_samples', '_origin', '_rolled', '_n', '_st', '_sy', '_stt', '_sty')
+
+    def __init__(self, size: int):
+        self.size = size
+        self._samples = deque()
+        self._origin: Optional[float] = None
+        self._rolled = 0
+        self._n = 0
+        self._st = self._sy = self._stt = self._sty = 0.0
+
+    def add(self, ts: float, value: Optional[float]) -> None:
+        if value is None:
+            return
+        if self._origin is None:
+            self._origin = ts
+        self._samples.append((ts, value))
+        self._apply(self._hours(ts), value, 1)
+        if len(self._samples) > self.size:
+            old_ts, old_value = self._samples.popleft()
+            self._apply(self._hours(old_ts), old_value, -1)
+            self._rolled += 1
+            if self._rolled >= self.size:
+                self._rebase()
+
+    def _hours(self, ts: float) -> float:
+        return (ts - self._origin) / SECONDS_PER_HOUR
+
+    def _rebase(self) -> None:
+        self._origin = self._samples[0][0]
+        self._rolled = 0
+        self._n = 0
+        self._st = self._sy = self._stt = self._sty = 0.0
+        for ts, value in self._samples:
+            self._apply(self._hours(ts), value, 1)
+
+    def _apply(self, t: float, y: float, sign: int) -> None:
+        self._n += sign
+        self._st += sign * t
+        self._sy += sign * y
+        self._stt += sign * t * t
+        self._sty += sign * t * y
+
+    @property
+    def count(self) -> int:
+        return self._n
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._sy / self._n if self._n else None
+
+    @property
+    def slope_per_hour(self) -> Optional[float]:
+        """Change per hour of the fitted line, None with fewer than two distinct times."""
+        if self._n < 2:
+            return None
+        denominator = self._n * self._stt - self._st * self._st
+        if abs(denominator) < 1e-12:
+            return None
+        return (self._n * self._sty - self._st * self._sy) / denominator
+
+
+class CityRiskState:
+    """Immutable snapshot of a city's derived risk state for one reading."""
+
+    __slots__ = (
+        'city', 'reading', 'context', 'risk_score', 'risk_category',
+        'escalation_probability', 'pollution_risk', 'stagnation_risk',
+        'forecast_risk', 'early_warning', 'pm25_trend_per_hour', 'pm25_mean',
+        'aqi_mean', 'samples',
+    )
+
+    def __init__(self, city: str, reading, context: Dict, risk_score: int, risk_category: str,
+                 escalation_probability: float, pollution_risk: float, stagnation_risk: float,
+                 forecast_risk: float, early_warning: Optional[Tuple[str, int]],
+                 pm25_trend_per_hour: Optional[float], pm25_mean: Optional[float],
+                 aqi_mean: Optional[float], samples: int):
+        self.city = city
+        self.reading = reading
+        self.context = context
+        self.risk_score = risk_score
+        self.risk_category = risk_category
+        self.escalation_probability = escalation_probability
+        self.pollution_risk = pollution_risk
+        self.stagnation_risk = stagnation_risk
+        self.forecast_risk = forecast_risk
+        self.early_warning = early_warning
+        self.pm25_trend_per_hour = pm25_trend_per_hour
+        self.pm25_mean = pm25_mean
+        self.aqi_mean = aqi_mean
+        self.samples = samples
+
+    def matches(self, reading) -> bool:
+        """True if this state was computed from `reading` (or a stale copy of it)."""
+        return reading is not None and self.reading.ts == reading.ts and self.reading.aqi == reading.aqi
+
+    def trend_json(self) -> Dict:
+        return {
+            'pm25_trend_per_hour': round(self.pm25_trend_per_hour, 2) if self.pm25_trend_per_hour is not None else None,
+            'pm25_mean': round(self.pm25_mean, 1) if self.pm25_mean is not None else None,
+            'aqi_mean': round(self.aqi_mean, 1) if self.aqi_mean is not None else None,
+            'samples': self.samples,
+        }
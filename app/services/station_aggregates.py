@@ -0,0 +1,257 @@
+"""
+Station Aggregation Tree
+
+Hierarchical pollutant statistics built from the station index
+(station_day.csv): station -> city -> state -> national.
+
+Every node keeps per-pollutant count, sum, min and max over the station
+readings beneath it. A station update changes those aggregates along
+its path to the root only, applying count/sum/min/max deltas in O(1)
+per node, so /api/aggregate/<level>/<name> is served straight from the
+tree instead of re-parsing the CSV and querying city by city. The one
+case a delta cannot cover is lowering a node's maximum (or raising its
+minimum) by replacing the value that held it; only that node's extreme
+is then rebuilt from its direct children.
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+LEVELS = ('station', 'city', 'state', 'national')
+
+# station_day.csv pollutant_id -> API pollutant key
+POLLUTANT_KEYS = {
+    'PM2.5': 'pm25',
+    'PM10': 'pm10',
+    'NO2': 'no2',
+    'SO2': 'so2',
+    'CO': 'co',
+    'OZONE': 'o3',
+    'NH3': 'nh3',
+}
+
+
+class PollutantStats:
+    """Running count / sum / min / max for one pollutant at one node."""
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+
+    def replace(self, old: float, new: float) -> bool:
+        """
+        Swap one contributing value for another. Returns False when `old`
+        was the max (or min) and `new` does not reach it, i.e. the extreme
+        has to be rebuilt by the caller.
+        """
+        self.total += new - old
+        if self.count == 1:
+            self.minimum = self.maximum = new
+            return True
+        exact = True
+        if new >= self.maximum:
+            self.maximum = new
+        elif old == self.maximum:
+            exact = False
+        if new <= self.minimum:
+            self.minimum = new
+        elif old == self.minimum:
+            exact = False
+        return exact
+
+    def to_json(self) -> Dict:
+        return {
+            'mean': round(self.total / self.count, 2) if self.count else None,
+            'max': self.maximum,
+            'min': self.minimum,
+            'count': self.count,
+        }
+
+
+class AggregateNode:
+    """One node of the station -> national tree."""
+
+    __slots__ = ('level', 'name', 'parent', 'children', 'stats', 'station_count',
+                 'lat_sum', 'lon_sum', 'values', 'latitude', 'longitude', 'last_update')
+
+    def __init__(self, level: str, name: str, parent: Optional['AggregateNode'] = None):
+        self.level = level
+        self.name = name
+        self.parent = parent
+        self.children: Dict[str, AggregateNode] = {}
+        self.stats: Dict[str, PollutantStats] = {}
+        self.station_count = 0
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+        # Station leaves only: pollutant -> current value, coordinates, update time
+        self.values: Dict[str, float] = {}
+        self.latitude: Optional[float] = None
+        self.longitude: Optional[float] = None
+        self.last_update: Optional[str] = None
+
+    def path(self):
+        node = self
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def _recompute_extremes(self, pollutant: str) -> None:
+        """Rebuild one pollutant's min/max from the direct children (already up to date)."""
+        stats = self.stats[pollutant]
+        children = [c.stats[pollutant] for c in self.children.values()
+                    if pollutant in c.stats and c.stats[pollutant].count]
+        stats.maximum = max(c.maximum for c in children)
+        stats.minimum = min(c.minimum for c in children)
+
+    def summary(self) -> Dict:
+        return {
+            'level': self.level,
+            'name': self.name,
+            'station_count': self.station_count,
+            'pollutants': {k: round(s.total / s.count, 2) for k, s in self.stats.items() if s.count},
+        }
+
+    def to_json(self, include_children: bool = True) -> Dict:
+        data = {
+            'level': self.level,
+            'name': self.name,
+            'parent': {'level': self.parent.level, 'name': self.parent.name} if self.parent else None,
+            'station_count': self.station_count,
+            'centroid': {
+                'latitude': round(self.lat_sum / self.station_count, 6),
+                'longitude': round(self.lon_sum / self.station_count, 6),
+            } if self.station_count else None,
+            'pollutants': {k: s.to_json() for k, s in sorted(self.stats.items()) if s.count},
+        }
+        if self.level == 'station':
+            data['last_update'] = self.last_update
+        elif include_children:
+            data['children'] = sorted(
+                (child.summary() for child in self.children.values()),
+                key=lambda c: c['name'],
+            )
+        return data
+
+
+class StationAggregates:
+    """Station -> city -> state -> national aggregation tree with name indexes."""
+
+    def __init__(self, country: str = 'India'):
+        self.root = AggregateNode('national', country)
+        # level -> lower-case name -> nodes (city names can repeat across states)
+        self._index: Dict[str, Dict[str, List[AggregateNode]]] = {level: {} for level in LEVELS}
+        self._index['national'][country.lower()] = [self.root]
+        self._lock = threading.Lock()
+
+    def _child(self, parent: AggregateNode, level: str, name: str) -> AggregateNode:
+        node = parent.children.get(name)
+        if node is None:
+            node = parent.children[name] = AggregateNode(level, name, parent)
+            self._index[level].setdefault(name.lower(), []).append(node)
+        return node
+
+    def update_station(self, state: str, city: str, station: str, pollutant: str, value: float,
+                       latitude: Optional[float] = None, longitude: Optional[float] = None,
+                       last_update: Optional[str] = None) -> None:
+        """
+        Set one pollutant value for a station and update every ancestor
+        with O(1) deltas per node (see the module docstring for the one
+        min/max case that rebuilds a node's extreme from its children).
+        """
+        with self._lock:
+            state_node = self._child(self.root, 'state', state)
+            city_node = self._child(state_node, 'city', city)
+            station_node = self._child(city_node, 'station', station)
+
+            if station_node.latitude is None and latitude is not None and longitude is not None:
+                station_node.latitude, station_node.longitude = latitude, longitude
+                for node in station_node.path():
+                    node.station_count += 1
+                    node.lat_sum += latitude
+                    node.lon_sum += longitude
+            if last_update is not None:
+                station_node.last_update = last_update
+
+            old = station_node.values.get(pollutant)
+            station_node.values[pollutant] = value
+            # Leaf first, so a rebuilt extreme always reads updated children
+            for node in station_node.path():
+                stats = node.stats.setdefault(pollutant, PollutantStats())
+                if old is None:
+                    stats.add(value)
+                elif not stats.replace(old, value):
+                    node._recompute_extremes(pollutant)
+
+    def find(self, level: str, name: str, parent_name: Optional[str] = None) -> List[AggregateNode]:
+        """Nodes at `level` called `name` (optionally only under a parent called parent_name)."""
+        nodes = self._index.get(level, {}).get(name.lower(), [])
+        if parent_name:
+            nodes = [n for n in nodes if n.parent and n.parent.name.lower() == parent_name.lower()]
+        return nodes
+
+    def names(self, level: str) -> List[str]:
+        return sorted({node.name for nodes in self._index.get(level, {}).values() for node in nodes})
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'StationAggregates':
+        """Build the tree from a station_day.csv style file."""
+        df = pd.read_csv(path)
+        df.columns = df.columns.str.strip().str.lower()
+        df['pollutant_avg'] = pd.to_numeric(df['pollutant_avg'], errors='coerce')
+        df = df.dropna(subset=['state', 'city', 'station', 'pollutant_avg'])
+
+        country = str(df['country'].iloc[0]) if 'country' in df.columns and len(df) else 'India'
+        aggregates = cls(country)
+        for row in df.itertuples(index=False):
+            aggregates.update_station(
+                row.state, row.city, row.station,
+                POLLUTANT_KEYS.get(row.pollutant_id, str(row.pollutant_id).lower()),
+                float(row.pollutant_avg),
+                latitude=float(row.latitude) if pd.notna(row.latitude) else None,
+                longitude=float(row.longitude) if pd.notna(row.longitude) else None,
+                last_update=row.last_update,
+            )
+        logger.info(
+            f"[AGGREGATE] Built tree: {len(aggregates.names('state'))} states, "
+            f"{len(aggregates.names('city'))} cities, {aggregates.root.station_count} stations"
+        )
+        return aggregates
+
+
+# Global singleton instance (rebuilt when the station file changes)
+_station_aggregates = None
+_station_aggregates_mtime = None
+_station_aggregates_lock = threading.Lock()
+
+
+def get_station_aggregates() -> StationAggregates:
+    """Get the aggregation tree for Config.STATION_DATASET_PATH, building it on first use."""
+    global _station_aggregates, _station_aggregates_mtime
+    mtime = os.path.getmtime(Config.STATION_DATASET_PATH)
+    if _station_aggregates is None or mtime != _station_aggregates_mtime:
+        with _station_aggregates_lock:
+            if _station_aggregates is None or mtime != _station_aggregates_mtime:
+                _station_aggregates = StationAggregates.from_csv(Config.STATION_DATASET_PATH)
+                _station_aggregates_mtime = mtime
+    return _station_aggregates
@@ -0,0 +1,209 @@
+"""
+Tiered Time-Series History
+
+Per-city history with three tiers of bounded size:
+- raw: the last readings (kept by LiveAQIService.city_buffers)
+- hourly: mean of the raw readings in each UTC hour
+- daily: mean of the hourly means in each UTC day
+
+Readings arrive whenever requests happen, so a day with a busy afternoon
+would be over-weighted by a plain mean of raw readings; rolling days up
+from hourly means gives every sampled hour the same weight. Each new
+reading folds into running sums in O(1) and closed buckets are frozen
+once, never rescanned; the add then republishes both tiers as tuples,
+which copies at most HOURLY_HORIZON + DAILY_HORIZON + 2 bucket references
+(O(horizon), not O(1)). A 30-day daily window for the LSTM (trained on
+WINDOW_SIZE = 30 daily rows) is therefore read without recomputing any
+aggregate. Gaps are forward filled like the training data, but only
+windows that are mostly observed (MIN_COVERAGE) are produced.
+"""
+
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+
+
+class HistoryBucket:
+    """Immutable aggregate for one hour or one day."""
+
+    FIELDS = ('pm25', 'pm10', 'no2', 'so2', 'o3', 'co',
+              'temperature', 'humidity', 'wind_speed', 'aqi')
+    _INDEX = {name: i for i, name in enumerate(FIELDS)}
+
+    __slots__ = ('start_ts', 'span', 'count', 'means', 'max_aqi')
+
+    def __init__(self, start_ts: float, span: int, count: int,
+                 means: np.ndarray, max_aqi: Optional[float]):
+        self.start_ts = start_ts
+        self.span = span
+        self.count = count
+        self.means = means
+        self.max_aqi = max_aqi
+
+    def get(self, key: str, default=None):
+        """Dict-style access to field means (None when no value was seen)."""
+        idx = self._INDEX.get(key)
+        if idx is None:
+            return default
+        value = self.means[idx]
+        return None if np.isnan(value) else float(value)
+
+    def to_feature_row(self) -> np.ndarray:
+        """
+        Row in the same layout as PollutionReading.to_feature_row:
+        [PM2.5, PM10, NO2, CO, SO2, O3, wind_speed, temperature, humidity, violations_7d, AQI]
+        """
+        values = [self.get(k) for k in ('pm25', 'pm10', 'no2', 'co', 'so2', 'o3')]
+        return np.array([
+            *(v if v is not None else 0.0 for v in values),
+            2.0, 25.0, 60.0, 0.0,
+            self.get('aqi') or 0.0,
+        ])
+
+    def to_json(self):
+        data = {name: self.get(name) for name in self.FIELDS}
+        data.update({
+            'start_ts': self.start_ts,
+            'span_seconds': self.span,
+            'count': self.count,
+            'max_aqi': self.max_aqi,
+        })
+        return data
+
+
+class _Accumulator:
+    """Running per-field sums/counts for the bucket currently being filled."""
+
+    __slots__ = ('index', 'span', 'sums', 'counts', 'n', 'max_aqi')
+
+    def __init__(self, index: int, span: int):
+        n_fields = len(HistoryBucket.FIELDS)
+        self.index = index
+        self.span = span
+        self.sums = np.zeros(n_fields)
+        self.counts = np.zeros(n_fields)
+        self.n = 0
+        self.max_aqi = None
+
+    def add(self, values: np.ndarray, weight_count: int = 1, max_aqi: Optional[float] = None) -> None:
+        present = ~np.isnan(values)
+        self.sums[present] += values[present]
+        self.counts[present] += 1
+        self.n += weight_count
+        if max_aqi is not None and (self.max_aqi is None or max_aqi > self.max_aqi):
+            self.max_aqi = max_aqi
+
+    def freeze(self) -> HistoryBucket:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(self.counts > 0, self.sums / np.maximum(self.counts, 1), np.nan)
+        return HistoryBucket(float(self.index * self.span), self.span, self.n, means, self.max_aqi)
+
+
+class TieredHistory:
+    """
+    Hourly and daily tiers for one city.
+
+    Not thread-safe for writers: LiveAQIService calls add() under the
+    city's lock stripe. After every add() the current windows are published
+    as immutable tuples, so readers never need the lock.
+    """
+
+    HOURLY_HORIZON = 48  # Closed hourly buckets kept
+    DAILY_HORIZON = 30   # Closed daily buckets kept (LSTM WINDOW_SIZE)
+    MIN_COVERAGE = 0.5   # Share of a window's slots that must be observed, not carried forward
+
+    def __init__(self):
+        self._hours = deque(maxlen=self.HOURLY_HORIZON)
+        self._days = deque(maxlen=self.DAILY_HORIZON)
+        self._hour_acc: Optional[_Accumulator] = None
+        self._day_acc: Optional[_Accumulator] = None
+        # Published snapshots: (closed buckets..., current partial bucket)
+        self.hourly: Tuple[HistoryBucket, ...] = ()
+        self.daily: Tuple[HistoryBucket, ...] = ()
+
+    @staticmethod
+    def _values(reading) -> np.ndarray:
+        values = [reading.get(name) for name in HistoryBucket.FIELDS]
+        return np.array([np.nan if v is None else float(v) for v in values])
+
+    def add(self, reading) -> None:
+        """Fold one raw reading into the hourly and daily tiers."""
+        ts = reading.ts
+        hour_index = int(ts // SECONDS_PER_HOUR)
+        day_index = int(ts // SECONDS_PER_DAY)
+
+        if self._hour_acc is None:
+            self._hour_acc = _Accumulator(hour_index, SECONDS_PER_HOUR)
+        elif hour_index > self._hour_acc.index:
+            self._close_hour()
+            self._hour_acc = _Accumulator(hour_index, SECONDS_PER_HOUR)
+
+        if self._day_acc is None:
+            self._day_acc = _Accumulator(day_index, SECONDS_PER_DAY)
+        elif day_index > self._day_acc.index:
+            self._days.append(self._day_acc.freeze())
+            self._day_acc = _Accumulator(day_index, SECONDS_PER_DAY)
+
+        values = self._values(reading)
+        self._hour_acc.add(values, max_aqi=reading.get('aqi'))
+        self._publish()
+
+    def _close_hour(self) -> None:
+        closed = self._hour_acc.freeze()
+        self._hours.append(closed)
+        # Late closes (hour from a previous day) still belong to that day
+        if self._day_acc is not None and closed.start_ts // SECONDS_PER_DAY == self._day_acc.index:
+            self._day_acc.add(closed.means, weight_count=closed.count, max_aqi=closed.max_aqi)
+
+    def _current_day(self) -> Optional[HistoryBucket]:
+        """Daily bucket for today including the still-open hour."""
+        if self._day_acc is None:
+            return None
+        day = _Accumulator(self._day_acc.index, SECONDS_PER_DAY)
+        day.sums = self._day_acc.sums.copy()
+        day.counts = self._day_acc.counts.copy()
+        day.n = self._day_acc.n
+        day.max_aqi = self._day_acc.max_aqi
+        if self._hour_acc is not None and self._hour_acc.index * SECONDS_PER_HOUR // SECONDS_PER_DAY == day.index:
+            hour = self._hour_acc.freeze()
+            day.add(hour.means, weight_count=hour.count, max_aqi=hour.max_aqi)
+        return day.freeze()
+
+    def _publish(self) -> None:
+        self.hourly = tuple(self._hours) + ((self._hour_acc.freeze(),) if self._hour_acc else ())
+        current_day = self._current_day()
+        self.daily = tuple(self._days) + ((current_day,) if current_day else ())
+
+    @classmethod
+    def window(cls, buckets: Tuple[HistoryBucket, ...], size: int, span: int,
+               min_coverage: float = MIN_COVERAGE) -> Tuple[HistoryBucket, ...]:
+        """
+        Return the last `size` buckets on a contiguous time grid, carrying
+        the previous bucket forward over gaps (as training did with ffill).
+        Returns () when fewer than min_coverage * size of those slots hold
+        an observed bucket, so a sparse history (two readings weeks apart)
+        is not passed off as a full window of copies.
+        """
+        if not buckets:
+            return ()
+        filled = [buckets[0]]
+        observed = [True]
+        for bucket in buckets[1:]:
+            gap = min(int((bucket.start_ts - filled[-1].start_ts) // span) - 1, size)
+            filled.extend([filled[-1]] * gap)
+            observed.extend([False] * gap)
+            filled.append(bucket)
+            observed.append(True)
+        if sum(observed[-size:]) < min_coverage * size:
+            return ()
+        return tuple(filled[-size:])
+
+    def daily_window(self, size: int = DAILY_HORIZON) -> Tuple[HistoryBucket, ...]:
+        return self.window(self.daily, size, SECONDS_PER_DAY)
+
+    def hourly_window(self, size: int = HOURLY_HORIZON) -> Tuple[HistoryBucket, ...]:
+        return self.window(self.hourly, size, SECONDS_PER_HOUR)
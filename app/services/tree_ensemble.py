@@ -0,0 +1,336 @@
+"""
+Flattened Tree Ensemble
+
+Array representation of a tree ensemble and a vectorised NumPy evaluator,
+so tree models can be scored without their training runtime (e.g. the
+XGBoost booster behind models/risk_model.pkl, which otherwise builds a
+DMatrix for every single-row predict, or the 200 scikit-learn trees of
+models/isolation_forest.pkl, each walked with Python-level overhead).
+
+All trees are concatenated into one set of contiguous node arrays:
+- feature:      split feature index per node (0 for leaves)
+- threshold:    split threshold per node (float32, as the models compare)
+- left / right: global child node indices, -1 for leaves
+- default_left: branch taken when the feature value is NaN
+- value:        leaf contribution per node (0 for internal nodes)
+plus per-tree root offsets and output group (class) indices.
+
+Artifacts are stored as a single .npz file (no pickle) and shared by
+every exporter in this module.
+"""
+
+import json
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Split rules: XGBoost goes left on x < threshold, scikit-learn on x <= threshold
+SPLIT_LT = "lt"
+SPLIT_LE = "le"
+
+OBJECTIVE_ISOLATION_FOREST = "isolation_forest"
+
+
+class FlatTreeEnsemble:
+    """Tree ensemble stored as flat NumPy arrays with a batch evaluator."""
+
+    BATCH_ROWS = 2048  # Rows evaluated per block, bounds the (rows x trees) temporaries
+
+    ARRAY_FIELDS = (
+        'feature', 'threshold', 'left', 'right', 'default_left', 'value',
+        'tree_roots', 'tree_groups', 'base_margin', 'classes',
+    )
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 tree_roots, tree_groups, base_margin, classes=None,
+                 max_depth: int = 0, split_rule: str = SPLIT_LT, objective: str = "",
+                 params: Optional[Dict] = None):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.tree_roots = np.asarray(tree_roots, dtype=np.int32)
+        self.tree_groups = np.asarray(tree_groups, dtype=np.int32)
+        self.base_margin = np.asarray(base_margin, dtype=np.float64)
+        self.classes = np.asarray(classes if classes is not None else np.arange(len(self.base_margin)))
+        self.max_depth = int(max_depth)
+        self.split_rule = split_rule
+        self.objective = objective
+        # Objective-specific scalars (e.g. Isolation Forest normalisation and offset)
+        self.params = dict(params or {})
+
+        if split_rule not in (SPLIT_LT, SPLIT_LE):
+            raise ValueError(f"Unknown split rule: {split_rule}")
+
+        # Evaluation copy of the children where leaves point at themselves, so a
+        # row that has reached a leaf simply stays there for the remaining depth
+        # steps; interleaved as [left, right] per node so one gather picks a branch
+        node_ids = np.arange(self.n_nodes, dtype=np.intp)
+        is_leaf = self.left < 0
+        self._children = np.stack([
+            np.where(is_leaf, node_ids, self.left),
+            np.where(is_leaf, node_ids, self.right),
+        ], axis=1).ravel().astype(np.intp)
+        self._feature = self.feature.astype(np.intp)
+        self._roots = self.tree_roots.astype(np.intp)
+
+        # (trees x groups) one-hot used to sum leaf values per output group
+        self._group_matrix = np.zeros((len(self.tree_roots), len(self.base_margin)))
+        self._group_matrix[np.arange(len(self.tree_roots)), self.tree_groups] = 1.0
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.tree_roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    # ------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------
+
+    def apply(self, X) -> np.ndarray:
+        """Return the global leaf index reached in every tree, shape (rows, trees)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_features = X.shape
+        flat_X = np.ascontiguousarray(X).ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+
+        has_nan = np.isnan(X).any()
+
+        node = np.broadcast_to(self._roots, (n_rows, self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_offsets + self._feature.take(node))
+            threshold = self.threshold.take(node)
+            # NaN compares False, i.e. left; default_left then decides
+            goes_right = x >= threshold if self.split_rule == SPLIT_LT else x > threshold
+            if has_nan:
+                goes_right = np.where(np.isnan(x), ~self.default_left.take(node), goes_right)
+            node = self._children.take(node * 2 + goes_right)
+        return node
+
+    def predict_margin(self, X) -> np.ndarray:
+        """Raw per-group scores (base margin + sum of leaf values), shape (rows, groups)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        out = np.empty((X.shape[0], len(self.base_margin)))
+        for start in range(0, X.shape[0], self.BATCH_ROWS):
+            block = X[start:start + self.BATCH_ROWS]
+            leaf_values = self.value[self.apply(block)].astype(np.float64)
+            out[start:start + len(block)] = leaf_values @ self._group_matrix + self.base_margin
+        return out
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities for softmax ensembles."""
+        margin = self.predict_margin(X)
+        margin -= margin.max(axis=1, keepdims=True)
+        exp = np.exp(margin)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predicted class labels (argmax of the margin), like XGBClassifier.predict;
+        for Isolation Forests -1 (anomaly) / 1 (normal), like IsolationForest.predict.
+        """
+        if self.objective == OBJECTIVE_ISOLATION_FOREST:
+            return np.where(self.decision_function(X) < 0, -1, 1)
+        return self.classes[np.argmax(self.predict_margin(X), axis=1)]
+
+    def score_samples(self, X) -> np.ndarray:
+        """
+        IsolationForest.score_samples: leaf values hold depth + c(leaf samples),
+        so the margin is the summed path length over all trees.
+        """
+        if self.objective != OBJECTIVE_ISOLATION_FOREST:
+            raise ValueError(f"score_samples needs an Isolation Forest, got objective {self.objective!r}")
+        path_lengths = self.predict_margin(X)[:, 0]
+        denominator = self.n_trees * self.params['average_path_length']
+        if denominator == 0:
+            return -np.ones_like(path_lengths)
+        return -(2.0 ** (-path_lengths / denominator))
+
+    def decision_function(self, X) -> np.ndarray:
+        """IsolationForest.decision_function (negative scores are anomalies)."""
+        return self.score_samples(X) - self.params['offset']
+
+    # ------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        meta = {'max_depth': self.max_depth, 'split_rule': self.split_rule, 'objective': self.objective,
+                'params': self.params}
+        np.savez_compressed(
+            path,
+            meta=np.array(json.dumps(meta)),
+            **{name: getattr(self, name) for name in self.ARRAY_FIELDS},
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'FlatTreeEnsemble':
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in cls.ARRAY_FIELDS}
+        return cls(**arrays, **meta)
+
+
+def _tree_depth(left, right) -> int:
+    """Depth (edges on the longest root-to-leaf path) of a tree given local child arrays."""
+    depth, stack = 0, [(0, 0)]
+    while stack:
+        node, d = stack.pop()
+        if left[node] < 0:
+            depth = max(depth, d)
+        else:
+            stack.append((left[node], d + 1))
+            stack.append((right[node], d + 1))
+    return depth
+
+
+def export_xgboost_classifier(model) -> FlatTreeEnsemble:
+    """
+    Flatten a fitted XGBClassifier (gbtree, numerical splits) into a FlatTreeEnsemble.
+
+    Uses the booster's JSON dump: leaf values live in split_conditions and
+    trees are assigned to classes through tree_info.
+    """
+    booster = model.get_booster()
+    raw = json.loads(booster.save_raw('json'))
+    learner = raw['learner']
+    gbm = learner['gradient_booster']
+    if gbm.get('name') != 'gbtree':
+        raise ValueError(f"Only gbtree boosters can be flattened, got {gbm.get('name')}")
+
+    trees = gbm['model']['trees']
+    tree_info = gbm['model']['tree_info']
+    params: Dict = learner['learner_model_param']
+    n_groups = max(int(params.get('num_class', 0)), 1)
+
+    base_score = params['base_score']
+    base_values = json.loads(base_score) if base_score.startswith('[') else [float(base_score)]
+    base_margin = np.broadcast_to(np.asarray(base_values, dtype=np.float64), (n_groups,)).copy()
+
+    feature, threshold, left, right, default_left, value = [], [], [], [], [], []
+    tree_roots, max_depth = [], 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError("Categorical splits are not supported")
+        offset = len(feature)
+        tree_roots.append(offset)
+        tree_left = tree['left_children']
+        tree_right = tree['right_children']
+        for i, conditions in enumerate(tree['split_conditions']):
+            is_leaf = tree_left[i] == -1
+            feature.append(0 if is_leaf else tree['split_indices'][i])
+            threshold.append(0.0 if is_leaf else conditions)
+            left.append(-1 if is_leaf else tree_left[i] + offset)
+            right.append(-1 if is_leaf else tree_right[i] + offset)
+            default_left.append(bool(tree['default_left'][i]))
+            value.append(conditions if is_leaf else 0.0)
+        max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+
+    ensemble = FlatTreeEnsemble(
+        feature, threshold, left, right, default_left, value,
+        tree_roots=tree_roots,
+        tree_groups=tree_info,
+        base_margin=base_margin,
+        classes=getattr(model, 'classes_', None),
+        max_depth=max_depth,
+        split_rule=SPLIT_LT,
+        objective=learner.get('objective', {}).get('name', ''),
+    )
+    logger.info(
+        f"[TREES] Exported XGBoost model: {ensemble.n_trees} trees, "
+        f"{ensemble.n_nodes} nodes, depth {max_depth}"
+    )
+    return ensemble
+
+
+def _average_path_length(n_samples) -> np.ndarray:
+    """c(n): average path length of an unsuccessful BST search over n samples."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    out = np.zeros_like(n)
+    out[n == 2] = 1.0
+    large = n > 2
+    out[large] = 2.0 * (np.log(n[large] - 1.0) + np.euler_gamma) - 2.0 * (n[large] - 1.0) / n[large]
+    return out
+
+
+def _node_depths(left, right) -> np.ndarray:
+    """Depth (edges from the root) of every node of one tree."""
+    depths = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):  # Children always come after their parent
+        if left[node] >= 0:
+            depths[left[node]] = depths[right[node]] = depths[node] + 1
+    return depths
+
+
+def export_isolation_forest(model) -> FlatTreeEnsemble:
+    """
+    Flatten a fitted scikit-learn IsolationForest into a FlatTreeEnsemble.
+
+    Each leaf's value is its depth plus c(n_node_samples), the expected
+    remaining path length, so summing leaf values gives the forest's total
+    path length. scikit-learn compares float32 inputs with float64
+    thresholds (x <= t); thresholds are rounded down to float32, which
+    keeps x32 <= t exact.
+    """
+    n_features = model.n_features_in_
+    subsample_features = model._max_features != n_features
+
+    feature, threshold, left, right, value = [], [], [], [], []
+    tree_roots, max_depth = [], 0
+    for estimator, features in zip(model.estimators_, model.estimators_features_):
+        tree = estimator.tree_
+        offset = len(feature)
+        tree_roots.append(offset)
+
+        is_leaf = tree.children_left < 0
+        tree_features = np.where(is_leaf, 0, tree.feature)
+        if subsample_features:
+            tree_features = np.where(is_leaf, 0, np.asarray(features)[tree.feature])
+
+        thresholds = tree.threshold.astype(np.float32)
+        rounded_up = thresholds.astype(np.float64) > tree.threshold
+        thresholds[rounded_up] = np.nextafter(thresholds[rounded_up], np.float32(-np.inf))
+
+        depths = _node_depths(tree.children_left, tree.children_right)
+        leaf_values = depths + _average_path_length(tree.n_node_samples)
+
+        feature.extend(tree_features.tolist())
+        threshold.extend(np.where(is_leaf, 0.0, thresholds).tolist())
+        left.extend(np.where(is_leaf, -1, tree.children_left + offset).tolist())
+        right.extend(np.where(is_leaf, -1, tree.children_right + offset).tolist())
+        value.extend(np.where(is_leaf, leaf_values, 0.0).tolist())
+        max_depth = max(max_depth, int(depths.max()))
+
+    ensemble = FlatTreeEnsemble(
+        feature, threshold, left, right,
+        default_left=np.zeros(len(feature), dtype=bool),
+        value=value,
+        tree_roots=tree_roots,
+        tree_groups=np.zeros(len(tree_roots), dtype=np.int32),
+        base_margin=[0.0],
+        max_depth=max_depth,
+        split_rule=SPLIT_LE,
+        objective=OBJECTIVE_ISOLATION_FOREST,
+        params={
+            'average_path_length': float(_average_path_length([model.max_samples_])[0]),
+            'offset': float(model.offset_),
+        },
+    )
+    logger.info(
+        f"[TREES] Exported Isolation Forest: {ensemble.n_trees} trees, "
+        f"{ensemble.n_nodes} nodes, depth {max_depth}"
+    )
+    return ensemble
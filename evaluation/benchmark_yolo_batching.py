@@ -0,0 +1,81 @@
+# =====================================================
+# YOLO BATCH SIZE BENCHMARK (CPU)
+# =====================================================
+# Images/second of the fire/smoke detector at different batch sizes,
+# i.e. what Config.CLASSIFICATION_BATCH_SIZE buys on this machine.
+#
+#   python benchmark_yolo_batching.py [--batch-sizes 1 2 4 8] [--images 32]
+
+import os
+import time
+import glob
+import argparse
+
+import torch
+from PIL import Image
+from ultralytics import YOLO
+
+
+# =====================================================
+# CONFIG
+# =====================================================
+
+MODEL_PATH = "../models/best.pt"
+# Same architecture, untrained: timings are representative even without the weights
+FALLBACK_MODEL = "yolov8n.yaml"
+UPLOAD_DIR = "../app/uploads"
+
+BATCH_SIZES = [1, 2, 4, 8, 16]
+N_IMAGES = 32
+REPEATS = 3
+
+
+def readable(path):
+    try:
+        with Image.open(path) as im:
+            im.verify()
+        return True
+    except Exception:
+        return False
+
+
+def bench(model, paths, batch_size):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for i in range(0, len(paths), batch_size):
+            model(paths[i:i + batch_size], device="cpu", verbose=False)
+        best = min(best, time.perf_counter() - start)
+    return len(paths) / best
+
+
+# =====================================================
+# RUN
+# =====================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--images", type=int, default=N_IMAGES)
+    args = parser.parse_args()
+
+    if os.path.exists(MODEL_PATH):
+        model = YOLO(MODEL_PATH)
+    else:
+        print(f"{MODEL_PATH} not found, timing the untrained {FALLBACK_MODEL} network instead")
+        model = YOLO(FALLBACK_MODEL)
+
+    images = [p for p in sorted(glob.glob(os.path.join(UPLOAD_DIR, "*"))) if readable(p)]
+    if not images:
+        raise SystemExit(f"No readable images in {UPLOAD_DIR}")
+    paths = (images * (args.images // len(images) + 1))[:args.images]
+
+    print(f"CPU threads: {torch.get_num_threads()}, images: {len(paths)}")
+    model(paths[:1], device="cpu", verbose=False)  # Warm-up
+
+    baseline = None
+    print(f"{'batch':>6} {'img/s':>8} {'vs 1':>6}")
+    for batch_size in args.batch_sizes:
+        throughput = bench(model, paths, batch_size)
+        baseline = baseline or throughput
+        print(f"{batch_size:>6} {throughput:>8.2f} {throughput / baseline:>5.2f}x")
@@ -0,0 +1,61 @@
+"""
+Anomaly feature schema test: live readings must be laid out in the ISO
+scaler's training column order, missing pollutants imputed with the
+training means, and the fast scaling must equal StandardScaler.transform.
+"""
+
+import sys
+import os
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from app.model_loader import model_loader
+from app.services.anomaly_features import TRAINING_COLUMNS, AnomalyFeatureSchema
+from app.services.pollution_reading import PollutionReading
+
+warnings.filterwarnings('ignore')
+
+
+def _schema():
+    return AnomalyFeatureSchema(model_loader.get_iso_scaler())
+
+
+def test_columns_follow_the_scaler():
+    schema = _schema()
+    assert schema.columns == tuple(model_loader.get_iso_scaler().feature_names_in_) == TRAINING_COLUMNS
+    assert schema.fields == ('pm25', 'no2', 'co', 'so2', 'o3')
+
+    reading = PollutionReading(aqi=150, pm25=60, no2=25, so2=10, o3=30, co=1.5)
+    assert schema.raw_matrix([reading]).tolist() == [[60, 25, 1.5, 10, 30]]
+
+
+def test_build_matches_scaler_and_imputes_training_means():
+    schema = _schema()
+    scaler = model_loader.get_iso_scaler()
+    readings = [
+        PollutionReading(aqi=150, pm25=60, no2=25, so2=10, o3=30, co=1.5),
+        PollutionReading(aqi=90, pm25=35, no2=None, so2=4, o3=None, co=0.7),
+    ]
+    X_scaled, raw = schema.build(readings)
+
+    assert np.isnan(raw[1, 1]) and np.isnan(raw[1, 4])
+    filled = pd.DataFrame(
+        [[60, 25, 1.5, 10, 30], [35, scaler.mean_[1], 0.7, 4, scaler.mean_[4]]],
+        columns=list(TRAINING_COLUMNS),
+    )
+    assert np.allclose(X_scaled, scaler.transform(filled))
+    # Imputed columns sit exactly at the training mean
+    assert X_scaled[1, 1] == 0.0 and X_scaled[1, 4] == 0.0
+
+
+def test_scorer_uses_schema_order():
+    from app.services.anomaly_scorer import AnomalyScorer
+
+    reading = PollutionReading(aqi=150, pm25=60, no2=25, so2=10, o3=30, co=1.5)
+    score = AnomalyScorer(prefilter=False).score_reading("Delhi", reading)
+    X = model_loader.get_iso_scaler().transform(pd.DataFrame([[60, 25, 1.5, 10, 30]], columns=list(TRAINING_COLUMNS)))
+    assert abs(score - model_loader.get_iso_forest().decision_function(X)[0]) < 1e-6
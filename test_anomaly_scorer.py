@@ -0,0 +1,116 @@
+"""
+Streaming anomaly scorer test: each buffered reading is scored exactly
+once at ingestion, the stored score matches the Isolation Forest's
+decision_function, and /api/anomalies serves the stored scores.
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from app.model_loader import model_loader
+from app.services.anomaly_scorer import AnomalyScorer
+from app.services.live_aqi_service import LiveAQIService
+from app.services.pollution_reading import PollutionReading
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+def _reading(ts, **fields):
+    return PollutionReading(aqi=fields.pop('aqi', 100), ts=ts, station="Test", **fields)
+
+
+def test_readings_scored_once_at_ingestion():
+    service = LiveAQIService()
+    scorer = AnomalyScorer()
+    service.add_reading_listener(scorer.on_reading)
+
+    normal = _reading(1_000, pm25=60, no2=25, so2=10, o3=30, co=1.0)
+    extreme = _reading(2_000, aqi=500, pm25=900, no2=400, so2=300, o3=250, co=40)
+    service.add_to_buffer("Delhi", normal)
+    service.add_to_buffer("Delhi", extreme)
+
+    assert scorer.scored == 2
+    # Scaler / training column order: PM2.5, NO2, CO, SO2, O3
+    rows = pd.DataFrame([[60, 25, 1.0, 10, 30], [900, 400, 40, 300, 250]], columns=['PM2.5', 'NO2', 'CO', 'SO2', 'O3'])
+    X = model_loader.get_iso_scaler().transform(rows)
+    expected = model_loader.get_iso_forest().decision_function(X)
+    assert abs(normal.anomaly_score - expected[0]) < 1e-6
+    assert abs(extreme.anomaly_score - expected[1]) < 1e-6
+    assert extreme.is_anomaly and not normal.is_anomaly
+
+    # Serving the buffer does not score again
+    scorer.ensure_scored("Delhi", service.get_buffer("Delhi"))
+    assert scorer.scored == 2
+
+
+def test_anomaly_route_filters_stored_scores(monkeypatch):
+    from app import create_app
+    from app.config import TestingConfig
+    from app.services import live_aqi_service as live_module
+
+    app = create_app(TestingConfig)
+    service = live_module.get_live_aqi_service()
+    monkeypatch.setattr(service, 'fetch_and_buffer', lambda city: (None, 'error'))
+    service.clear_buffer("Testville")
+    service.add_to_buffer("Testville", _reading(1_000, pm25=60, no2=25, so2=10, o3=30, co=1.0))
+    service.add_to_buffer("Testville", _reading(2_000, aqi=500, pm25=900, no2=400, so2=300, o3=250, co=40))
+
+    body = app.test_client().get('/api/anomalies/Testville').get_json()
+    assert body['total_hours_checked'] == 2
+    assert body['anomaly_count'] == 1
+    assert [s['is_anomaly'] for s in body['scores']] == [False, True]
+    assert body['alerts'][0]['anomaly_score'] == body['scores'][1]['anomaly_score']
+
+    # Clearing the buffer also drops the city's prefilter baseline
+    from app.services.anomaly_scorer import get_anomaly_scorer
+    assert 'Testville' in get_anomaly_scorer().prefilter._state
+    service.clear_buffer("Testville")
+    assert 'Testville' not in get_anomaly_scorer().prefilter._state
+
+
+def _stream(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        _reading(1_000 + 3_600 * i, pm25=rng.normal(60, 6), no2=rng.normal(25, 3), so2=rng.normal(10, 1),
+                 o3=rng.normal(30, 3), co=rng.normal(1.0, 0.1))
+        for i in range(n)
+    ]
+
+
+def test_prefilter_skips_normal_readings_and_escalates_spikes():
+    scorer = AnomalyScorer(sample_rate=0.0)
+    readings = _stream(60)
+    for reading in readings:
+        scorer.on_reading("Delhi", reading)
+    spike = _reading(1_000 + 3_600 * 60, aqi=500, pm25=900, no2=400, so2=300, o3=250, co=40)
+    scorer.on_reading("Delhi", spike)
+
+    stats = scorer.get_stats()
+    assert stats['readings'] == 61
+    assert stats['skip_fraction'] > 0.8
+    assert stats['model_runs'] == 61 - stats['skipped']
+    assert spike.is_anomaly and spike.anomaly_score < 0
+    assert stats['escalated'] >= 1 and stats['confirmed'] >= 1
+    skipped = [r for r in readings if r.anomaly_score is None]
+    assert skipped and not any(r.is_anomaly for r in skipped)
+
+
+def test_sampled_readings_measure_agreement_with_full_scoring():
+    cascade = AnomalyScorer(sample_rate=1.0)
+    full = AnomalyScorer(prefilter=False)
+    for a, b in zip(_stream(40, seed=1), _stream(40, seed=1)):
+        cascade.on_reading("Pune", a)
+        full.on_reading("Pune", b)
+        assert a.anomaly_score == b.anomaly_score
+
+    stats = cascade.get_stats()
+    assert stats['skipped'] == 0 and stats['sampled'] > 0
+    assert 0.0 <= stats['agreement_rate'] <= 1.0
+    assert stats['estimated_miss_rate'] == 0.0
@@ -0,0 +1,130 @@
+"""
+National anomaly sweep test: the process-pool sweep must give the same
+scores as scoring the cleaned dataset in one pass (as
+evaluation/check_anomalies.py does), and range queries on the written
+index must return exactly the anomalies inside the range.
+"""
+
+import sys
+import os
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+from app.model_loader import model_loader
+from app.services.anomaly_sweep import FEATURE_COLS, AnomalyIndex, clamp_workers, run_sweep
+
+warnings.filterwarnings('ignore')
+
+
+def _write_hourly(path):
+    rng = np.random.default_rng(7)
+    frames = []
+    for city, scale in (("Delhi", 3.0), ("Mumbai", 1.0), ("Patna", 2.0)):
+        n = 120
+        data = {
+            'City': city,
+            'Datetime': pd.date_range('2019-01-01', periods=n, freq='h').astype(str),
+            'PM2.5': rng.gamma(2, 30 * scale, n),
+            'NO2': rng.gamma(2, 12 * scale, n),
+            'CO': rng.gamma(2, 1 * scale, n),
+            'SO2': rng.gamma(2, 8 * scale, n),
+            'O3': rng.gamma(2, 15, n),
+            'AQI': 0,
+        }
+        frame = pd.DataFrame(data)
+        frame.loc[rng.choice(n, 10, replace=False), 'NO2'] = np.nan
+        frames.append(frame)
+    df = pd.concat(frames).sample(frac=1, random_state=1)  # Unsorted, like a raw export
+    df.to_csv(path, index=False)
+
+
+def _reference_scores(path):
+    df = pd.read_csv(path)
+    df['Datetime'] = pd.to_datetime(df['Datetime'])
+    df = df.sort_values(['City', 'Datetime']).reset_index(drop=True)
+    df[FEATURE_COLS] = df.groupby('City')[FEATURE_COLS].transform(lambda x: x.ffill().bfill())
+    df = df.dropna(subset=FEATURE_COLS)
+    X_scaled = model_loader.get_iso_scaler().transform(df[FEATURE_COLS])
+    df['score'] = model_loader.get_iso_forest().decision_function(X_scaled)
+    return df
+
+
+def test_sweep_matches_single_process_scoring(tmp_path):
+    dataset = tmp_path / 'city_hour.csv'
+    index_path = str(tmp_path / 'anomaly_index.npz')
+    _write_hourly(dataset)
+
+    summary = run_sweep(str(dataset), index_path, workers=2)
+    reference = _reference_scores(dataset)
+    assert summary['rows_scored'] == len(reference) == 360
+    assert summary['anomalies'] == int((reference['score'] < 0).sum())
+
+    index = AnomalyIndex(index_path)
+    assert index.cities == ['Delhi', 'Mumbai', 'Patna']
+    assert np.allclose(index.score, reference['score'].to_numpy(), atol=1e-6)
+
+    delhi = reference[reference['City'] == 'Delhi']
+    start, end = pd.Timestamp('2019-01-02 00:00'), pd.Timestamp('2019-01-03 11:00')
+    window = delhi[(delhi['Datetime'] >= start) & (delhi['Datetime'] <= end)]
+
+    result = index.query('delhi', start.value // 10**9, end.value // 10**9)
+    assert result['total_hours_checked'] == len(window) == 36
+    expected = window[window['score'] < 0]['Datetime'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    assert [a['timestamp'] for a in result['alerts']] == expected
+    assert index.query('Atlantis') is None
+
+
+def test_range_route_uses_index(tmp_path, monkeypatch):
+    from app import create_app
+    from app.config import TestingConfig
+    from app.services import city_registry
+
+    dataset = tmp_path / 'city_hour.csv'
+    _write_hourly(dataset)
+    monkeypatch.setattr(Config, 'ANOMALY_INDEX_PATH', str(tmp_path / 'anomaly_index.npz'))
+    monkeypatch.setattr(Config, 'CITY_REGISTRY_PATH', str(tmp_path / 'city_registry.json'))
+    monkeypatch.setattr(city_registry, '_city_registry', None)
+    client = create_app(TestingConfig).test_client()
+
+    assert client.get('/api/anomalies/Delhi?from=2019-01-02').status_code == 404
+    run_sweep(str(dataset), workers=1)
+
+    response = client.get('/api/anomalies/Delhi?from=2019-01-02&to=2019-01-02T23:00:00')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['data_source'] == 'sweep_index'
+    assert body['total_hours_checked'] == 24
+    assert client.get('/api/anomalies/Delhi?from=yesterday-ish').status_code == 400
+
+
+def test_sweep_workers_are_clamped(tmp_path, monkeypatch):
+    from app import create_app
+    from app.config import TestingConfig
+    from app.routes import anomaly as anomaly_routes
+
+    cpus = os.cpu_count() or 1
+    assert clamp_workers(None) == cpus
+    assert (clamp_workers(0), clamp_workers(-3), clamp_workers(500)) == (1, 1, cpus)
+
+    started = []
+
+    class RecordingJob:
+        status = {'state': 'running'}
+
+        def start(self, workers):
+            started.append(workers)
+            return True
+
+    dataset = tmp_path / 'city_hour.csv'
+    _write_hourly(dataset)
+    monkeypatch.setattr(Config, 'HOURLY_DATASET_PATH', str(dataset))
+    monkeypatch.setattr(anomaly_routes, 'get_anomaly_sweep_job', lambda: RecordingJob())
+    client = create_app(TestingConfig).test_client()
+    for workers in ('500', '0', '-3'):
+        assert client.post(f'/api/anomalies/sweep?workers={workers}').status_code == 202
+    assert started == [cpus, 1, 1]
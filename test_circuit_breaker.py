@@ -0,0 +1,146 @@
+"""
+Circuit breaker test: closed -> open -> half_open -> closed transitions
+with a single half-open probe, stale readings served while a city's
+breaker is open (without calling WAQI), background probes closing a
+recovered city, and breakers for cities that never recover being dropped
+instead of probed forever.
+"""
+
+import sys
+import os
+import logging
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services import live_aqi_service as live_module
+from app.services.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+from app.services.live_aqi_service import LiveAQIService
+
+
+class FakeWAQI:
+    """requests.get stand-in: cities in `live` answer ok, others a WAQI error status."""
+
+    def __init__(self, live=()):
+        self.live = set(live)
+        self.calls = []
+
+    def __call__(self, url, timeout=None):
+        city = url.split('/feed/', 1)[1].split('/', 1)[0]
+        self.calls.append(city)
+        fake = self
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                if city in fake.live:
+                    return {'status': 'ok', 'data': {'aqi': 150, 'iaqi': {'pm25': {'v': 80}}, 'city': {'name': city}}}
+                return {'status': 'error', 'data': 'Unknown station'}
+
+        return Response()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    logging.disable(logging.CRITICAL)
+    waqi = FakeWAQI(live=['Delhi'])
+    monkeypatch.setattr(live_module.requests, 'get', waqi)
+    service = LiveAQIService()
+    service.breakers.reset_timeout = 0  # Breakers created from here on may be probed immediately
+    service._probe_thread = object()  # Probes are driven by the test, not the background loop
+    service.waqi = waqi
+    yield service
+    logging.disable(logging.NOTSET)
+
+
+def test_state_transitions_and_single_probe():
+    breaker = CircuitBreaker('waqi:Delhi', failure_threshold=3, reset_timeout=0)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    # Exactly one caller wins the half-open probe; requests keep short-circuiting
+    assert breaker.try_begin_probe()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.try_begin_probe()
+    assert not breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.failed_probes == 1
+
+    assert breaker.try_begin_probe()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    snapshot = breaker.snapshot()
+    assert snapshot['consecutive_failures'] == 0 and snapshot['failed_probes'] == 0
+    assert snapshot['short_circuited_requests'] == 2
+
+
+def test_probe_waits_for_reset_window():
+    breaker = CircuitBreaker('waqi', failure_threshold=1, reset_timeout=3600)
+    breaker.record_failure()
+    assert not breaker.try_begin_probe()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_registry_is_bounded():
+    registry = CircuitBreakerRegistry(failure_threshold=1, max_breakers=3)
+    registry.get('a').record_failure()  # open
+    registry.get('b')
+    registry.get('c')
+    registry.get('d')
+    # The oldest closed breaker made room; the open one keeps its state
+    assert set(registry.snapshot()) == {'a', 'c', 'd'}
+    assert registry.get('a').state == CircuitBreaker.OPEN
+    registry.remove('a')
+    assert registry.get('a').state == CircuitBreaker.CLOSED
+
+
+def test_stale_reading_served_while_open(service):
+    reading, source = service.fetch_and_buffer('Delhi')
+    assert source == 'live' and reading.aqi == 150
+
+    service.waqi.live.clear()
+    for _ in range(service.BREAKER_FAILURE_THRESHOLD):
+        assert service.fetch_and_buffer('Delhi')[1] == 'fallback'
+    assert service.get_breaker_states()['waqi:Delhi']['state'] == 'open'
+
+    calls = len(service.waqi.calls)
+    stale, source = service.fetch_and_buffer('Delhi')
+    assert source == 'fallback' and stale.get('stale') and stale.aqi == 150
+    assert len(service.waqi.calls) == calls  # Short-circuited, WAQI not called
+
+    # City recovers: the background probe closes the breaker
+    service.waqi.live.add('Delhi')
+    service.probe_open_breakers()
+    assert service.get_breaker_states()['waqi:Delhi']['state'] == 'closed'
+    assert service.fetch_and_buffer('Delhi')[1] == 'live'
+
+
+def test_breakers_that_never_recover_are_dropped(service):
+    for _ in range(service.BREAKER_FAILURE_THRESHOLD):
+        assert service.fetch_and_buffer('Atlantis') == (None, 'error')
+    assert service.get_breaker_states()['waqi:Atlantis']['state'] == 'open'
+
+    for _ in range(service.MAX_FAILED_PROBES - 1):
+        service.probe_open_breakers()
+    assert service.get_breaker_states()['waqi:Atlantis']['failed_probes'] == service.MAX_FAILED_PROBES - 1
+
+    service.probe_open_breakers()
+    assert 'waqi:Atlantis' not in service.get_breaker_states()
+    calls = len(service.waqi.calls)
+    service.probe_open_breakers()
+    assert len(service.waqi.calls) == calls  # No longer probed
+    # The upstream itself stayed healthy throughout
+    assert service.get_breaker_states()['waqi']['state'] == 'closed'
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,80 @@
+"""
+City registry test with a stubbed WAQI fetch: the persisted list is
+loaded (unknown cities dropped), a successful revalidation is published
+and persisted with its validated_at, and a failed or circuit-broken
+revalidation keeps the previous list.
+"""
+
+import sys
+import os
+import json
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services import city_registry
+from app.services.city_registry import CityRegistry, MAJOR_CITIES
+
+
+class StubService:
+    def __init__(self, live=(), upstream_available=True):
+        self.live = set(live)
+        self.upstream_available = upstream_available
+        self.fetched = []
+
+    def is_upstream_available(self, city):
+        return self.upstream_available
+
+    def fetch_live_pollution(self, city):
+        self.fetched.append(city)
+        return {'aqi': 120} if city in self.live else None
+
+
+def _stub(monkeypatch, service):
+    monkeypatch.setattr(city_registry, 'get_live_aqi_service', lambda: service)
+    return service
+
+
+def test_load_falls_back_and_filters(tmp_path):
+    path = tmp_path / 'city_registry.json'
+    missing = CityRegistry(str(path))
+    assert missing.get_snapshot() == {'cities': sorted(MAJOR_CITIES), 'validated_at': None}
+
+    path.write_text('{not json')
+    assert CityRegistry(str(path)).get_snapshot()['cities'] == sorted(MAJOR_CITIES)
+
+    path.write_text(json.dumps({'cities': ['Pune', 'Atlantis', 'Delhi'], 'validated_at': '2026-01-01T00:00:00Z'}))
+    assert CityRegistry(str(path)).get_snapshot() == {'cities': ['Delhi', 'Pune'], 'validated_at': '2026-01-01T00:00:00Z'}
+
+
+def test_revalidation_is_published_and_persisted(monkeypatch, tmp_path):
+    path = tmp_path / 'city_registry.json'
+    _stub(monkeypatch, StubService(live=['Mumbai', 'Delhi']))
+    registry = CityRegistry(str(path))
+    assert not registry._is_fresh()
+
+    snapshot = registry.revalidate()
+    assert snapshot['cities'] == ['Delhi', 'Mumbai']
+    validated = datetime.fromisoformat(snapshot['validated_at'].rstrip('Z'))
+    assert datetime.utcnow() - validated < timedelta(minutes=1)
+    assert registry.get_snapshot() is snapshot and registry._is_fresh()
+
+    assert json.loads(path.read_text()) == snapshot
+    assert CityRegistry(str(path)).get_snapshot() == snapshot
+
+
+def test_failed_revalidation_keeps_previous_list(monkeypatch, tmp_path):
+    path = tmp_path / 'city_registry.json'
+    previous = {'cities': ['Delhi', 'Pune'], 'validated_at': '2026-01-01T00:00:00Z'}
+    path.write_text(json.dumps(previous))
+    registry = CityRegistry(str(path))
+
+    # Every city fails validation
+    _stub(monkeypatch, StubService())
+    assert registry.revalidate() == previous
+    assert registry.get_snapshot() == previous and json.loads(path.read_text()) == previous
+
+    # Upstream circuit open: nothing is fetched at all
+    service = _stub(monkeypatch, StubService(live=MAJOR_CITIES, upstream_available=False))
+    assert registry.revalidate() == previous and service.fetched == []
+    assert not registry._is_fresh()
@@ -0,0 +1,145 @@
+"""
+Classification cache test: exact resubmissions hit by content hash,
+re-encoded / resized copies hit through the dHash Hamming index,
+different photos miss, fallback results are not cached, the cache is
+reloaded from disk, and report_violation answers cache hits without
+queueing YOLO.
+"""
+
+import sys
+import os
+import io
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+import numpy as np
+from PIL import Image
+
+from app.services.classification_cache import ClassificationCache, hamming, weights_fingerprint
+from app.services.image_ingest import ingest_image
+
+warnings.filterwarnings('ignore')
+
+
+DETECTION = {'violation_type': 'industrial_smoke', 'confidence': 0.81, 'severity': 'High',
+             'action_required': 'Immediate Inspection Required', 'detected_class': 'smoke',
+             'all_detections': [{'class': 'smoke', 'confidence': 0.81, 'bbox': [1.0, 2.0, 30.0, 40.0]}],
+             'method': 'yolo_v8'}
+
+
+def _photo(seed, size=(400, 300)):
+    rng = np.random.default_rng(seed)
+    # Smooth random field: a stand-in photo with structure for the dHash to pick up
+    small = rng.integers(0, 255, (6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(small).resize(size, Image.BICUBIC)
+
+
+def _upload(im, quality=90, size=None):
+    if size:
+        im = im.resize(size, Image.BILINEAR)
+    out = io.BytesIO()
+    im.save(out, format='JPEG', quality=quality)
+    return out.getvalue()
+
+
+def test_exact_and_near_duplicate_lookup(tmp_path):
+    cache = ClassificationCache(str(tmp_path / 'cache.jsonl'))
+    original = ingest_image(io.BytesIO(_upload(_photo(1))))
+    cache.store(original.sha256, original.dhash, DETECTION)
+
+    same = ingest_image(io.BytesIO(_upload(_photo(1))))
+    assert cache.lookup(same.sha256, same.dhash) == (DETECTION, 'exact')
+
+    resaved = ingest_image(io.BytesIO(_upload(_photo(1), quality=60, size=(320, 240))))
+    assert resaved.sha256 != original.sha256
+    assert hamming(resaved.dhash, original.dhash) <= cache.max_distance
+    assert cache.lookup(resaved.sha256, resaved.dhash) == (DETECTION, 'near')
+
+    other = ingest_image(io.BytesIO(_upload(_photo(2))))
+    assert cache.lookup(other.sha256, other.dhash) == (None, None)
+
+    stats = cache.get_stats()
+    assert (stats['lookups'], stats['exact_hits'], stats['near_hits'], stats['misses']) == (3, 1, 1, 1)
+    assert stats['hit_rate'] == round(2 / 3, 4)
+
+    # Survives a restart
+    reloaded = ClassificationCache(str(tmp_path / 'cache.jsonl'))
+    assert reloaded.get_stats()['entries'] == 1
+    assert reloaded.lookup(resaved.sha256, resaved.dhash) == (DETECTION, 'near')
+
+
+def test_only_real_detections_are_cached(tmp_path):
+    cache = ClassificationCache(str(tmp_path / 'cache.jsonl'))
+    report = {'image_sha256': 'ab' * 32, 'image_dhash': f"{0x0123456789abcdef:016x}"}
+    cache.on_classified(report, {'yolo_detection': {'detected_class': 'none', 'all_detections': []}})
+    assert cache.get_stats()['entries'] == 0
+    cache.on_classified(report, {'yolo_detection': DETECTION})
+    assert cache.lookup('ab' * 32, 0) == (DETECTION, 'exact')
+
+
+def test_entries_from_other_weights_are_dropped(tmp_path):
+    weights = tmp_path / 'best.pt'
+    weights.write_bytes(b'weights v1')
+    v1 = weights_fingerprint(str(weights))
+    path = str(tmp_path / 'cache.jsonl')
+
+    cache = ClassificationCache(path, model_fingerprint=v1)
+    cache.store('ab' * 32, 0x0123456789abcdef, DETECTION)
+    assert ClassificationCache(path, model_fingerprint=v1).lookup('ab' * 32, 0)[1] == 'exact'
+
+    # Retrained model: the old detection is not served and is compacted out of the file
+    weights.write_bytes(b'weights v2')
+    v2 = weights_fingerprint(str(weights))
+    assert v2 != v1 and weights_fingerprint(str(tmp_path / 'gone.pt')) == 'missing'
+    retrained = ClassificationCache(path, model_fingerprint=v2)
+    assert retrained.get_stats()['entries'] == 0
+    assert retrained.lookup('ab' * 32, 0x0123456789abcdef) == (None, None)
+    assert (tmp_path / 'cache.jsonl').read_text() == ''
+
+
+def test_resubmitted_photo_skips_the_queue(monkeypatch, tmp_path):
+    from app import create_app
+    from app.config import Config, TestingConfig
+    from app.services import classification_cache, report_jobs, report_repository
+
+    calls = []
+
+    def classify(items):
+        calls.append(len(items))
+        return [{'violation_type': 'industrial_smoke', 'severity': 'High', 'confidence': 0.8,
+                 'action_required': 'Immediate Inspection Required', 'yolo_detection': DETECTION}] * len(items)
+
+    jobs = report_jobs.ClassificationJobQueue(classify, workers=1)
+    monkeypatch.setattr(report_jobs, '_classification_queue', jobs)
+    monkeypatch.setattr(classification_cache, '_classification_cache',
+                        ClassificationCache(str(tmp_path / 'cache.jsonl')))
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(Config, 'THUMBNAIL_FOLDER', str(tmp_path / 'thumbnails'))
+    monkeypatch.setattr(report_repository, '_report_repository',
+                        report_repository.ReportRepository(str(tmp_path / 'reports.db')))
+    client = create_app(TestingConfig).test_client()
+
+    def submit(data):
+        return client.post('/api/report_violation', data={
+            'image': (io.BytesIO(data), 'photo.jpg'), 'description': 'smoke from a chimney',
+        }, content_type='multipart/form-data')
+
+    first = submit(_upload(_photo(5)))
+    assert first.status_code == 202
+    jobs.join()
+
+    again = submit(_upload(_photo(5)))
+    assert again.status_code == 200
+    assert again.get_json()['classification_cache'] == 'exact'
+    near = submit(_upload(_photo(5), quality=50, size=(300, 225)))
+    assert near.get_json()['classification_cache'] == 'near'
+    assert calls == [1]
+
+    report = client.get(near.get_json()['status_url']).get_json()['report']
+    assert report['classification_status'] == 'done'
+    assert report['yolo_detection'] == DETECTION
+    assert report['violation_type'] == 'industrial_smoke'
+
+    stats = client.get('/api/reports/cache').get_json()['cache']
+    assert stats['exact_hits'] == 1 and stats['near_hits'] == 1 and stats['misses'] == 1
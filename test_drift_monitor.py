@@ -0,0 +1,121 @@
+"""
+Drift monitor test: live inputs drawn from the training data must read
+as stable, shifted inputs as drifted, and the per-city histograms must
+stay bounded in size.
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+from app.services.drift_monitor import DriftMonitor, MODEL_FEATURES, NATIONAL, binned_ks, psi
+from app.services.pollution_reading import PollutionReading
+
+# Unpickling the ISO scaler warns about the sklearn version; keep it to this module
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+def _training_readings(n, scale=1.0, seed=0):
+    df = pd.read_csv(Config.AQI_DATASET_PATH).dropna(subset=['PM2.5', 'NO2', 'CO', 'SO2', 'O3', 'AQI'])
+    rows = df.sample(n, random_state=seed)
+    return [
+        PollutionReading(
+            aqi=row['AQI'] * scale, pm25=row['PM2.5'] * scale, pm10=row['PM10'], no2=row['NO2'],
+            co=row['CO'], so2=row['SO2'], o3=row['O3'], wind_speed=row['wind_speed'],
+            temperature=row['temperature'], humidity=row['humidity'],
+        )
+        for _, row in rows.iterrows()
+    ]
+
+
+def _monitor():
+    return DriftMonitor.from_file(Config.DRIFT_REFERENCE_PATH)
+
+
+def test_psi_and_ks_basics():
+    expected = np.array([0.25, 0.25, 0.25, 0.25])
+    assert psi(expected, expected) == 0.0
+    assert binned_ks(np.array([1.0, 0, 0, 0]), expected) == 0.75
+    assert psi(np.array([0.7, 0.1, 0.1, 0.1]), expected) > 0.25
+
+
+def test_training_like_inputs_are_stable_and_shifted_inputs_drift():
+    monitor = _monitor()
+    for reading in _training_readings(400):
+        monitor.on_reading("Delhi", reading)
+    for reading in _training_readings(400, scale=3.0, seed=1):
+        monitor.on_reading("Patna", reading)
+
+    delhi = monitor.report("Delhi")['models']
+    for model in MODEL_FEATURES:
+        assert delhi[model]['status'] == 'stable', (model, delhi[model])
+    assert delhi['risk_model']['features']['AQI']['status'] == 'stable'
+    assert delhi['lstm']['features']['wind_speed']['status'] == 'stable'
+    # Live readings never carry violations_7d: reported, but not scored
+    assert delhi['lstm']['features']['violations_7d'] == {'status': 'not_observed'}
+    assert delhi['risk_model']['features']['violations_7d'] == {'status': 'not_observed'}
+
+    patna = monitor.report("Patna", 'isolation_forest')['models']
+    assert list(patna) == ['isolation_forest']
+    assert patna['isolation_forest']['features']['PM2.5']['status'] == 'significant_drift'
+    assert patna['isolation_forest']['features']['NO2']['status'] == 'stable'
+
+    national = monitor.report()['models']['risk_model']
+    assert national['samples'] == 800
+    assert monitor.report("Nowhere")['models']['lstm']['status'] == 'no_data'
+
+
+def test_missing_values_are_skipped():
+    monitor = _monitor()
+    for reading in _training_readings(400):
+        # A station without PM10 or weather sensors
+        monitor.on_reading("Agra", PollutionReading(aqi=reading.aqi, pm25=reading.pm25, no2=reading.no2,
+                                                    co=reading.co, so2=reading.so2, o3=reading.o3))
+
+    lstm = monitor.report("Agra", 'lstm')['models']['lstm']
+    assert lstm['status'] == 'stable' and lstm['samples'] == 400
+    for feature in ('PM10', 'wind_speed', 'temperature', 'humidity'):
+        assert lstm['features'][feature] == {'status': 'not_observed'}
+    assert lstm['features']['PM2.5']['samples'] == 400
+
+
+def test_memory_is_bounded():
+    monitor = _monitor()
+    monitor.MAX_CITIES = 3
+    monitor.DECAY_AT = 100
+    readings = _training_readings(50)
+    for i in range(10):
+        for reading in readings[:30]:
+            monitor.on_reading(f"City{i}", reading)
+
+    assert monitor.tracked_cities() == ['City0', 'City1', 'City2']
+    assert len(monitor._histograms) == 4 * len(MODEL_FEATURES)
+    assert monitor._totals[('lstm', NATIONAL)] < 100
+
+
+def test_per_reading_cost_is_small():
+    monitor = _monitor()
+    readings = _training_readings(200)
+    monitor.on_reading("Delhi", readings[0])  # Loads the ISO schema
+    started = time.perf_counter()
+    for reading in readings:
+        monitor.on_reading("Delhi", reading)
+    assert (time.perf_counter() - started) / len(readings) < 0.002
+
+
+def test_drift_endpoint():
+    from app import create_app
+    from app.config import TestingConfig
+
+    client = create_app(TestingConfig).test_client()
+    body = client.get('/api/drift').get_json()
+    assert set(body['models']) == set(MODEL_FEATURES)
+    assert client.get('/api/drift?model=prophet').status_code == 400
@@ -0,0 +1,84 @@
+"""
+Parity test: EnvironmentalIntelligence.compute_risk_batch must match the
+scalar compute_composite_risk_score / detect_early_warning path exactly.
+"""
+
+import sys
+import os
+import logging
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services.environmental_intelligence import EnvironmentalIntelligence
+
+
+def _random_contexts(n, seed=7):
+    rng = np.random.default_rng(seed)
+
+    def maybe(value, p_missing=0.2):
+        return None if rng.random() < p_missing else value
+
+    contexts = []
+    for _ in range(n):
+        # Integer-heavy grids so threshold boundaries (1.5, 70, 1010, ...) are hit
+        pm25 = maybe(float(rng.integers(0, 400)))
+        contexts.append({
+            'aqi': float(rng.integers(0, 600)),
+            'pollutants': {
+                'pm25': pm25,
+                'pm10': maybe(float(rng.integers(0, 600))),
+                'no2': maybe(float(rng.integers(0, 250))),
+                'so2': None, 'o3': None, 'co': None, 'dominant': None,
+            },
+            'weather': {
+                'wind_speed': maybe(float(rng.choice([0, 0.5, 0.99, 1.0, 1.5, 1.99, 2.0, 2.5, 3.0, 4.0]))),
+                'humidity': maybe(float(rng.choice([0, 50, 70, 71, 80, 81, 95]))),
+                'pressure': maybe(float(rng.choice([990, 1005, 1010, 1011, 1020]))),
+                'temperature': None,
+            },
+            'forecast': {
+                'pm25_avg_3d': maybe(
+                    (pm25 or 0) + float(rng.choice([-15, 0, 5, 10, 11, 20, 21, 60]))
+                ),
+            },
+        })
+    return contexts
+
+
+def test_batch_matches_scalar_scoring():
+    logging.disable(logging.CRITICAL)
+    try:
+        intelligence = EnvironmentalIntelligence()
+        contexts = _random_contexts(5000)
+
+        batch = intelligence.compute_risk_batch(**intelligence.contexts_to_columns(contexts))
+
+        for i, context in enumerate(contexts):
+            score, category, escalation = intelligence.compute_composite_risk_score(context)
+            warning = intelligence.detect_early_warning(context)
+
+            assert batch['risk_score'][i] == score, (i, context)
+            assert batch['risk_category'][i] == category, (i, context)
+            assert batch['escalation_probability'][i] == escalation, (i, context)
+            assert bool(batch['early_warning'][i]) == (warning is not None), (i, context)
+            if warning is not None:
+                assert batch['early_warning_severity'][i] == warning[1], (i, context)
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def test_batch_accepts_missing_columns():
+    intelligence = EnvironmentalIntelligence()
+    batch = intelligence.compute_risk_batch(aqi=[50, 300, None])
+
+    assert batch['risk_score'].shape == (3,)
+    assert list(batch['escalation_probability']) == [0.2, 0.2, 0.2]
+    assert not batch['early_warning'].any()
+
+
+if __name__ == "__main__":
+    test_batch_matches_scalar_scoring()
+    test_batch_accepts_missing_columns()
+    print("✅ Batch scoring matches scalar scoring")
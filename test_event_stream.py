@@ -0,0 +1,164 @@
+"""
+Tests for the live event stream: broadcaster fan-out with per-city
+filtering and bounded queues, risk-change / early-warning events, the
+poller skipping fresh cities, and the /api/stream SSE route.
+"""
+
+import sys
+import os
+import json
+import logging
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services import event_broadcaster as broadcaster_module
+from app.services.environmental_intelligence import get_environmental_intelligence
+from app.services.event_broadcaster import EventBroadcaster
+from app.services.live_aqi_service import LiveAQIService
+from app.services.pollution_reading import PollutionReading
+
+CALM = dict(aqi=40, pm25=12, pm10=30, no2=10, wind_speed=4.0, humidity=40, pressure=1000)
+STAGNANT = dict(aqi=320, pm25=210, pm10=380, no2=95, wind_speed=0.4, humidity=85,
+                pressure=1016, forecast_pm25_avg=260)
+
+
+def _wired_service(broadcaster):
+    service = LiveAQIService()
+    service.add_reading_listener(get_environmental_intelligence().update_city_state)
+    service.add_reading_listener(broadcaster.on_reading)
+    return service
+
+
+def _drain(subscription):
+    events = []
+    while True:
+        event = subscription.get(timeout=0)
+        if event is None:
+            return events
+        events.append(event)
+
+
+def test_events_fan_out_to_matching_subscribers():
+    logging.disable(logging.CRITICAL)
+    broadcaster = EventBroadcaster()
+    service = _wired_service(broadcaster)
+    everyone = broadcaster.subscribe()
+    delhi_only = broadcaster.subscribe(frozenset({"Delhi"}))
+
+    service.add_to_buffer("Delhi", PollutionReading(station="Delhi", ts=1000, **CALM))
+    service.add_to_buffer("Mumbai", PollutionReading(station="Mumbai", ts=1000, **CALM))
+    service.add_to_buffer("Delhi", PollutionReading(station="Delhi", ts=2000, **STAGNANT))
+
+    delhi_events = [(e.event_type, e.city) for e in _drain(delhi_only)]
+    assert delhi_events == [
+        ('reading', 'Delhi'), ('reading', 'Delhi'), ('risk_change', 'Delhi'), ('early_warning', 'Delhi'),
+    ]
+    all_events = _drain(everyone)
+    assert len(all_events) == 5
+    assert {e.city for e in all_events} == {"Delhi", "Mumbai"}
+
+    # Events are shared objects with a ready-to-send SSE payload
+    change = next(e for e in all_events if e.event_type == 'risk_change')
+    assert change.data['previous_level'] == 'Low'
+    assert change.payload.startswith(f"id: {change.event_id}\nevent: risk_change\ndata: ")
+
+    # An unchanged level / ongoing warning does not repeat those events
+    service.add_to_buffer("Delhi", PollutionReading(station="Delhi", ts=3000, **STAGNANT))
+    assert [e.event_type for e in _drain(delhi_only)] == ['reading']
+    logging.disable(logging.NOTSET)
+
+
+def test_slow_subscriber_queue_is_bounded():
+    broadcaster = EventBroadcaster()
+    slow = broadcaster.subscribe(max_queue=5)
+    for i in range(12):
+        broadcaster.publish('reading', 'Delhi', {'seq': i})
+
+    assert [e.data['seq'] for e in _drain(slow)] == [7, 8, 9, 10, 11]
+    assert slow.dropped == 7
+    assert broadcaster.get_stats()['events_dropped'] == 7
+
+    broadcaster.unsubscribe(slow)
+    assert broadcaster.get_stats()['subscribers'] == 0
+    assert broadcaster.subscribed_cities() == frozenset()
+
+
+def test_poller_skips_fresh_cities(monkeypatch):
+    class Service(LiveAQIService):
+        def __init__(self):
+            super().__init__()
+            self.fetched = []
+
+        def fetch_and_buffer(self, city):
+            self.fetched.append(city)
+            self.add_to_buffer(city, PollutionReading(station=city, **CALM))
+
+    service = Service()
+    monkeypatch.setattr(broadcaster_module, 'get_live_aqi_service', lambda: service)
+    broadcaster = EventBroadcaster()
+    poller = broadcaster_module.LivePoller(broadcaster)
+    broadcaster.subscribe(frozenset({'Delhi', 'Pune'}))
+    service.add_to_buffer('Delhi', PollutionReading(station='Delhi', **CALM))
+
+    assert poller.poll_once() == 1 and service.fetched == ['Pune']
+    # A reconnecting client re-polls nothing while the buffers are fresh
+    broadcaster.subscribe(frozenset({'Delhi'}))
+    assert poller.poll_once() == 0 and service.fetched == ['Pune']
+
+    service.buffer_timestamps['Delhi'] -= service.BUFFER_TIMEOUT
+    assert poller.poll_once() == 1 and service.fetched == ['Pune', 'Delhi']
+
+
+def test_stream_route_sends_sse(monkeypatch, tmp_path):
+    pytest.importorskip("tensorflow")
+    pytest.importorskip("ultralytics")
+    logging.disable(logging.CRITICAL)
+    from app import create_app
+    from app.config import TestingConfig
+    from app.routes import stream as stream_routes
+    from app.services import city_registry
+
+    class IdlePoller:
+        last_poll = None
+
+        def start(self):
+            pass
+
+        def wake(self):
+            pass
+
+    monkeypatch.setattr(city_registry, '_city_registry', city_registry.CityRegistry(str(tmp_path / 'registry.json')))
+    monkeypatch.setattr(stream_routes, 'get_live_poller', lambda: IdlePoller())
+    broadcaster = EventBroadcaster()
+    monkeypatch.setattr(stream_routes, 'get_event_broadcaster', lambda: broadcaster)
+
+    client = create_app(TestingConfig).test_client()
+    assert client.get('/api/stream?cities=').status_code == 200  # empty means all cities
+    # A response that is never read holds no subscription
+    assert broadcaster.get_stats()['subscribers'] == 0
+    assert client.get('/api/stream?cities=' + ','.join(f'c{i}' for i in range(60))).status_code == 400
+
+    response = client.get('/api/stream?cities=Delhi', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = response.response
+    assert next(chunks).startswith(b"retry:")
+
+    # Publish from another thread while the client is waiting
+    threading.Timer(0.2, broadcaster.publish, args=('reading', 'Delhi', {'city': 'Delhi', 'aqi': 99})).start()
+    # Snapshot events for cities with state come first
+    payload = next(chunks).decode()
+    while payload.startswith("event: snapshot"):
+        payload = next(chunks).decode()
+    assert payload.startswith("id: ")
+    assert json.loads(payload.split("data: ", 1)[1]) == {'city': 'Delhi', 'aqi': 99}
+    assert broadcaster.get_stats()['subscribers'] == 1
+    response.close()
+    assert broadcaster.get_stats()['subscribers'] == 0
+    logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
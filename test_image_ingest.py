@@ -0,0 +1,65 @@
+"""
+Upload ingestion test: the file type comes from the magic bytes, bad or
+tiny images are rejected before decoding, JPEGs are decoded in draft mode
+straight to the detector size, and the stored file is the upload byte for
+byte.
+"""
+
+import sys
+import os
+import io
+import hashlib
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services.image_ingest import DETECTOR_SIZE, ImageRejected, ingest_image
+
+warnings.filterwarnings('ignore')
+
+
+def _encode(size, fmt, color=(200, 60, 20)):
+    out = io.BytesIO()
+    Image.new('RGB', size, color).save(out, format=fmt)
+    return out.getvalue()
+
+
+def test_jpeg_is_decoded_once_at_detector_size(tmp_path):
+    data = _encode((3000, 2000), 'JPEG')
+    image = ingest_image(io.BytesIO(data))
+
+    assert image.extension == 'jpg'
+    assert (image.width, image.height) == (3000, 2000)
+    assert image.pixels.shape == (427, DETECTOR_SIZE, 3)
+    assert image.sha256 == hashlib.sha256(data).hexdigest()
+    # BGR view for YOLO shares the decoded buffer
+    assert np.shares_memory(image.bgr, image.pixels)
+    assert tuple(image.bgr[0, 0]) == tuple(image.pixels[0, 0][::-1])
+
+    path = tmp_path / 'stored.jpg'
+    image.write(str(path))
+    assert path.read_bytes() == data
+    thumb = Image.open(io.BytesIO(image.thumbnail()))
+    assert thumb.format == 'JPEG' and max(thumb.size) == 256
+
+
+def test_type_comes_from_magic_bytes():
+    png = ingest_image(io.BytesIO(_encode((40, 30), 'PNG')))
+    assert png.extension == 'png' and png.pixels.shape == (30, 40, 3)
+    assert ingest_image(io.BytesIO(_encode((40, 30), 'GIF'))).extension == 'gif'
+
+    with pytest.raises(ImageRejected):
+        ingest_image(io.BytesIO(b'-----BEGIN PGP PUBLIC KEY BLOCK-----'))
+    with pytest.raises(ImageRejected):
+        ingest_image(io.BytesIO(b'\xff\xd8\xff' + b'\x00' * 64))  # JPEG magic, corrupt body
+
+
+def test_size_limits():
+    with pytest.raises(ImageRejected):
+        ingest_image(io.BytesIO(_encode((8, 8), 'PNG')))
+    with pytest.raises(ImageRejected):
+        ingest_image(io.BytesIO(_encode((64, 64), 'PNG')), max_bytes=10)
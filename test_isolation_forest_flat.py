@@ -0,0 +1,51 @@
+"""
+Parity test: the flattened Isolation Forest (app/services/tree_ensemble.py)
+must reproduce IsolationForest.decision_function and predict, both freshly
+exported and loaded from the saved artifact, including inputs that sit
+exactly on split thresholds.
+"""
+
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.config import Config
+from app.model_loader import model_loader
+from app.services.tree_ensemble import FlatTreeEnsemble, export_isolation_forest
+
+# Unpickling the forest warns about the sklearn version; keep it to this module
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+def _check_rows(model):
+    rng = np.random.default_rng(3)
+    random_rows = rng.normal(0, 3, (5000, model.n_features_in_))
+    # Rows built from the split thresholds themselves exercise the x <= t boundary
+    thresholds = np.concatenate([e.tree_.threshold[e.tree_.children_left >= 0] for e in model.estimators_[:20]])
+    boundary_rows = rng.choice(thresholds.astype(np.float32), (2000, model.n_features_in_)).astype(np.float64)
+    return np.vstack([random_rows, boundary_rows])
+
+
+def test_flat_forest_matches_decision_function():
+    model = model_loader.get_iso_forest()
+    ensemble = export_isolation_forest(model)
+    X = _check_rows(model)
+
+    assert np.abs(model.decision_function(X) - ensemble.decision_function(X)).max() < 1e-6
+    assert np.abs(model.score_samples(X) - ensemble.score_samples(X)).max() < 1e-6
+    assert (model.predict(X) == ensemble.predict(X)).all()
+
+
+def test_saved_artifact_matches_decision_function(tmp_path):
+    model = model_loader.get_iso_forest()
+    X = _check_rows(model)[:500]
+
+    path = str(tmp_path / 'iso_trees.npz')
+    export_isolation_forest(model).save(path)
+    for ensemble in (FlatTreeEnsemble.load(path), FlatTreeEnsemble.load(Config.ISO_TREES_PATH)):
+        assert ensemble.n_trees == len(model.estimators_)
+        assert np.abs(model.decision_function(X) - ensemble.decision_function(X)).max() < 1e-6
@@ -0,0 +1,123 @@
+"""
+Parity test for the table-driven recommendation engine: the rule table
+must reproduce the original hard-coded recommendation checks, both per
+reading and in the vectorised batch path.
+"""
+
+import sys
+import os
+import json
+import logging
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services.environmental_intelligence import EnvironmentalIntelligence
+from app.services.recommendation_rules import RecommendationRuleEngine
+
+
+def legacy_recommendations(context, risk_category):
+    """The if-block implementation the rule table replaced."""
+    recommendations = []
+    pollutants = context['pollutants']
+    weather = context['weather']
+    aqi = context['aqi']
+    pm25 = pollutants.get('pm25') or 0
+    pm10 = pollutants.get('pm10') or 0
+    no2 = pollutants.get('no2') or 0
+    so2 = pollutants.get('so2') or 0
+    wind_speed = weather.get('wind_speed') or 0
+    humidity = weather.get('humidity') or 0
+    priority_map = {"Critical": 1, "High": 2, "Moderate": 3, "Low": 4}
+    base_priority = priority_map.get(risk_category, 4)
+
+    if no2 > 80 or pm25 > 150:
+        recommendations.append({'action': 'Implement traffic restrictions in hotspot zones',
+                                'reason': f'NO2={no2:.1f} ppb indicates heavy traffic; PM2.5={pm25:.1f} µg/m³ poses health risk',
+                                'priority': base_priority, 'time_horizon': 'Immediate'})
+    if pm10 > 200 and wind_speed < 2.0:
+        recommendations.append({'action': 'Deploy water spraying vehicles in high-pollution zones',
+                                'reason': f'PM10={pm10:.1f} µg/m³ with low wind speed ({wind_speed:.1f} m/s) allows dust accumulation',
+                                'priority': base_priority, 'time_horizon': '2-4 hours'})
+    if so2 > 30:
+        recommendations.append({'action': 'Conduct emergency industrial pollution audit',
+                                'reason': f'SO2={so2:.1f} ppb exceeds safe levels; likely industrial source',
+                                'priority': base_priority - 1 if base_priority > 1 else 1, 'time_horizon': '24 hours'})
+    if wind_speed < 1.0 and aqi > 200:
+        recommendations.append({'action': 'Halt construction activities in stagnant air conditions',
+                                'reason': f'Wind speed={wind_speed:.1f} m/s + AQI={aqi} creates critical environment',
+                                'priority': base_priority, 'time_horizon': 'Immediate'})
+    if pm25 > 100 and humidity > 70:
+        recommendations.append({'action': 'Issue respiratory health alert; increase medical preparedness',
+                                'reason': f'High PM2.5={pm25:.1f} + humidity={humidity:.0f}% increases respiratory risk',
+                                'priority': base_priority, 'time_horizon': 'Immediate'})
+    if aqi > 250:
+        recommendations.append({'action': 'Consider closing schools and outdoor events',
+                                'reason': f'AQI={aqi} reaches hazardous levels; vulnerable groups at severe risk',
+                                'priority': 1, 'time_horizon': 'Immediate'})
+    return recommendations
+
+
+def _random_contexts(n, seed=11):
+    rng = np.random.default_rng(seed)
+
+    def maybe(values):
+        return None if rng.random() < 0.15 else float(rng.choice(values))
+
+    return [{
+        'aqi': float(rng.choice([0, 150, 200, 201, 250, 251, 420])),
+        'pollutants': {'pm25': maybe([0, 40, 100, 101, 150, 151, 260]),
+                       'pm10': maybe([0, 150, 200, 201, 380]),
+                       'no2': maybe([0, 50, 80, 81, 140]),
+                       'so2': maybe([0, 12, 30, 31, 75])},
+        'weather': {'wind_speed': maybe([0, 0.5, 0.99, 1.0, 1.99, 2.0, 3.5]),
+                    'humidity': maybe([0, 55, 70, 71, 90])},
+        'forecast': {},
+    } for _ in range(n)]
+
+
+CATEGORIES = ["Low", "Moderate", "High", "Critical"]
+
+
+def test_rule_table_matches_legacy_recommendations():
+    logging.disable(logging.CRITICAL)
+    intelligence = EnvironmentalIntelligence()
+    contexts = _random_contexts(3000)
+    categories = [CATEGORIES[i % 4] for i in range(len(contexts))]
+
+    batch = intelligence.generate_government_recommendations_batch(contexts, categories)
+    for context, category, batch_result in zip(contexts, categories, batch):
+        expected = legacy_recommendations(context, category)
+        assert intelligence.generate_government_recommendations(context, category) == expected
+        assert batch_result == expected
+        assert intelligence.generate_government_recommendations(context, category, limit=3) == expected[:3]
+    logging.disable(logging.NOTSET)
+
+
+def test_rules_reload_from_file(tmp_path):
+    path = tmp_path / "rules.json"
+    table = {"rules": [{"id": "alert", "when": {"field": "aqi", "op": ">", "value": 100},
+                        "action": "Alert", "reason": "AQI={aqi:.0f}", "priority": "base",
+                        "time_horizon": "Immediate"}]}
+    path.write_text(json.dumps(table))
+    engine = RecommendationRuleEngine(str(path))
+    context = _random_contexts(1)[0]
+    context['aqi'] = 150.0
+
+    assert [r['action'] for r in engine.recommend(context, "High")] == ["Alert"]
+
+    table['rules'][0]['when']['value'] = 200
+    path.write_text(json.dumps(table))
+    assert engine.reload()
+    assert engine.recommend(context, "High") == []
+
+    # A broken table is rejected and the previous rules stay active
+    path.write_text(json.dumps({"rules": [{"id": "bad", "when": {"field": "nope", "op": ">", "value": 1}}]}))
+    assert not engine.reload()
+    assert len(engine.rules) == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
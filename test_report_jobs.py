@@ -0,0 +1,236 @@
+"""
+Classification job queue test: report_violation answers 202 before
+classification runs, the worker fills the stored report in, a full queue
+turns new jobs away, queued reports share batched YOLO calls whose
+results map back to the right report (reports left without a result
+fail), and the queue reports its depth.
+"""
+
+import sys
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services.report_jobs import ClassificationJobQueue
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+RESULT = {
+    'violation_type': 'fire_hazard',
+    'severity': 'Severe',
+    'confidence': 0.9,
+    'action_required': 'Emergency Response Required',
+    'text_classification': {'violation_type': 'fire_hazard'},
+    'yolo_detection': {'detected_class': 'fire'},
+    'fusion_logic': 'text_primary_yolo_secondary',
+}
+
+
+def _blocking_classifier():
+    release = threading.Event()
+
+    def classify(items):
+        classify.items.extend(items)
+        release.wait(5)
+        return [RESULT] * len(items)
+
+    classify.items = []
+    return classify, release
+
+
+def test_queue_classifies_in_background_and_applies_backpressure():
+    classify, release = _blocking_classifier()
+    jobs = ClassificationJobQueue(classify, workers=1, max_pending=2, batch_size=1)
+    reports = [{'id': str(i)} for i in range(4)]
+
+    assert jobs.submit(reports[0], 'x.jpg', 'fire')
+    deadline = time.time() + 5
+    while reports[0]['classification_status'] != 'processing' and time.time() < deadline:
+        time.sleep(0.01)
+
+    # The worker holds report 0, two more fill the queue, the last is turned away
+    assert [jobs.submit(r, 'x.jpg', 'fire') for r in reports[1:]] == [True, True, False]
+    assert 'classification_status' not in reports[-1]
+    metrics = jobs.get_metrics()
+    assert metrics['queue_depth'] == 2 and metrics['in_flight'] == 1 and metrics['rejected'] == 1
+
+    release.set()
+    jobs.join()
+    metrics = jobs.get_metrics()
+    assert metrics['completed'] == 3 and metrics['queue_depth'] == 0 and metrics['in_flight'] == 0
+    for report in reports[:3]:
+        assert report['classification_status'] == 'done'
+        assert report['violation_type'] == 'fire_hazard'
+        assert report['ai_recommendation'] == 'Emergency Response Required'
+
+
+def test_failed_classification_is_recorded():
+    jobs = ClassificationJobQueue(lambda items: [None] * len(items), workers=1)
+    report = {'id': 'X'}
+    assert jobs.submit(report, 'x.jpg')
+    jobs.join()
+    assert report['classification_status'] == 'failed'
+    assert report['classification_error']
+    assert jobs.get_metrics()['failed'] == 1
+
+
+def test_batching_is_off_by_default():
+    # Batch 1 measured fastest on CPU; larger batches are opt-in via Config
+    jobs = ClassificationJobQueue(lambda items: [])
+    assert jobs.batch_size == 1
+
+
+def test_queued_reports_share_one_batched_call():
+    classify, release = _blocking_classifier()
+    calls = []
+    jobs = ClassificationJobQueue(lambda items: calls.append(len(items)) or classify(items),
+                                  workers=1, batch_size=4, batch_wait_ms=0)
+    reports = [{'id': str(i)} for i in range(6)]
+
+    assert jobs.submit(reports[0], 'x.jpg')
+    deadline = time.time() + 5
+    while reports[0]['classification_status'] != 'processing' and time.time() < deadline:
+        time.sleep(0.01)
+    for report in reports[1:]:
+        assert jobs.submit(report, 'x.jpg')
+
+    release.set()
+    jobs.join()
+    # The first report ran alone; the five queued behind it went in batches of at most 4
+    assert calls == [1, 4, 1]
+    assert jobs.get_metrics()['batches'] == 3
+    assert all(r['classification_status'] == 'done' for r in reports)
+
+
+def test_short_batch_result_fails_the_unmatched_reports():
+    release = threading.Event()
+
+    def classify(items):
+        release.wait(5)
+        return [RESULT]  # One result however many reports went in
+
+    jobs = ClassificationJobQueue(classify, workers=1, batch_size=3, batch_wait_ms=0)
+    reports = [{'id': str(i)} for i in range(3)]
+    assert jobs.submit(reports[0], 'x.jpg')
+    deadline = time.time() + 5
+    while reports[0]['classification_status'] != 'processing' and time.time() < deadline:
+        time.sleep(0.01)
+    for report in reports[1:]:
+        assert jobs.submit(report, 'x.jpg')
+
+    release.set()
+    jobs.join()
+    assert [r['classification_status'] for r in reports] == ['done', 'done', 'failed']
+    assert reports[2]['classification_error']
+    metrics = jobs.get_metrics()
+    assert metrics['completed'] == 2 and metrics['failed'] == 1 and metrics['in_flight'] == 0
+
+
+class _Box:
+    def __init__(self, cls, conf):
+        self.cls = np.array([cls])
+        self.conf = np.array([conf])
+        self.xyxy = np.array([[0.0, 0.0, 10.0, 10.0]])
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class _BatchDetector:
+    """Stands in for the YOLO model: one Results-like object per source, in order."""
+
+    names = {0: 'fire', 1: 'smoke'}
+
+    def __init__(self, detections):
+        self.detections = detections
+        self.calls = []
+
+    def __call__(self, sources):
+        self.calls.append(list(sources))
+        return [_Result([_Box(*d) for d in self.detections[os.path.basename(s)]]) for s in sources]
+
+
+def test_yolo_batch_maps_results_back_to_each_image(monkeypatch, tmp_path):
+    from app.model_loader import model_loader
+
+    detector = _BatchDetector({'a.jpg': [(1, 0.4), (0, 0.7)], 'b.jpg': [], 'c.jpg': [(1, 0.6)]})
+    monkeypatch.setitem(model_loader.models, 'fire_smoke', detector)
+    paths = []
+    for name in ('a.jpg', 'b.jpg', 'c.jpg'):
+        (tmp_path / name).write_bytes(b'')
+        paths.append(str(tmp_path / name))
+
+    batch = model_loader.classify_fire_smoke_batch(paths[:2] + [str(tmp_path / 'missing.jpg')] + paths[2:])
+    assert len(detector.calls) == 1 and detector.calls[0] == paths
+    assert [b['detected_class'] for b in batch] == ['fire', 'none', 'none', 'smoke']
+    assert batch[0]['confidence'] == 0.7 and len(batch[0]['all_detections']) == 2
+    assert batch[2]['violation_type'] == 'No Clear Violation'
+
+    hybrid = model_loader.classify_hybrid_batch([(paths[0], 'thick smoke'), (paths[2], '')])
+    assert len(detector.calls) == 2
+    assert [h['yolo_detection']['detected_class'] for h in hybrid] == ['fire', 'smoke']
+    assert hybrid[1]['violation_type'] == 'industrial_smoke'
+
+
+def test_report_violation_returns_202_and_status_endpoint(monkeypatch, tmp_path):
+    import io
+    from app import create_app
+    from app.config import Config, TestingConfig
+    from app.services import classification_cache, report_jobs, report_repository
+
+    classify, release = _blocking_classifier()
+    jobs = ClassificationJobQueue(classify, workers=1, max_pending=4)
+    monkeypatch.setattr(report_jobs, '_classification_queue', jobs)
+    monkeypatch.setattr(classification_cache, '_classification_cache',
+                        classification_cache.ClassificationCache(str(tmp_path / 'cache.jsonl')))
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(Config, 'THUMBNAIL_FOLDER', str(tmp_path / 'thumbnails'))
+    monkeypatch.setattr(report_repository, '_report_repository',
+                        report_repository.ReportRepository(str(tmp_path / 'reports.db')))
+
+    upload = io.BytesIO()
+    Image.new('RGB', (1600, 1200), (90, 90, 90)).save(upload, format='JPEG')
+    data = upload.getvalue()
+
+    client = create_app(TestingConfig).test_client()
+    assert client.post('/api/report_violation', data={
+        'image': (io.BytesIO(b'not an image'), 'smoke.png'),
+    }, content_type='multipart/form-data').status_code == 400
+
+    response = client.post('/api/report_violation', data={
+        'image': (io.BytesIO(data), 'smoke.png'),
+        'name': 'Tester',
+        'description': 'fire near the factory',
+    }, content_type='multipart/form-data')
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['classification_status'] == 'queued'
+
+    pending = client.get(body['status_url']).get_json()['report']
+    assert pending['classification_status'] in ('queued', 'processing')
+    assert pending['violation_type'] is None
+    # Stored byte for byte under the sniffed extension, thumbnail written, no re-read for YOLO
+    assert pending['image_url'].endswith('.jpg')
+    assert (tmp_path / pending['image_url'].rsplit('/', 1)[1]).read_bytes() == data
+    assert (tmp_path / 'thumbnails' / pending['thumbnail_url'].rsplit('/', 1)[1]).exists()
+
+    release.set()
+    jobs.join()
+    report = client.get(body['status_url']).get_json()['report']
+    assert report['classification_status'] == 'done'
+    assert report['violation_type'] == 'fire_hazard'
+    [(image, description)] = classify.items
+    assert isinstance(image, np.ndarray) and image.shape == (480, 640, 3)
+
+    queue_metrics = client.get('/api/reports/queue').get_json()['queue']
+    assert queue_metrics['completed'] == 1 and queue_metrics['queue_depth'] == 0
+    assert client.get('/api/reports/NOPE').status_code == 404
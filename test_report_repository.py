@@ -0,0 +1,169 @@
+"""
+Report repository test: reports round-trip through SQLite in WAL mode,
+the filter columns are indexed, pending writes to one report collapse into
+a single flush, data survives a restart, the status/acknowledgement
+routes read and write through the repository, and the materialised
+status / violation type / verified-reporter counters track every write.
+"""
+
+import sys
+import os
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services.report_repository import ReportRepository
+
+warnings.filterwarnings('ignore')
+
+
+def _report(report_id, reporter='Asha', status='pending', timestamp='2026-01-01T00:00:00'):
+    return {'id': report_id, 'reporter_name': reporter, 'status': status,
+            'violation_type': 'industrial_smoke', 'timestamp': timestamp, 'description': 'smoke'}
+
+
+def test_schema_is_wal_and_indexed(tmp_path):
+    repository = ReportRepository(str(tmp_path / 'reports.db'))
+    conn = repository._conn()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'reports'")}
+    for column in ('reporter_name', 'status', 'violation_type', 'timestamp', 'acknowledged'):
+        assert f'idx_reports_{column}' in indexes
+    plan = ' '.join(str(row) for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM reports WHERE reporter_name = ? AND status = ?", ('a', 'b')))
+    assert 'USING' in plan and 'INDEX' in plan
+
+
+def test_add_get_update_delete(tmp_path):
+    repository = ReportRepository(str(tmp_path / 'reports.db'))
+    report = _report('r1')
+    repository.add(report)
+    report['status'] = 'mutated after add'
+    assert repository.get('r1')['status'] == 'pending'
+
+    updated = repository.update('r1', {'status': 'verified', 'severity': 'High'})
+    assert updated['status'] == 'verified' and updated['description'] == 'smoke'
+    assert repository.get('r1')['severity'] == 'High'
+    assert repository.update('missing', {'status': 'verified'}) is None
+
+    repository.delete('r1')
+    assert repository.get('r1') is None
+    assert repository.count() == 0
+
+
+def test_pending_writes_are_batched_and_persisted(tmp_path):
+    path = str(tmp_path / 'reports.db')
+    repository = ReportRepository(path, flush_interval=3600)
+    repository._thread = object()  # Stand-in writer: nothing flushes until asked
+
+    rows = "SELECT COUNT(*) FROM reports WHERE status = 'verified'"
+    # New reports are committed immediately, even with a background writer
+    repository.add(_report('r1'))
+    repository.add(_report('r2', reporter='Ravi', timestamp='2026-01-02T00:00:00'))
+    assert repository._conn().execute("SELECT COUNT(*) FROM reports").fetchone()[0] == 2
+
+    for status in ('processing', 'verified'):
+        repository.update('r1', {'status': status})
+    # Unflushed changes are already visible by id
+    assert repository.get('r1')['status'] == 'verified'
+    assert repository._conn().execute(rows).fetchone()[0] == 0
+
+    assert repository.flush() == 1
+    assert repository.flush() == 0
+    assert repository._conn().execute(rows).fetchone()[0] == 1
+
+    reopened = ReportRepository(path)
+    assert [r['id'] for r in reopened.list_reports()] == ['r1', 'r2']
+    assert reopened.get('r1')['status'] == 'verified'
+    assert reopened.get_stats()['by_status'] == {'verified': 1, 'pending': 1}
+
+
+def test_status_update_route_acknowledges_reporter(monkeypatch, tmp_path):
+    from app import create_app
+    from app.config import TestingConfig
+    from app.services import report_repository
+
+    repository = ReportRepository(str(tmp_path / 'reports.db'))
+    monkeypatch.setattr(report_repository, '_report_repository', repository)
+    repository.add(_report('r1'))
+    repository.add(_report('r2', timestamp='2026-01-02T00:00:00'))
+    client = create_app(TestingConfig).test_client()
+
+    assert client.put('/api/reports/unknown/status', json={'status': 'reviewed'}).status_code == 404
+    assert client.put('/api/reports/r2/status', json={'status': 'reviewed'}).status_code == 200
+    response = client.put('/api/reports/r1/status', json={'status': 'action_taken'})
+    assert response.status_code == 200
+    assert repository.get('r1')['status'] == 'action_taken'
+    assert 'reported 1 verified' in repository.get('r1')['acknowledgement']['message']
+    assert 'acknowledgement' not in repository.get('r2')
+
+    repository.add(_report('r3', reporter='', timestamp='2026-01-03T00:00:00'))
+    client.put('/api/reports/r3/status', json={'status': 'action_taken'})
+    message = repository.get('r3')['acknowledgement']['message']
+    assert 'thank Anonymous' in message and 'reported 1 verified' in message
+    repository.delete('r3')
+
+    acknowledged = client.get('/api/acknowledgements?reporter_name=Asha').get_json()
+    assert [a['report_id'] for a in acknowledged['acknowledgements']] == ['r1']
+    assert len(client.get('/api/reports').get_json()['reports']) == 2
+
+    stats = client.get('/api/reports/stats').get_json()['stats']
+    assert stats['by_status'] == {'action_taken': 1, 'reviewed': 1}
+    assert stats['verified_by_reporter'] == {'Asha': 1}
+
+
+def test_counters_follow_every_transition(tmp_path):
+    path = str(tmp_path / 'reports.db')
+    repository = ReportRepository(path)
+    repository.add(_report('r1'))
+    repository.add({**_report('r2', reporter='Ravi'), 'violation_type': None})
+    repository.add(_report('r3'))
+    assert repository.get_stats()['by_violation_type'] == {'industrial_smoke': 2, 'unclassified': 1}
+
+    repository.update('r2', {'violation_type': 'fire_hazard', 'status': 'action_taken'})
+    for report_id in ('r1', 'r3'):
+        repository.update(report_id, {'status': 'action_taken'})
+    assert repository.verified_count('Asha') == 2
+    assert repository.verified_count('Ravi') == 1
+
+    # Blank names (the form always sends `name`) count as Anonymous either way
+    repository.add(_report('r4', reporter=''))
+    repository.update('r4', {'status': 'action_taken'})
+    assert repository.verified_count('') == repository.verified_count('Anonymous') == 1
+    repository.delete('r4')
+
+    # Re-adding an existing id replaces it rather than counting it twice
+    repository.add(_report('r3', status='escalated'))
+    repository.delete('r2')
+    repository.delete('r2')
+    expected = {
+        'total': 2,
+        'by_status': {'action_taken': 1, 'escalated': 1},
+        'by_violation_type': {'industrial_smoke': 2},
+        'verified_by_reporter': {'Asha': 1},
+    }
+    assert repository.get_stats() == expected
+    assert repository.count() == 2
+    # Rebuilt from the table on start-up
+    assert ReportRepository(path).get_stats() == expected
+
+
+def test_global_repository_is_opened_on_first_use(monkeypatch, tmp_path):
+    from app import create_app
+    from app.config import Config, TestingConfig
+    from app.services import report_repository
+
+    path = tmp_path / 'reports.db'
+    monkeypatch.setattr(report_repository, '_report_repository', None)
+    monkeypatch.setattr(Config, 'REPORTS_DB_PATH', str(path))
+    client = create_app(TestingConfig).test_client()
+    assert not path.exists()
+
+    assert client.get('/api/reports').status_code == 200
+    repository = report_repository._report_repository
+    assert repository.db_path == str(path) and path.exists()
+
+    repository.add(_report('r1'))
+    report_repository.update_report('r1', {'status': 'reviewed'})
+    repository.stop()
+    assert ReportRepository(str(path)).get('r1')['status'] == 'reviewed'
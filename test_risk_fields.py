@@ -0,0 +1,57 @@
+"""
+Test for ?fields= on /api/risk/<city>: sections that are not requested
+must not be computed (no legacy model call, no recommendation pass).
+"""
+
+import sys
+import os
+from unittest import mock
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.routes import risk as risk_routes
+from app.services.environmental_intelligence import get_environmental_intelligence
+from app.services.pollution_reading import PollutionReading
+
+READING = PollutionReading(
+    aqi=240, pm25=160, pm10=260, no2=95, so2=40, dominantpol='pm25',
+    temperature=18, humidity=78, pressure=1014, wind_speed=0.7,
+    forecast_pm25_avg=190, station='Delhi',
+)
+
+
+def _context():
+    return get_environmental_intelligence().compute_environmental_context(READING)
+
+
+def test_all_sections_by_default():
+    response = risk_routes.build_risk_sections(_context())
+    for key in ('risk_score', 'pollutants', 'pollution_source', 'environmental_context',
+                'early_warning', 'recommendations', 'legacy_risk_level', 'description'):
+        assert key in response
+
+
+def test_skipped_sections_are_not_computed():
+    intelligence = get_environmental_intelligence()
+    with mock.patch.object(risk_routes.model_loader, 'get_risk_evaluator') as evaluator, \
+            mock.patch.object(intelligence, 'generate_government_recommendations') as recommendations:
+        response = risk_routes.build_risk_sections(_context(), {'risk', 'early_warning'})
+
+    evaluator.assert_not_called()
+    recommendations.assert_not_called()
+    assert set(response) == {'risk_score', 'risk_level', 'escalation_probability',
+                             'latest_aqi', 'early_warning'}
+    assert response['early_warning']['triggered'] is True
+
+
+def test_parse_fields_rejects_unknown_sections():
+    assert risk_routes.parse_risk_fields(None) == frozenset(risk_routes.RISK_SECTIONS)
+    assert risk_routes.parse_risk_fields(' risk , legacy ') == {'risk', 'legacy'}
+    with pytest.raises(ValueError):
+        risk_routes.parse_risk_fields('risk,unknown')
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,90 @@
+"""
+Risk leaderboard test: the batched ranking must agree with scoring each
+city on its own (composite score and legacy XGBoost class), and must be
+served from cache within a polling cycle.
+"""
+
+import sys
+import os
+import logging
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.model_loader import model_loader
+from app.services import risk_leaderboard as leaderboard_module
+from app.services.environmental_intelligence import get_environmental_intelligence
+from app.services.live_aqi_service import LiveAQIService
+from app.services.pollution_reading import PollutionReading
+
+READINGS = {
+    "Delhi": dict(aqi=320, pm25=210, pm10=380, no2=90, wind_speed=0.6, humidity=82,
+                  pressure=1015, temperature=14, forecast_pm25_avg=260),
+    "Mumbai": dict(aqi=95, pm25=40, pm10=80, no2=30, wind_speed=4.2, humidity=70, pressure=1008),
+    "Kolkata": dict(aqi=180, pm25=95, wind_speed=1.8, humidity=None, forecast_pm25_avg=100),
+    "Chennai": dict(aqi=60),
+}
+
+# Model loading (XGBoost/sklearn) is noisy; keep the filter scoped to this module
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+@pytest.fixture
+def quiet_logging():
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _service():
+    service = LiveAQIService()
+    for city, fields in READINGS.items():
+        service.add_to_buffer(city, PollutionReading(station=city, **fields))
+    return service
+
+
+def test_leaderboard_matches_per_city_scoring(monkeypatch, quiet_logging):
+    service = _service()
+    monkeypatch.setattr(leaderboard_module, 'get_live_aqi_service', lambda: service)
+
+    ranking = leaderboard_module.RiskLeaderboard().get_ranking()
+    entries = ranking['entries']
+
+    intelligence = get_environmental_intelligence()
+    model = model_loader.get_risk_model()
+    assert [e['rank'] for e in entries] == list(range(1, len(READINGS) + 1))
+    assert [e['risk_score'] for e in entries] == sorted((e['risk_score'] for e in entries), reverse=True)
+
+    for entry in entries:
+        context = intelligence.compute_environmental_context(service.get_buffer(entry['city'])[-1])
+        score, category, escalation = intelligence.compute_composite_risk_score(context)
+        weather = context['weather']
+        legacy = int(model.predict([[context['aqi'], 0, weather['wind_speed'] or 2.0,
+                                     weather['temperature'] or 25.0, weather['humidity'] or 60.0]])[0])
+
+        assert entry['risk_score'] == score
+        assert entry['risk_level'] == category
+        assert entry['escalation_probability'] == round(escalation * 100, 1)
+        assert entry['early_warning'] == (intelligence.detect_early_warning(context) is not None)
+        assert entry['legacy_risk_level'] == leaderboard_module.LEGACY_RISK_MAP[legacy]
+
+
+def test_leaderboard_is_cached_within_cycle(monkeypatch):
+    service = _service()
+    monkeypatch.setattr(leaderboard_module, 'get_live_aqi_service', lambda: service)
+    leaderboard = leaderboard_module.RiskLeaderboard()
+
+    first = leaderboard.get_ranking()
+    assert leaderboard.get_ranking() is first
+
+    # A newly tracked city shows up without waiting for the next cycle
+    service.add_to_buffer("Pune", PollutionReading(aqi=500, pm25=400, station="Pune"))
+    refreshed = leaderboard.get_ranking()
+    assert refreshed is not first
+    assert "Pune" in [e['city'] for e in refreshed['entries']]
+    assert len(refreshed['entries']) == len(READINGS) + 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,72 @@
+"""
+Parity test: the flattened risk model (app/services/tree_ensemble.py)
+must predict exactly what the pickled XGBClassifier predicts on the
+training CSV, both freshly exported and loaded from the saved artifact.
+"""
+
+import sys
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+pytest.importorskip("xgboost")
+
+from app.config import Config
+from app.model_loader import model_loader
+from app.services.tree_ensemble import FlatTreeEnsemble, export_xgboost_classifier
+
+FEATURE_COLS = ['AQI', 'violations_7d', 'wind_speed', 'temperature', 'humidity']
+
+
+def _training_features():
+    df = pd.read_csv(Config.AQI_DATASET_PATH)
+    return df[FEATURE_COLS].values
+
+
+def _risk_model():
+    # Unpickling the classifier warns about the xgboost version
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return model_loader.get_risk_model()
+
+
+def test_flat_model_matches_xgboost_on_training_csv():
+    model = _risk_model()
+    ensemble = export_xgboost_classifier(model)
+    X = _training_features()
+
+    assert ensemble.n_trees == 800
+    assert ensemble.max_depth == 5
+    np.testing.assert_array_equal(ensemble.predict(X), model.predict(X))
+    np.testing.assert_allclose(ensemble.predict_proba(X), model.predict_proba(X), atol=1e-5)
+
+
+def test_flat_model_follows_default_direction_for_missing_values():
+    model = _risk_model()
+    ensemble = export_xgboost_classifier(model)
+    X = _training_features()[:3000].copy()
+    X[::3, 2] = np.nan
+    X[::7, 0] = np.nan
+
+    np.testing.assert_array_equal(ensemble.predict(X), model.predict(X))
+
+
+def test_saved_artifact_round_trips(tmp_path):
+    model = _risk_model()
+    path = str(tmp_path / "risk_model_trees.npz")
+    export_xgboost_classifier(model).save(path)
+    X = _training_features()[:2000]
+
+    np.testing.assert_array_equal(FlatTreeEnsemble.load(path).predict(X), model.predict(X))
+    # The committed export must match the committed pickle
+    if os.path.exists(Config.RISK_TREES_PATH):
+        np.testing.assert_array_equal(model_loader.get_risk_evaluator().predict(X), model.predict(X))
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,141 @@
+"""
+Test for the incremental per-city risk state: every buffered reading
+updates EnvironmentalIntelligence's state, which must equal a fresh run
+of the scoring pipeline, with rolling PM2.5 statistics over the last
+TREND_WINDOW readings that stay exact however long the process runs.
+"""
+
+import sys
+import os
+import logging
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.routes import risk as risk_routes
+from app.services.environmental_intelligence import EnvironmentalIntelligence
+from app.services.live_aqi_service import LiveAQIService
+from app.services.pollution_reading import PollutionReading
+from app.services.risk_state import RollingTrend
+
+
+def _reading(i, city="Delhi"):
+    return PollutionReading(
+        aqi=150 + 7 * i, pm25=80 + 3 * i + (i % 3), pm10=200 + i, no2=60 + i, so2=20 + i,
+        temperature=20, humidity=65 + i, pressure=1008 + i, wind_speed=max(0.2, 2.5 - 0.2 * i),
+        forecast_pm25_avg=90 + 4 * i, dominantpol='pm25', ts=1_700_000_000 + 1800 * i, station=city,
+    )
+
+
+@pytest.fixture
+def wired():
+    logging.disable(logging.CRITICAL)
+    service = LiveAQIService()
+    intelligence = EnvironmentalIntelligence()
+    service.add_reading_listener(intelligence.update_city_state)
+    service.add_reading_listener(intelligence.update_city_state)  # idempotent
+    yield service, intelligence
+    logging.disable(logging.NOTSET)
+
+
+def test_rolling_trend_stays_exact_over_long_uptime():
+    trend = RollingTrend(24)
+    rng = np.random.default_rng(0)
+    start = 1_700_000_000
+    ts = start + 3600 * np.arange(5000) + rng.uniform(0, 600, 5000)  # ~7 months of hourly readings
+    values = 80 + 0.5 * np.arange(5000) % 40 + rng.normal(0, 5, 5000)
+    for t, y in zip(ts, values):
+        trend.add(t, y)
+
+    expected_slope = np.polyfit((ts[-24:] - ts[-24]) / 3600, values[-24:], 1)[0]
+    assert trend.slope_per_hour == pytest.approx(expected_slope, rel=1e-9)
+    assert trend.mean == pytest.approx(values[-24:].mean(), rel=1e-12)
+    # The origin follows the window instead of staying at the first reading
+    assert ts[-48] <= trend._origin <= ts[-24]
+
+
+def test_state_matches_full_pipeline(wired):
+    service, intelligence = wired
+    for i in range(20):
+        reading = _reading(i)
+        service.add_to_buffer("Delhi", reading)
+
+        state = intelligence.get_city_state("Delhi")
+        assert state.reading is reading
+        context = intelligence.compute_environmental_context(reading)
+        score, category, escalation = intelligence.compute_composite_risk_score(context)
+        assert (state.risk_score, state.risk_category, state.escalation_probability) == (score, category, escalation)
+        assert state.early_warning == intelligence.detect_early_warning(context)
+
+        # Rolling statistics over the last TREND_WINDOW readings
+        window = [_reading(j) for j in range(max(0, i - intelligence.TREND_WINDOW + 1), i + 1)]
+        pm25 = np.array([r.pm25 for r in window])
+        assert state.samples == len(window)
+        assert state.pm25_mean == pytest.approx(pm25.mean())
+        if len(window) > 1:
+            hours = np.array([r.ts for r in window]) / 3600
+            assert state.pm25_trend_per_hour == pytest.approx(np.polyfit(hours, pm25, 1)[0])
+
+    assert intelligence.get_city_state("Mumbai") is None
+
+
+def test_risk_sections_from_state_equal_recomputed(wired):
+    service, intelligence = wired
+    for i in range(5):
+        service.add_to_buffer("Delhi", _reading(i))
+    state = intelligence.get_city_state("Delhi")
+
+    fields = set(risk_routes.RISK_SECTIONS) - {'legacy', 'trend'}
+    from_state = risk_routes.build_risk_sections(state.context, fields, state)
+    recomputed = risk_routes.build_risk_sections(state.context, fields)
+    assert from_state == recomputed
+
+    # A stale copy of the same reading still matches its state
+    assert state.matches(state.reading.as_stale(12.0))
+    assert not state.matches(_reading(99))
+
+
+def test_risk_route_reads_fresh_state_without_fetching(wired, monkeypatch):
+    from app import create_app
+    from app.config import TestingConfig
+
+    service, intelligence = wired
+    service.add_clear_listener(intelligence.clear_city_state)
+    fetched = []
+
+    def fetch_live_pollution(city):
+        fetched.append(city)
+        return _reading(10 + len(fetched), city)
+
+    monkeypatch.setattr(service, 'fetch_live_pollution', fetch_live_pollution)
+    monkeypatch.setattr(risk_routes, 'get_live_aqi_service', lambda: service)
+    monkeypatch.setattr(risk_routes, 'get_environmental_intelligence', lambda: intelligence)
+    client = create_app(TestingConfig).test_client()
+
+    def risk():
+        response = client.get('/api/risk/Delhi?fields=risk')
+        assert response.status_code == 200
+        return response.get_json()
+
+    first = risk()
+    assert fetched == ['Delhi'] and first['data_source'] == 'live'
+    # Within BUFFER_TIMEOUT every request is a read of the precomputed state
+    assert [risk() for _ in range(3)] == [first] * 3
+    assert fetched == ['Delhi'] and len(service.get_buffer('Delhi')) == 1
+
+    # Out of date: fetch again
+    service.buffer_timestamps['Delhi'] -= service.BUFFER_TIMEOUT
+    assert risk()['latest_aqi'] != first['latest_aqi']
+    assert len(fetched) == 2
+
+    # Clearing the buffer drops the derived state too
+    service.clear_buffer('Delhi')
+    assert intelligence.get_city_state('Delhi') is None and not service.is_buffer_fresh('Delhi')
+    risk()
+    assert len(fetched) == 3
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
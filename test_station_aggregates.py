@@ -0,0 +1,115 @@
+"""
+Station aggregation tree test: every level of the tree must agree with a
+pandas groupby over station_day.csv, and incremental station updates must
+keep the ancestors consistent.
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+import pandas as pd
+
+from app import create_app
+from app.config import Config, TestingConfig
+from app.services.station_aggregates import StationAggregates, POLLUTANT_KEYS
+
+
+def _station_frame():
+    df = pd.read_csv(Config.STATION_DATASET_PATH)
+    df.columns = df.columns.str.strip().str.lower()
+    df['pollutant_avg'] = pd.to_numeric(df['pollutant_avg'], errors='coerce')
+    df = df.dropna(subset=['pollutant_avg'])
+    df['pollutant'] = df['pollutant_id'].map(POLLUTANT_KEYS)
+    return df
+
+
+def test_tree_matches_groupby():
+    df = _station_frame()
+    tree = StationAggregates.from_csv(Config.STATION_DATASET_PATH)
+
+    national = df.groupby('pollutant')['pollutant_avg'].agg(['mean', 'max', 'count'])
+    for pollutant, row in national.iterrows():
+        stats = tree.root.stats[pollutant]
+        assert stats.count == row['count']
+        assert abs(stats.total / stats.count - row['mean']) < 1e-9
+        assert stats.maximum == row['max']
+
+    by_state = df.groupby(['state', 'pollutant'])['pollutant_avg'].agg(['mean', 'max', 'min', 'count'])
+    for (state, pollutant), row in by_state.iterrows():
+        (node,) = tree.find('state', state)
+        stats = node.stats[pollutant]
+        assert stats.count == row['count']
+        assert abs(stats.total / stats.count - row['mean']) < 1e-9
+        assert (stats.maximum, stats.minimum) == (row['max'], row['min'])
+
+    assert tree.root.station_count == df[['state', 'city', 'station']].drop_duplicates().shape[0]
+    assert len(tree.find('city', 'Aurangabad')) == 2
+
+
+def test_incremental_update_propagates():
+    tree = StationAggregates()
+    tree.update_station('S', 'C', 'A', 'pm25', 100.0, 10.0, 70.0)
+    tree.update_station('S', 'C', 'B', 'pm25', 50.0, 12.0, 72.0)
+    tree.update_station('S', 'D', 'E', 'pm25', 30.0, 14.0, 74.0)
+
+    city = tree.find('city', 'c')[0]
+    assert city.stats['pm25'].to_json() == {'mean': 75.0, 'max': 100.0, 'min': 50.0, 'count': 2}
+    assert tree.root.station_count == 3
+
+    # Replacing the maximum must lower it everywhere above the station
+    tree.update_station('S', 'C', 'A', 'pm25', 20.0)
+    assert city.stats['pm25'].to_json() == {'mean': 35.0, 'max': 50.0, 'min': 20.0, 'count': 2}
+    assert tree.root.stats['pm25'].to_json() == {'mean': 33.33, 'max': 50.0, 'min': 20.0, 'count': 3}
+    assert tree.root.station_count == 3
+
+
+def test_updates_apply_deltas(monkeypatch):
+    import random
+    from app.services.station_aggregates import AggregateNode
+
+    rebuilt = []
+    recompute = AggregateNode._recompute_extremes
+    monkeypatch.setattr(AggregateNode, '_recompute_extremes',
+                        lambda node, pollutant: rebuilt.append(node.level) or recompute(node, pollutant))
+
+    tree = StationAggregates()
+    values = {}
+    for i in range(40):
+        key = ('S%d' % (i % 3), 'C%d' % (i % 6), 'st%d' % i)
+        values[key] = float(10 + i)
+        tree.update_station(*key, 'pm25', values[key])
+
+    # Raising a value, or lowering one that is no extreme, needs no rebuild
+    tree.update_station('S0', 'C0', 'st6', 'pm25', 500.0)
+    tree.update_station('S1', 'C1', 'st7', 'pm25', 16.5)
+    assert rebuilt == []
+
+    rng = random.Random(7)
+    for _ in range(300):
+        key = rng.choice(list(values))
+        values[key] = round(rng.uniform(0, 300), 1)
+        tree.update_station(*key, 'pm25', values[key])
+    for state in ('S0', 'S1', 'S2'):
+        expected = [v for (s, _, _), v in values.items() if s == state]
+        stats = tree.find('state', state)[0].stats['pm25']
+        assert (stats.count, stats.maximum, stats.minimum) == (len(expected), max(expected), min(expected))
+        assert abs(stats.total - sum(expected)) < 1e-6
+    assert tree.root.stats['pm25'].maximum == max(values.values())
+
+
+def test_aggregate_endpoint():
+    client = create_app(TestingConfig).test_client()
+
+    response = client.get('/api/aggregate/state/assam')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['level'] == 'state' and body['parent']['level'] == 'national'
+    assert body['children'] and 'pm25' in body['pollutants']
+
+    assert client.get('/api/aggregate/city/Aurangabad').status_code == 400
+    state = client.get('/api/aggregate/city/Aurangabad').get_json()['state'][0]
+    assert client.get(f'/api/aggregate/city/Aurangabad?state={state}').status_code == 200
+    assert client.get('/api/aggregate/district/Assam').status_code == 400
+    assert client.get('/api/aggregate/state/Atlantis').status_code == 404
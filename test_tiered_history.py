@@ -0,0 +1,91 @@
+"""
+Tiered history test: raw readings roll up into hourly means, days are the
+mean of their hourly means, both tiers stay within their horizons, and
+windows forward-fill short gaps but refuse histories that are mostly
+carried-forward copies.
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from app.services.pollution_reading import PollutionReading
+from app.services.tiered_history import SECONDS_PER_DAY, SECONDS_PER_HOUR, TieredHistory
+
+DAY0 = 1_700_006_400  # Midnight UTC
+
+
+def _reading(ts, aqi, pm25=None):
+    return PollutionReading(aqi=aqi, pm25=pm25, ts=ts, station="Delhi")
+
+
+def _history(timestamps, aqi=100):
+    history = TieredHistory()
+    for ts in timestamps:
+        history.add(_reading(ts, aqi))
+    return history
+
+
+def test_hourly_and_daily_rollup():
+    history = TieredHistory()
+    # Busy first hour (3 readings), quiet second hour (1 reading)
+    for minute, aqi in ((0, 90), (20, 100), (40, 110)):
+        history.add(_reading(DAY0 + 60 * minute, aqi, pm25=50))
+    history.add(_reading(DAY0 + SECONDS_PER_HOUR + 60, 200))
+
+    first_hour, second_hour = history.hourly
+    assert first_hour.get('aqi') == pytest.approx(100) and first_hour.count == 3
+    assert first_hour.max_aqi == 110 and first_hour.get('pm25') == pytest.approx(50)
+    assert second_hour.get('aqi') == 200 and second_hour.get('pm25') is None
+
+    # Every sampled hour weighs the same in the day
+    [today] = history.daily
+    assert today.get('aqi') == pytest.approx(150)
+    assert today.count == 4 and today.max_aqi == 200 and today.start_ts == DAY0
+
+    # The next day closes today's bucket
+    history.add(_reading(DAY0 + SECONDS_PER_DAY, 120))
+    assert [d.get('aqi') for d in history.daily] == [pytest.approx(150), 120]
+
+
+def test_tiers_stay_within_their_horizons():
+    hourly = _history(DAY0 + SECONDS_PER_HOUR * h for h in range(100))
+    assert len(hourly.hourly) == TieredHistory.HOURLY_HORIZON + 1  # Closed hours + the open one
+    assert hourly.hourly[-1].start_ts == DAY0 + SECONDS_PER_HOUR * 99
+
+    daily = _history(DAY0 + SECONDS_PER_DAY * d for d in range(45))
+    assert len(daily.daily) == TieredHistory.DAILY_HORIZON + 1
+    assert daily.daily[0].start_ts == DAY0 + SECONDS_PER_DAY * 14
+
+
+def test_window_fills_short_gaps():
+    full = _history(DAY0 + SECONDS_PER_DAY * d for d in range(30))
+    window = full.daily_window(30)
+    assert len(window) == 30 and len({b.start_ts for b in window}) == 30
+
+    # Every other day observed: half the slots are real, the gaps are carried forward
+    sparse = _history(DAY0 + SECONDS_PER_DAY * d for d in range(0, 60, 2))
+    window = sparse.daily_window(30)
+    assert len(window) == 30
+    assert window[-2] is window[-3]
+    # 15 observed days, plus day 28 carried into the first slot
+    assert len({id(b) for b in window}) == 16
+
+
+def test_window_refuses_mostly_copied_history():
+    # Two readings 20 days apart used to come back as a "full" 30-day window
+    history = _history([DAY0, DAY0 + 20 * SECONDS_PER_DAY])
+    assert history.daily_window(30) == ()
+    assert len(history.daily) == 2
+
+    # Short but dense hourly history is still served as-is
+    hours = _history(DAY0 + SECONDS_PER_HOUR * h for h in range(30))
+    assert len(hours.hourly_window(48)) == 30
+    assert TieredHistory.window(hours.hourly, 48, SECONDS_PER_HOUR, min_coverage=1.0) == ()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,69 @@
+# =====================================================
+# BUILD TRAINING HISTOGRAMS FOR THE DRIFT MONITOR
+# =====================================================
+#
+# Stores per-feature decile histograms of every model's training inputs
+# (app/services/drift_monitor.py), which the backend compares live
+# inputs against. Re-run after retraining any of the models.
+
+import os
+import sys
+import json
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.drift_monitor import MODEL_FEATURES, build_reference
+
+
+# =====================================================
+# CONFIG
+# =====================================================
+
+DAILY_DATA_PATH = "../data/final_hybrid_india_aqi_dataset (3).csv"  # LSTM + risk model
+HOURLY_DATA_PATH = "../data/city_hour.csv"  # Isolation Forest
+REFERENCE_PATH = "../models/drift_reference.json"
+
+
+# =====================================================
+# LOAD TRAINING DATA
+# =====================================================
+
+daily = pd.read_csv(DAILY_DATA_PATH)
+
+if os.path.exists(HOURLY_DATA_PATH):
+    hourly = pd.read_csv(HOURLY_DATA_PATH)
+    hourly = hourly.sort_values(['City', 'Datetime']).reset_index(drop=True)
+    iso_cols = list(MODEL_FEATURES['isolation_forest'][0])
+    hourly[iso_cols] = hourly.groupby('City')[iso_cols].transform(lambda x: x.ffill().bfill())
+    print(f"Isolation Forest reference from {HOURLY_DATA_PATH}")
+else:
+    # Daily averages of the same stations; used until the hourly file is available
+    hourly = daily
+    print(f"{HOURLY_DATA_PATH} not found, Isolation Forest reference from the daily dataset")
+
+frames = {
+    'lstm': daily,
+    'risk_model': daily,
+    'isolation_forest': hourly,
+}
+
+
+# =====================================================
+# BUILD + SAVE
+# =====================================================
+
+reference = build_reference(frames)
+reference['sources'] = {
+    'lstm': os.path.basename(DAILY_DATA_PATH),
+    'risk_model': os.path.basename(DAILY_DATA_PATH),
+    'isolation_forest': os.path.basename(HOURLY_DATA_PATH if hourly is not daily else DAILY_DATA_PATH),
+}
+
+with open(REFERENCE_PATH, "w") as f:
+    json.dump(reference, f, indent=1)
+
+for model, features in reference['models'].items():
+    print(f"{model}: {len(features)} features")
+print(f"\nDrift reference saved to {REFERENCE_PATH}")
@@ -0,0 +1,79 @@
+# =====================================================
+# EXPORT ISOLATION FOREST TO FLAT TREE ARRAYS
+# =====================================================
+#
+# Flattens the scikit-learn Isolation Forest into contiguous NumPy arrays
+# (app/services/tree_ensemble.py, same artifact format as the risk model)
+# so the backend scores readings without sklearn's per-tree overhead.
+# Re-run after retraining the Isolation Forest.
+
+import os
+import sys
+import pickle
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.tree_ensemble import export_isolation_forest
+
+
+# =====================================================
+# CONFIG
+# =====================================================
+
+DATA_PATH = "../data/city_hour.csv"
+MODEL_PATH = "../models/isolation_forest.pkl"
+SCALER_PATH = "../models/iso_scaler.pkl"
+EXPORT_PATH = "../models/isolation_forest_trees.npz"
+
+feature_cols = [
+    'PM2.5',
+    'NO2',
+    'CO',
+    'SO2',
+    'O3'
+]
+
+TOLERANCE = 1e-6
+
+
+# =====================================================
+# EXPORT
+# =====================================================
+
+with open(MODEL_PATH, "rb") as f:
+    model = pickle.load(f)
+
+with open(SCALER_PATH, "rb") as f:
+    scaler = pickle.load(f)
+
+ensemble = export_isolation_forest(model)
+print(f"Flattened {ensemble.n_trees} trees ({ensemble.n_nodes} nodes, depth {ensemble.max_depth})")
+
+
+# =====================================================
+# VERIFY PARITY
+# =====================================================
+
+# Training data when available, plus random points around the scaled data
+X_check = [np.random.default_rng(42).normal(0, 3, (20000, len(feature_cols)))]
+if os.path.exists(DATA_PATH):
+    df = pd.read_csv(DATA_PATH).dropna(subset=feature_cols)
+    X_check.append(scaler.transform(df[feature_cols]))
+X_check = np.vstack(X_check)
+
+max_error = float(np.abs(model.decision_function(X_check) - ensemble.decision_function(X_check)).max())
+mismatches = int(np.sum(model.predict(X_check) != ensemble.predict(X_check)))
+print(f"Parity check on {len(X_check)} rows: max score error {max_error:.2e}, {mismatches} label mismatches")
+if max_error > TOLERANCE or mismatches:
+    raise SystemExit("Flattened model does not match the Isolation Forest, not saving.")
+
+
+# =====================================================
+# SAVE
+# =====================================================
+
+ensemble.save(EXPORT_PATH)
+print(f"\nFlat Isolation Forest saved to {EXPORT_PATH}")
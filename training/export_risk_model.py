@@ -0,0 +1,67 @@
+# =====================================================
+# EXPORT RISK MODEL TO FLAT TREE ARRAYS
+# =====================================================
+#
+# Flattens the XGBoost risk classifier into contiguous NumPy arrays
+# (app/services/tree_ensemble.py) so the backend can score it without
+# building a DMatrix per request. Re-run after retraining the risk model.
+
+import os
+import sys
+import pickle
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.tree_ensemble import export_xgboost_classifier
+
+
+# =====================================================
+# CONFIG
+# =====================================================
+
+DATA_PATH = "../data/final_hybrid_india_aqi_dataset (3).csv"
+MODEL_PATH = "../models/risk_model.pkl"
+EXPORT_PATH = "../models/risk_model_trees.npz"
+
+feature_cols = [
+    'AQI',
+    'violations_7d',
+    'wind_speed',
+    'temperature',
+    'humidity'
+]
+
+
+# =====================================================
+# EXPORT
+# =====================================================
+
+with open(MODEL_PATH, "rb") as f:
+    model = pickle.load(f)
+
+ensemble = export_xgboost_classifier(model)
+print(f"Flattened {ensemble.n_trees} trees ({ensemble.n_nodes} nodes, depth {ensemble.max_depth})")
+
+
+# =====================================================
+# VERIFY PARITY ON TRAINING DATA
+# =====================================================
+
+df = pd.read_csv(DATA_PATH)
+X = df[feature_cols].values
+
+mismatches = int(np.sum(model.predict(X) != ensemble.predict(X)))
+print(f"Parity check: {mismatches} mismatches out of {len(X)} rows")
+if mismatches:
+    raise SystemExit("Flattened model does not match XGBoost predictions, not saving.")
+
+
+# =====================================================
+# SAVE
+# =====================================================
+
+ensemble.save(EXPORT_PATH)
+print(f"\nFlat risk model saved to {EXPORT_PATH}")